@@ -1,48 +1,240 @@
+"""
+Per-vehicle bias analysis of TriMet stop events and GPS RELPOS data.
+
+    python transform.py [--start 2022-12-07] [--end DATE] [--data-dir .]
+                        [--window DAYS] [-j N]
+
+Each service day is reduced (in a process pool) to per-vehicle sufficient
+statistics -- stop and boarding-stop counts, ons/offs sums, RELPOS count,
+mean and sum of squared deviations -- which are cached per day.  Multi-day
+and rolling-window tests merge those statistics instead of re-reading the
+raw files.  A single day also gets the full stop-event report.  Parsed
+stop events and day statistics are stored with csv_cache.cache_frame()
+under names keyed by the SHA-1 of their source files.
+"""
+
+import argparse
+import hashlib
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import NamedTuple
+
+import numpy as np
 import pandas as pd
-from bs4 import BeautifulSoup
-from datetime import datetime, timedelta
-from io import StringIO
-from scipy.stats import binomtest, ttest_1samp, chi2_contingency
+from lxml import etree
+from scipy.stats import binom, chi2
+from scipy.stats import t as t_dist
 
-with open("trimet_stopevents_2022-12-07.html", "r", encoding="utf-8") as f:
-    html = f.read()
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from csv_cache import cache_frame
+
+STOP_EVENTS_HTML = "trimet_stopevents_{day}.html"
+RELPOS_CSV = "trimet_relpos_{day}.csv"
+EXPECTED_STOP_EVENTS = {"2022-12-07": 93912}
+STOP_COLUMNS = ["vehicle_number", "arrive_time", "location_id", "ons", "offs"]
+ID_COLUMNS = ["vehicle_number", "location_id"]
+COUNT_COLUMNS = ["ons", "offs"]
+RELPOS_DTYPES = {"VEHICLE_NUMBER": "int32", "RELPOS": "float64"}
+CACHE_DIR = Path(os.getenv("STOP_EVENTS_CACHE_DIR", ".cache"))
+
+
+def parse_stop_events(path, service_date):
+    """
+    Walk the stop-event page once, collecting STOP_COLUMNS of every
+    "Stop events for PDX_TRIP <id>" table straight into column lists.
+    """
+    columns = {c: [] for c in STOP_COLUMNS}
+    trip_ids = []
+    trip_id = None
+
+    for _, el in etree.iterparse(path, events=("end",), tag=("h2", "table"), html=True):
+        if el.tag == "h2":
+            text = " ".join(el.itertext()).strip()
+            trip_id = text.split()[-1] if text.startswith("Stop events for PDX_TRIP") else None
+        elif trip_id is not None:
+            rows = el.iter("tr")
+            header = [" ".join(th.itertext()).strip() for th in next(rows)]
+            idx = [header.index(c) for c in STOP_COLUMNS]
+            n = 0
+            for tr in rows:
+                cells = [td.text for td in tr]
+                for c, i in zip(STOP_COLUMNS, idx):
+                    columns[c].append(cells[i])
+                n += 1
+            trip_ids.extend([trip_id] * n)
+            trip_id = None
+        el.clear()
+        while el.getprevious() is not None:       # drop parsed siblings as we go
+            del el.getparent()[0]
+
+    df = pd.DataFrame({c: pd.to_numeric(v) for c, v in columns.items()})
+    df.insert(0, "trip_id", trip_ids)
+    base_date = pd.Timestamp(service_date)
+    df["tstamp"] = base_date + pd.to_timedelta(df["arrive_time"], unit="s")
+    return typed_stop_events(df[["trip_id", "vehicle_number", "tstamp", "location_id", "ons", "offs"]])
+
+
+def typed_stop_events(df):
+    """
+    Compact dtypes for a stop-event frame: trip_id as a categorical, ids as
+    int32 and ons/offs as the smallest unsigned int that holds them.  Columns
+    with missing values keep their float dtype.
+    """
+    df = df.assign(trip_id=df["trip_id"].astype("category"))
+    for c in ID_COLUMNS:
+        if pd.api.types.is_integer_dtype(df[c]):
+            df[c] = df[c].astype("int32")
+    for c in COUNT_COLUMNS:
+        df[c] = pd.to_numeric(df[c], downcast="unsigned")
+    return df
 
-html_soup = BeautifulSoup(html, "html.parser")
 
-trip_headings = html_soup.find_all("h2", string=lambda txt: txt and txt.strip().startswith("Stop events for PDX_TRIP"))
+def memory_report(label, df):
+    """Print *df*'s footprint next to what pandas' default dtypes would take."""
+    defaults = {c: ("object" if isinstance(t, pd.CategoricalDtype) else "int64")
+                for c, t in df.dtypes.items()
+                if isinstance(t, pd.CategoricalDtype) or pd.api.types.is_integer_dtype(t)}
+    actual = df.memory_usage(deep=True).sum()
+    default = df.astype(defaults).memory_usage(deep=True).sum()
+    print(f"{label}: {actual / 2**20:,.2f} MB in memory "
+          f"({default / 2**20:,.2f} MB with default dtypes, {1 - actual / default:.0%} saved)")
+
+
+def file_digest(path):
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _cached(prefix, key_parts, build, cache_dir):
+    """
+    cache_frame() entry named by a hash of *key_parts* (source digests and
+    settings).  The name changes whenever the content does, so no mtime/size
+    stamps are checked.
+    """
+    key = hashlib.sha1(":".join(map(str, key_parts)).encode()).hexdigest()[:16]
+    return cache_frame(f"{prefix}.{key}", [], build, Path(cache_dir))
+
+
+def load_stop_events(path, service_date, cache_dir=CACHE_DIR, digest=None):
+    """parse_stop_events(), cached as Parquet under *cache_dir* keyed by the file's SHA-1."""
+    digest = digest or file_digest(path)
+    df = _cached("stopevents", [digest, service_date, STOP_COLUMNS],
+                 lambda: parse_stop_events(path, service_date), cache_dir)
+    return typed_stop_events(df)
+
+
+def load_relpos(path):
+    return (pd.read_csv(path, usecols=list(RELPOS_DTYPES), dtype=RELPOS_DTYPES)
+            .rename(columns={'VEHICLE_NUMBER': 'vehicle_number'}))
+
+
+def with_boarding(stops):
+    """
+    *stops* plus a boarding flag, with integer ons/offs widened to int64:
+    pandas keeps a grouped sum in the compact input dtype when it fits, and
+    system total − vehicle sum would then overflow.
+    """
+    wide = {c: stops[c].astype('int64') for c in COUNT_COLUMNS
+            if pd.api.types.is_integer_dtype(stops[c])}
+    return stops.assign(boarding=stops['ons'] >= 1, **wide)
 
-df_list = []
-base_date = datetime.strptime("2022-12-07", "%Y-%m-%d")
 
-for heading in trip_headings:
-    full_text = heading.get_text(strip=True)
-    parts = full_text.split()
-    trip_id = parts[-1]
-    html_table = heading.find_next_sibling("html_table")
-    if html_table is None:
-        html_table = heading.find_next("html_table")
-    if html_table is None:
-        raise RuntimeError(f"No <html_table> found immediately after heading '{full_text}'")
+def stop_stats(stops):
+    """Per-vehicle stop counts and ons/offs sums, in first-seen vehicle order."""
+    return (with_boarding(stops)
+            .groupby('vehicle_number', sort=False)
+            .agg(stops=('boarding', 'size'), boarding_stops=('boarding', 'sum'),
+                 ons=('ons', 'sum'), offs=('offs', 'sum')))
 
-    trip_df = pd.read_html(StringIO(str(html_table)))[0]
 
-    trip_df["tstamp"] = trip_df["arrive_time"].apply(lambda secs: base_date + timedelta(seconds=int(secs)))
+def relpos_stats(gps):
+    """Per-vehicle RELPOS count, mean and sum of squared deviations (m2)."""
+    g = gps.groupby('vehicle_number', sort=False)['RELPOS']
+    out = g.agg(['count', 'mean'])
+    out['m2'] = g.var(ddof=0) * out['count']
+    return out
 
-    sub = trip_df[["vehicle_number", "tstamp", "location_id", "ons", "offs"]].copy()
-    sub.insert(0, "trip_id", trip_id)
 
-    df_list.append(sub)
+def merge_stop_stats(frames):
+    if len(frames) == 1:
+        return frames[0]
+    return pd.concat(frames).groupby(level=0, sort=False).sum()
 
-stops_df = pd.concat(df_list, ignore_index=True)
 
-# Verify
-print(f"Data loading complete. Total stop events available: {len(stops_df):,}")
-if len(stops_df) == 93912:
-    print("Expected number of stop events loaded successfully")
-else:
-    print(f"Warning: Expected 93,912 stop events, but got {len(stops_df):,}")
+def merge_relpos_stats(frames):
+    """Combine per-day RELPOS moments (Chan et al. parallel update)."""
+    if len(frames) == 1:
+        return frames[0]
+    df = pd.concat(frames).fillna({'mean': 0.0, 'm2': 0.0})
+    by = df.index
+    n = df['count'].groupby(by, sort=False).sum()
+    mean = (df['count'] * df['mean']).groupby(by, sort=False).sum() / n
+    dev = df['mean'] - mean.reindex(by).to_numpy()
+    m2 = (df['m2'] + df['count'] * dev ** 2).groupby(by, sort=False).sum()
+    return pd.DataFrame({'count': n, 'mean': mean, 'm2': m2})
 
-stops_df = stops_df[["trip_id", "vehicle_number", "tstamp", "location_id", "ons", "offs"]]
+
+class DayStats(NamedTuple):
+    day: str
+    events: int
+    stops: pd.DataFrame          # stop_stats()
+    relpos: pd.DataFrame         # relpos_stats(); empty when the day has no RELPOS file
+
+
+def day_stats(day, data_dir=".", cache_dir=CACHE_DIR):
+    """
+    Reduce one service day to per-vehicle statistics, cached per day under
+    *cache_dir* keyed by the SHA-1 of its source files.
+    """
+    html = Path(data_dir) / STOP_EVENTS_HTML.format(day=day)
+    csv = Path(data_dir) / RELPOS_CSV.format(day=day)
+
+    html_digest = file_digest(html)
+    stops = _cached(f"vehicle_stats.{day}.stops", [html_digest],
+                    lambda: stop_stats(load_stop_events(html, day, cache_dir, html_digest)).reset_index(),
+                    cache_dir).set_index('vehicle_number')
+    if csv.exists():
+        relpos = _cached(f"vehicle_stats.{day}.relpos", [file_digest(csv)],
+                         lambda: relpos_stats(load_relpos(csv)).reset_index(),
+                         cache_dir).set_index('vehicle_number')
+    else:
+        print(f"[WARN] {csv} not found; no RELPOS data for {day}")
+        relpos = relpos_stats(pd.DataFrame({'vehicle_number': [], 'RELPOS': []}))
+    return DayStats(day, int(stops['stops'].sum()), stops, relpos)
+
+
+def _day_stats(task):
+    return day_stats(*task)
+
+
+def collect_day_stats(days, data_dir=".", workers=1, cache_dir=CACHE_DIR):
+    """day_stats() for every day whose stop-event file exists, in date order."""
+    present = []
+    for day in days:
+        if (Path(data_dir) / STOP_EVENTS_HTML.format(day=day)).exists():
+            present.append(day)
+        else:
+            print(f"[WARN] no stop-event file for {day}; skipped")
+    tasks = [(day, data_dir, cache_dir) for day in present]
+    if workers == 1 or len(tasks) < 2:
+        return [_day_stats(t) for t in tasks]
+    with ProcessPoolExecutor(max_workers=workers or None) as pool:
+        return list(pool.map(_day_stats, tasks))
+
+
+def check_event_count(day, n):
+    expected = EXPECTED_STOP_EVENTS.get(day)
+    if expected is None:
+        return
+    if n == expected:
+        print("Expected number of stop events loaded successfully")
+    else:
+        print(f"Warning: Expected {expected:,} stop events, but got {n:,}")
 
 
 def analyze_stop_events(data_frame):
@@ -69,62 +261,198 @@ def analyze_stop_events(data_frame):
     print("=" * 30)
 
 
-def analyze_specific_cases(data_frame):
+class StopIndex:
+    """
+    Summary index over a stop-event frame, built once: per-location and
+    per-vehicle aggregates (stops, distinct vehicles/locations, boarding
+    stops, ons, offs) as hash-indexed frames, plus sorted row offsets so the
+    raw events of one key are an O(k) slice instead of a full scan.
+    """
+
+    def __init__(self, stops):
+        self.stops = stops
+        self.by_location, self._location_order = self._summarize('location_id', 'vehicles', 'vehicle_number')
+        self.by_vehicle, self._vehicle_order = self._summarize('vehicle_number', 'locations', 'location_id')
+
+    def _summarize(self, key, distinct, other):
+        stops = self.stops
+        keys = stops[key].to_numpy()
+        order = np.argsort(keys, kind='stable')
+        sorted_keys = keys[order]
+        summary = (with_boarding(stops)
+                   .groupby(key)
+                   .agg(stops=('boarding', 'size'), **{distinct: (other, 'nunique')},
+                        boarding_stops=('boarding', 'sum'), ons=('ons', 'sum'), offs=('offs', 'sum'))
+                   .astype('int64'))                # one dtype, so .loc rows stay integral
+        summary['start'] = np.searchsorted(sorted_keys, summary.index.to_numpy(), 'left')
+        summary['end'] = np.searchsorted(sorted_keys, summary.index.to_numpy(), 'right')
+        return summary, order
+
+    def location(self, location_id):
+        return self.by_location.loc[location_id]
+
+    def vehicle(self, vehicle_number):
+        return self.by_vehicle.loc[vehicle_number]
+
+    def location_rows(self, location_id):
+        """Stop events at *location_id*, in their original order; empty for an unknown id."""
+        return self._rows(self.by_location, self._location_order, location_id)
+
+    def vehicle_rows(self, vehicle_number):
+        """Stop events of *vehicle_number*, in their original order; empty for an unknown id."""
+        return self._rows(self.by_vehicle, self._vehicle_order, vehicle_number)
+
+    def _rows(self, summary, order, key):
+        if key not in summary.index:
+            return self.stops.iloc[:0]
+        s = summary.loc[key]
+        return self.stops.iloc[order[s['start']:s['end']]]
+
+
+def analyze_specific_cases(index, locations=(6913,), vehicles=(4062,)):
     print("\n=== specific case analysis ===")
     
-    location_6913 = data_frame[data_frame['location_id'] == 6913]
-    print(f"\nLocation 6913:")
-    print(f"  Number of stops made at this location: {len(location_6913):,}")
-    
-    num_buses_at_location = location_6913['vehicle_number'].nunique()
-    print(f"  Number of different buses that stopped here: {num_buses_at_location:,}")
-    
-    boarding_at_location = location_6913[location_6913['ons'] >= 1]
-    boarding_percentage_location = (len(boarding_at_location) / len(location_6913)) * 100
-    print(f"  Percentage of stops with at least one passenger boarding: {boarding_percentage_location:.2f}%")
-    
-    vehicle_4062 = data_frame[data_frame['vehicle_number'] == 4062]
-    print(f"\nVehicle 4062:")
-    print(f"  Number of stops made by this vehicle: {len(vehicle_4062):,}")
-    
-    total_passengers_boarded = vehicle_4062['ons'].sum()
-    print(f"  Total passengers boarded this vehicle: {total_passengers_boarded:,}")
-    
-    total_passengers_deboarded = vehicle_4062['offs'].sum()
-    print(f"  Total passengers deboarded this vehicle: {total_passengers_deboarded:,}")
-    
-    boarding_events_vehicle = vehicle_4062[vehicle_4062['ons'] >= 1]
-    boarding_percentage_vehicle = (len(boarding_events_vehicle) / len(vehicle_4062)) * 100
-    print(f"  Percentage of stops with at least one passenger boarding: {boarding_percentage_vehicle:.2f}%")
+    for location_id in locations:
+        print(f"\nLocation {location_id}:")
+        if location_id not in index.by_location.index:
+            print("  No stop events at this location.")
+            continue
+        loc = index.location(location_id)
+        print(f"  Number of stops made at this location: {loc['stops']:,}")
+        print(f"  Number of different buses that stopped here: {loc['vehicles']:,}")
+        boarding_percentage_location = (loc['boarding_stops'] / loc['stops']) * 100
+        print(f"  Percentage of stops with at least one passenger boarding: {boarding_percentage_location:.2f}%")
+    
+    for vehicle_number in vehicles:
+        print(f"\nVehicle {vehicle_number}:")
+        if vehicle_number not in index.by_vehicle.index:
+            print("  No stop events for this vehicle.")
+            continue
+        veh = index.vehicle(vehicle_number)
+        print(f"  Number of stops made by this vehicle: {veh['stops']:,}")
+        print(f"  Total passengers boarded this vehicle: {veh['ons']:,}")
+        print(f"  Total passengers deboarded this vehicle: {veh['offs']:,}")
+        boarding_percentage_vehicle = (veh['boarding_stops'] / veh['stops']) * 100
+        print(f"  Percentage of stops with at least one passenger boarding: {boarding_percentage_vehicle:.2f}%")
     
     print("=" * 30)
 
 
-def find_biased_vehicles(data_frame, alpha=0.05):
+def _binom_tail_search(a, d, lo, hi):
+    """Vectorised form of scipy's binary search for the opposite binomial tail."""
+    lo, hi = lo.astype(float), hi.astype(float)
+    hit = np.full(lo.shape, np.nan)
+    active = lo < hi
+    while active.any():
+        mid = lo + (hi - lo) // 2
+        midval = a(mid)
+        lt, gt = active & (midval < d), active & (midval > d)
+        eq = active & ~lt & ~gt
+        hit[eq] = mid[eq]
+        lo = np.where(lt, mid + 1, lo)
+        hi = np.where(gt, mid - 1, hi)
+        active = (lo < hi) & np.isnan(hit)
+    end = np.where(a(lo) <= d, lo, lo - 1)
+    return np.where(np.isnan(hit), end, hit)
+
+
+def binomtest_pvalues(k, n, p):
+    """Two-sided scipy.stats.binomtest(k, n, p).pvalue over arrays k, n."""
+    k, n = np.asarray(k, dtype=float), np.asarray(n, dtype=float)
+    d = binom.pmf(k, n, p) * (1 + 1e-7)
+    mode = p * n
+    pval = np.ones_like(k)
+
+    lo = k < mode
+    if lo.any():
+        kl, nl, dl = k[lo], n[lo], d[lo]
+        ix = _binom_tail_search(lambda x: -binom.pmf(x, nl, p), -dl, np.ceil(p * nl), nl)
+        y = nl - ix + (dl == binom.pmf(ix, nl, p))
+        pval[lo] = binom.cdf(kl, nl, p) + binom.sf(nl - y, nl, p)
+
+    hi = k > mode
+    if hi.any():
+        kh, nh, dh = k[hi], n[hi], d[hi]
+        ix = _binom_tail_search(lambda x: binom.pmf(x, nh, p), dh, np.zeros_like(kh), np.floor(p * nh))
+        pval[hi] = binom.cdf(ix, nh, p) + binom.sf(kh - 1, nh, p)
+
+    return np.minimum(1.0, pval)
+
+
+def ttest_1samp_pvalues(count, mean, var, popmean):
+    """Two-sided one-sample t-test p-values from per-group count, mean and sample variance."""
+    t_stat = (mean - popmean) / np.sqrt(var / count)
+    return t_stat, 2 * t_dist.sf(np.abs(t_stat), count - 1)
+
+
+def chi2_2x2_pvalues(a, b, c, d):
+    """
+    chi2_contingency([[a, b], [c, d]]) (Yates-corrected) over arrays;
+    returns the statistic, p-value and the smallest expected cell.
+    """
+    a, b, c, d = (np.asarray(x, dtype=float) for x in (a, b, c, d))
+    total = a + b + c + d
+    row1, row2, col1, col2 = a + b, c + d, a + c, b + d
+    expected = np.stack([row1 * col1, row1 * col2, row2 * col1, row2 * col2]) / total
+    diff = np.abs(a - row1 * col1 / total)             # |O − E| is the same in every cell of a 2x2
+    diff = diff - np.minimum(0.5, diff)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        stat = (diff ** 2 * (1 / expected)).sum(axis=0)
+    return stat, chi2.sf(stat, 1), expected.min(axis=0)
+
+
+def _ratio(num, den):
+    """num / den, or NaN when den is 0 (e.g. a day with no stop events)."""
+    return num / den if den > 0 else np.nan
+
+
+def boarding_bias(stats):
+    """Binomial test of each vehicle's boarding-stop share against the system rate."""
+    system_boarding_rate = _ratio(stats['boarding_stops'].sum(), stats['stops'].sum())
+    out = stats[['stops', 'boarding_stops']].copy()
+    out['boarding_rate'] = out['boarding_stops'] / out['stops']
+    out['p_value'] = binomtest_pvalues(out['boarding_stops'], out['stops'], system_boarding_rate)
+    return system_boarding_rate, out
+
+
+def gps_bias(stats):
+    """t-test of each vehicle's mean RELPOS (>= 10 measurements) against the overall mean."""
+    n = stats['count'].sum()
+    overall_mean = _ratio((stats['count'] * stats['mean'].fillna(0)).sum(), n)
+    dev = stats['mean'].fillna(0) - overall_mean
+    overall_std = np.sqrt(_ratio((stats['m2'].fillna(0) + stats['count'] * dev ** 2).sum(), n))
+    out = stats[stats['count'] >= 10][['count', 'mean']].copy()
+    var = stats.loc[out.index, 'm2'] / (out['count'] - 1)
+    out['std'] = np.sqrt(var)
+    out['t_statistic'], out['p_value'] = ttest_1samp_pvalues(out['count'], out['mean'], var, overall_mean)
+    return (int(n), overall_mean, overall_std), out
+
+
+def offs_ons_bias(stats):
+    """Chi-square test of each vehicle's offs/ons split against the rest of the system."""
+    system_total_offs = stats['offs'].sum()
+    system_total_ons = stats['ons'].sum()
+    out = stats[['offs', 'ons']].copy()
+    out['total'] = out['offs'] + out['ons']
+    out = out[out['total'] > 0]
+    out['chi2'], out['p_value'], min_expected = chi2_2x2_pvalues(
+        out['offs'], out['ons'], system_total_offs - out['offs'], system_total_ons - out['ons'])
+    return (system_total_offs, system_total_ons), out[min_expected >= 5]
+
+
+def find_biased_vehicles(stats, alpha=0.05):
     print("\n=== bias analysis ===")
     
-    total_stops = len(data_frame)
-    stops_with_boarding = len(data_frame[data_frame['ons'] >= 1])
-    system_boarding_rate = stops_with_boarding / total_stops
+    system_boarding_rate, per_vehicle = boarding_bias(stats)
     print(f"Overall system boarding rate: {system_boarding_rate:.4f} ({system_boarding_rate*100:.2f}%)")
     
-    vehicles = data_frame['vehicle_number'].unique()
     biased_vehicles = []
     
-    print(f"\nAnalyzing {len(vehicles)} vehicles...")
+    print(f"\nAnalyzing {len(per_vehicle)} vehicles...")
     print("Vehicle id | total stops | stops w/ boarding | boarding rate | p-value")
     print("-" * 70)
     
-    for vehicle_id in vehicles:
-        vehicle_data = data_frame[data_frame['vehicle_number'] == vehicle_id]
-        
-        n_stops = len(vehicle_data)
-        n_boarding_stops = len(vehicle_data[vehicle_data['ons'] >= 1])
-        vehicle_boarding_rate = n_boarding_stops / n_stops
-        
-        result = binomtest(n_boarding_stops, n_stops, system_boarding_rate)
-        p_value = result.pvalue
-        
+    for vehicle_id, n_stops, n_boarding_stops, vehicle_boarding_rate, p_value in per_vehicle.itertuples():
         if p_value < alpha:
             biased_vehicles.append({
                 'vehicle_id': vehicle_id,
@@ -147,49 +475,35 @@ def find_biased_vehicles(data_frame, alpha=0.05):
     return biased_vehicles
 
 
-def find_biased_gps_vehicles(data_frame, alpha=0.005):
+def find_biased_gps_vehicles(stats, alpha=0.005):
     print("\n=== gps bias analysis ===")
     
-    all_relpos_values = data_frame['RELPOS'].dropna().values
-    overall_mean = all_relpos_values.mean()
-    overall_std = all_relpos_values.std()
+    (n_relpos, overall_mean, overall_std), per_vehicle = gps_bias(stats)
     
     print(f"Overall RELPOS statistics:")
     print(f"  Mean: {overall_mean:.6f}")
     print(f"  Standard deviation: {overall_std:.6f}")
-    print(f"  Total RELPOS measurements: {len(all_relpos_values):,}")
+    print(f"  Total RELPOS measurements: {n_relpos:,}")
     
-    vehicles = data_frame['vehicle_number'].unique()
     biased_gps_vehicles = []
     
-    print(f"\nAnalyzing GPS bias for {len(vehicles)} vehicles...")
+    print(f"\nAnalyzing GPS bias for {len(stats)} vehicles...")
     print("Vehicle id | relpos count | vehicle mean | vehicle std | p-value")
     print("-" * 70)
     
-    for vehicle_id in vehicles:
-        vehicle_data = data_frame[data_frame['vehicle_number'] == vehicle_id]
-        vehicle_relpos = vehicle_data['RELPOS'].dropna()
-        
-        if len(vehicle_relpos) < 10:
-            continue
-            
-        vehicle_mean = vehicle_relpos.mean()
-        vehicle_std = vehicle_relpos.std()
-        
-        t_stat, p_value = ttest_1samp(vehicle_relpos, overall_mean)
-        
+    for vehicle_id, n, vehicle_mean, vehicle_std, t_stat, p_value in per_vehicle.itertuples():
         if p_value < alpha:
             biased_gps_vehicles.append({
                 'vehicle_id': vehicle_id,
-                'relpos_count': len(vehicle_relpos),
+                'relpos_count': n,
                 'vehicle_mean': vehicle_mean,
                 'vehicle_std': vehicle_std,
                 'p_value': p_value,
                 't_statistic': t_stat
             })
-            print(f"{vehicle_id:10} | {len(vehicle_relpos):12} | {vehicle_mean:12.6f} | {vehicle_std:11.6f} | {p_value:.6f} *")
+            print(f"{vehicle_id:10} | {n:12} | {vehicle_mean:12.6f} | {vehicle_std:11.6f} | {p_value:.6f} *")
         else:
-            print(f"{vehicle_id:10} | {len(vehicle_relpos):12} | {vehicle_mean:12.6f} | {vehicle_std:11.6f} | {p_value:.6f}")
+            print(f"{vehicle_id:10} | {n:12} | {vehicle_mean:12.6f} | {vehicle_std:11.6f} | {p_value:.6f}")
     
     print(f"\nVehicles with significantly biased GPS data (p < {alpha}):")
     if biased_gps_vehicles:
@@ -202,17 +516,16 @@ def find_biased_gps_vehicles(data_frame, alpha=0.005):
     return biased_gps_vehicles
 
 
-def find_biased_offs_ons_vehicles(data_frame, alpha=0.05):
+def find_biased_offs_ons_vehicles(stats, alpha=0.05):
     """
     Find vehicles with biased offs/ons ratios using chi-square test.
     """
     print("\n=== offs/ons bias analysis ===")
     
-    system_total_offs = data_frame['offs'].sum()
-    system_total_ons = data_frame['ons'].sum()
+    (system_total_offs, system_total_ons), per_vehicle = offs_ons_bias(stats)
     system_total_passengers = system_total_offs + system_total_ons
-    system_offs_proportion = system_total_offs / system_total_passengers
-    system_ons_proportion = system_total_ons / system_total_passengers
+    system_offs_proportion = _ratio(system_total_offs, system_total_passengers)
+    system_ons_proportion = _ratio(system_total_ons, system_total_passengers)
     
     print(f"System-wide passenger activity:")
     print(f"  Total offs: {system_total_offs:,}")
@@ -220,36 +533,16 @@ def find_biased_offs_ons_vehicles(data_frame, alpha=0.05):
     print(f"  Offs proportion: {system_offs_proportion:.4f} ({system_offs_proportion*100:.2f}%)")
     print(f"  Ons proportion: {system_ons_proportion:.4f} ({system_ons_proportion*100:.2f}%)")
     
-    vehicles = data_frame['vehicle_number'].unique()
     biased_offs_ons_vehicles = []
     
-    print(f"\nAnalyzing offs/ons bias for {len(vehicles)} vehicles...")
+    print(f"\nAnalyzing offs/ons bias for {len(stats)} vehicles...")
     print("Vehicle id | total offs | total ons | offs % | ons % | p-value")
     print("-" * 65)
     
-    for vehicle_id in vehicles:
-        vehicle_data = data_frame[data_frame['vehicle_number'] == vehicle_id]
-        
-        v_offs = int(vehicle_data['offs'].sum())
-        v_ons = int(vehicle_data['ons'].sum())
-        v_total = v_offs + v_ons
-        
-        if v_total == 0:
-            continue
-            
+    for vehicle_id, v_offs, v_ons, v_total, chi2_stat, p_value in per_vehicle.itertuples():
         vehicle_offs_proportion = v_offs / v_total
         vehicle_ons_proportion = v_ons / v_total
         
-        html_table = [
-            [v_offs, v_ons],
-            [system_total_offs - v_offs, system_total_ons - v_ons]
-        ]
-        
-        chi2_stat, p_value, dof, expected = chi2_contingency(html_table)
-        
-        if (expected < 5).any():
-            continue
-        
         if p_value < alpha:
             biased_offs_ons_vehicles.append({
                 'vehicle_id': vehicle_id,
@@ -277,18 +570,102 @@ def find_biased_offs_ons_vehicles(data_frame, alpha=0.05):
     return biased_offs_ons_vehicles
 
 
-analyze_stop_events(stops_df)
+def rolling_bias(daily, window, alpha=0.05, gps_alpha=0.005):
+    """
+    Run the three tests over every *window*-day run of *daily* (DayStats in
+    date order) by merging the per-day statistics; returns the vehicles
+    flagged by each test per window.
+    """
+    rows = []
+    for i in range(window - 1, len(daily)):
+        days = daily[i - window + 1:i + 1]
+        stops = merge_stop_stats([d.stops for d in days])
+        relpos = merge_relpos_stats([d.relpos for d in days])
+        boarding = boarding_bias(stops)[1]
+        gps = gps_bias(relpos)[1] if relpos['count'].sum() else boarding.iloc[:0]
+        offs_ons = offs_ons_bias(stops)[1]
+        rows.append({
+            'start':    days[0].day,
+            'end':      days[-1].day,
+            'boarding': boarding.index[boarding['p_value'] < alpha].tolist(),
+            'gps':      gps.index[gps['p_value'] < gps_alpha].tolist(),
+            'offs_ons': offs_ons.index[offs_ons['p_value'] < alpha].tolist(),
+        })
+    return pd.DataFrame(rows)
+
+
+def single_day_report(day, data_dir=".", locations=(6913,), vehicles=(4062,)):
+    stops_df = load_stop_events(Path(data_dir) / STOP_EVENTS_HTML.format(day=day), day)
+
+    # Verify
+    print(f"Data loading complete. Total stop events available: {len(stops_df):,}")
+    check_event_count(day, len(stops_df))
+    memory_report("Stop events", stops_df)
+
+    analyze_stop_events(stops_df)
+
+    analyze_specific_cases(StopIndex(stops_df), locations, vehicles)
+
+    vehicle_stats = stop_stats(stops_df)
+    find_biased_vehicles(vehicle_stats)
+
+    print("\nloading gps relpos data...")
+    gps_df = load_relpos(Path(data_dir) / RELPOS_CSV.format(day=day))
+    print(f"GPS data loaded: {len(gps_df):,} RELPOS measurements")
+    memory_report("RELPOS", gps_df)
 
-analyze_specific_cases(stops_df)
+    find_biased_gps_vehicles(relpos_stats(gps_df))
 
-biased_vehicles = find_biased_vehicles(stops_df)
+    find_biased_offs_ons_vehicles(vehicle_stats)
 
-print("\nloading gps relpos data...")
-gps_df = pd.read_csv("trimet_relpos_2022-12-07.csv")
-print(f"GPS data loaded: {len(gps_df):,} RELPOS measurements")
 
-gps_df = gps_df.rename(columns={'VEHICLE_NUMBER': 'vehicle_number'})
+def multi_day_report(days, data_dir=".", workers=1, window=0):
+    daily = collect_day_stats(days, data_dir, workers)
+    if not daily:
+        raise SystemExit("no stop-event files found for the requested dates")
+
+    print(f"Per-vehicle statistics for {len(daily)} day(s):")
+    for d in daily:
+        print(f"  {d.day}: {d.events:,} stop events, {len(d.stops):,} vehicles, "
+              f"{int(d.relpos['count'].sum()):,} RELPOS measurements")
+        check_event_count(d.day, d.events)
+
+    print(f"\n### {daily[0].day} .. {daily[-1].day} ###")
+    stops = merge_stop_stats([d.stops for d in daily])
+    find_biased_vehicles(stops)
+    find_biased_gps_vehicles(merge_relpos_stats([d.relpos for d in daily]))
+    find_biased_offs_ons_vehicles(stops)
+
+    if window:
+        print(f"\n=== rolling {window}-day windows ===")
+        print("window                   | boarding | gps | offs/ons")
+        print("-" * 55)
+        for w in rolling_bias(daily, window).itertuples():
+            print(f"{w.start} .. {w.end} | {len(w.boarding):8} | {len(w.gps):3} | {len(w.offs_ons):8}"
+                  f"  {sorted(set(w.boarding) | set(w.gps) | set(w.offs_ons))}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Per-vehicle bias analysis of TriMet stop events.")
+    ap.add_argument("--start", default="2022-12-07", help="first service date (YYYY-MM-DD)")
+    ap.add_argument("--end", default=None, help="last service date (default: --start)")
+    ap.add_argument("--data-dir", default=".",
+                    help="directory holding trimet_stopevents_<day>.html / trimet_relpos_<day>.csv")
+    ap.add_argument("--window", type=int, default=0,
+                    help="also test every rolling window of this many days")
+    ap.add_argument("--location", type=int, action="append", metavar="ID",
+                    help="stop location to profile in the single-day report (repeatable; default 6913)")
+    ap.add_argument("--vehicle", type=int, action="append", metavar="ID",
+                    help="vehicle to profile in the single-day report (repeatable; default 4062)")
+    ap.add_argument("-j", "--workers", type=int, default=1, help="processes for per-day parsing (0 = all cores)")
+    args = ap.parse_args()
+
+    days = [d.date().isoformat() for d in pd.date_range(args.start, args.end or args.start)]
+    if len(days) == 1 and not args.window:
+        single_day_report(days[0], args.data_dir, args.location or (6913,), args.vehicle or (4062,))
+    else:
+        multi_day_report(days, args.data_dir, args.workers, args.window)
 
-biased_gps_vehicles = find_biased_gps_vehicles(gps_df)
 
-biased_offs_ons_vehicles = find_biased_offs_ons_vehicles(stops_df)
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,554 @@
+#!/usr/bin/env python3
+"""
+Pipeline benchmark suite with a JSON history and a regression check.
+
+    python bench_pipeline.py run [--only fetch,publish] [--rows 100k] [--seed 0]
+                                 [--warmup 1] [--repeat 5] [--label NAME]
+                                 [--history bench_history.json]
+    python bench_pipeline.py compare [--base -2] [--head -1] [--threshold 0.10]
+    python bench_pipeline.py list
+
+Every benchmark runs on the same seeded inputs from synth_trimet.py (and
+bench_emp_validated.generate for the employees file), generated once per
+--rows/--seed under .cache/bench/.  Each is run --warmup times untimed and
+--repeat times timed; the record keeps every wall time, the throughput at
+the median run, and latency percentiles -- per item where the stage has a
+natural unit (an HTTP request, a message), otherwise per run.
+
+`run` appends one entry (commit, host, parameters, results) to the history
+file.  `compare` matches two entries benchmark by benchmark and exits 1 if
+any throughput fell, or p95 latency rose, by more than --threshold, or if
+a benchmark that ran in the base run was skipped in the head run.
+Benchmarks whose dependencies are missing here (no Postgres for copy, no
+Flask for map_api) are recorded as skipped, not failed.
+
+    fetch          part2 fetch_vehicle() against a local HTTP server     requests
+    publish        part2 publish_records() into the local broker         messages
+    validate       part2 receiver to_row() (decode + 10 assertions)      messages
+    receive        local broker → subscriber → receiver to_row() + ack   messages
+    copy           COPY of the receiver's rows into a temp table         rows
+    map_api        part3 app._to_geojson() + JSON for 10k-point pages    requests
+    datatransform  datatransform.py on a trip CSV                        rows
+    emp_validated  dataValidation emp_validated.validate()               rows
+    detect_bias    DetectBias day stats (cold cache) + the three tests   stop events
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import logging
+import os
+import platform
+import runpy
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+from reporting import to_jsonable
+from synth_trimet import generate, parse_count
+from transport import BatchSettings, LocalBroker, LocalPublisher, LocalSubscriber
+
+ROOT = Path(__file__).resolve().parent
+for sub in ("projects/part2", "projects", "dataValidation", "DetectBias"):
+    sys.path.insert(0, str(ROOT / sub))
+os.environ.setdefault("PUBSUB_TRANSPORT", "local")     # part3.common picks a transport at import
+
+INPUT_DIR = ROOT / ".cache" / "bench"
+HISTORY = "bench_history.json"
+TRIP_CSV = "bc_trip259172515_230215.csv"               # the file datatransform.py reads
+DATATRANSFORM_ROWS = 20_000                            # it applies row-wise, so keep it small
+MAP_PAGES = 10
+
+
+class Skip(Exception):
+    """A benchmark that can't run here (missing service or package)."""
+
+
+# ─── Inputs ────────────────────────────────────────────────────────────────
+class Inputs:
+    """The fixed input set for one --rows/--seed, generated on first use."""
+
+    def __init__(self, rows, seed):
+        self.rows, self.seed = rows, seed
+        self.dir = INPUT_DIR / f"rows{rows}-seed{seed}"
+        manifest = self.dir / "manifest.json"
+        if not manifest.exists():
+            print(f"[INFO] generating inputs → {self.dir}")
+            with contextlib.redirect_stdout(io.StringIO()):
+                generate(str(self.dir), rows, seed)
+        self.manifest = json.loads(manifest.read_text())
+        self._records = None
+
+    @property
+    def records(self):
+        """(vehicle, records) blocks of bcsample.json, merged per vehicle."""
+        if self._records is None:
+            by_vehicle = {}
+            with open(self.dir / "bcsample.json") as f:
+                for line in f:
+                    if line.startswith("--- Vehicle ID:"):
+                        vid = int(line.split(":")[1].strip(" -\n"))
+                    elif line.startswith("["):
+                        by_vehicle.setdefault(vid, []).extend(json.loads(line))
+            self._records = by_vehicle
+        return self._records
+
+    @property
+    def messages(self):
+        return [json.dumps(r).encode() for recs in self.records.values() for r in recs]
+
+    def file(self, name, make):
+        path = self.dir / name
+        if not path.exists():
+            make(path)
+        return path
+
+
+# ─── Benchmarks ────────────────────────────────────────────────────────────
+BENCHMARKS = {}
+
+
+def benchmark(name, unit):
+    """Register *fn(inputs) -> (run, cleanup)*; run() returns (items, per-item latencies or None)."""
+    def register(fn):
+        BENCHMARKS[name] = (fn, unit)
+        return fn
+    return register
+
+
+def _quiet_receiver():
+    import fixed_receiver_part_2 as receiver
+    logging.getLogger("receiver").setLevel(logging.ERROR)   # one warning per rejected record otherwise
+    return receiver
+
+
+@benchmark("fetch", "requests")
+def bench_fetch(inputs):
+    import fixed_fetch_part_2 as fetch
+    bodies = {vid: json.dumps(recs).encode() for vid, recs in inputs.records.items()}
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            vid = int(parse_qs(urlparse(self.path).query)["vehicle_id"][0])
+            body = bodies.get(vid, b"[]")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}/api/getBreadCrumbs?vehicle_id="
+
+    def run():
+        lat = []
+        for vid in bodies:
+            t0 = time.perf_counter()
+            fetch.fetch_vehicle(vid, base_url)
+            lat.append(time.perf_counter() - t0)
+        return len(bodies), lat
+
+    def cleanup():
+        server.shutdown()
+        server.server_close()
+    return run, cleanup
+
+
+@benchmark("publish", "messages")
+def bench_publish(inputs):
+    import fixed_fetch_part_2 as fetch
+    records = [r for recs in inputs.records.values() for r in recs]
+
+    def run():
+        broker = LocalBroker()
+        broker.create_subscription("breadcrumbs-sub", "breadcrumbs")
+        publisher = LocalPublisher(broker, BatchSettings())
+        sent, done = np.zeros(len(records)), np.zeros(len(records))
+        for i, rec in enumerate(records):
+            sent[i] = time.perf_counter()
+            future, = fetch.publish_records(publisher, [rec])
+            future.add_done_callback(lambda _, i=i: done.__setitem__(i, time.perf_counter()))
+        publisher.stop()
+        return len(records), done - sent             # publish call → batch committed
+    return run, None
+
+
+@benchmark("validate", "messages")
+def bench_validate(inputs):
+    receiver = _quiet_receiver()
+    messages = inputs.messages
+
+    def run():
+        receiver.previous.clear()
+        for data in messages:
+            receiver.to_row(json.loads(data.decode()))
+        return len(messages), None
+    return run, None
+
+
+@benchmark("receive", "messages")
+def bench_receive(inputs):
+    receiver = _quiet_receiver()
+    messages = inputs.messages
+
+    def run():
+        receiver.previous.clear()
+        broker = LocalBroker()
+        broker.create_subscription("breadcrumbs-sub", "breadcrumbs")
+        lat = np.zeros(len(messages))
+        count = [0]
+        lock, finished = threading.Lock(), threading.Event()
+
+        def callback(msg):
+            receiver.to_row(json.loads(msg.data.decode()))
+            msg.ack()
+            with lock:
+                lat[count[0]] = time.perf_counter() - float(msg.attributes["t"])
+                count[0] += 1
+                if count[0] == len(messages):
+                    finished.set()
+
+        subscriber = LocalSubscriber(broker)
+        subscriber.subscribe("breadcrumbs-sub", callback)
+        publisher = LocalPublisher(broker)
+        for data in messages:
+            publisher.publish("breadcrumbs", data, t=repr(time.perf_counter()))
+        publisher.stop()
+        ok = finished.wait(timeout=600)
+        subscriber.close()
+        if not ok:
+            raise RuntimeError(f"only {count[0]:,} of {len(messages):,} messages delivered")
+        return len(messages), lat
+    return run, None
+
+
+@benchmark("copy", "rows")
+def bench_copy(inputs):
+    import psycopg2
+    try:
+        conn = psycopg2.connect(dbname=os.getenv("PG_DB", "trimet"), user=os.getenv("PG_USER", "postgres"),
+                                password=os.getenv("PG_PWD", ""), host=os.getenv("PG_HOST", "localhost"),
+                                port=int(os.getenv("PG_PORT", 5432)), connect_timeout=5)
+    except psycopg2.OperationalError as e:
+        raise Skip(f"no database ({str(e).strip().splitlines()[0]})")
+    conn.autocommit = True
+    cur = conn.cursor()
+    cur.execute("CREATE TEMP TABLE bench_breadcrumb (tstamp timestamp, latitude float8, "
+                "longitude float8, speed float8, trip_id integer)")
+    path = inputs.dir / "breadcrumb_copy.csv"
+    with open(path) as f:
+        rows = sum(1 for _ in f)
+
+    def run():
+        cur.execute("TRUNCATE bench_breadcrumb")
+        with open(path) as f:
+            cur.copy_expert("COPY bench_breadcrumb FROM STDIN WITH (FORMAT csv)", f)
+        return rows, None
+
+    def cleanup():
+        cur.close()
+        conn.close()
+    return run, cleanup
+
+
+@benchmark("map_api", "requests")
+def bench_map_api(inputs):
+    try:
+        from part3 import app
+    except ImportError as e:
+        raise Skip(f"{e.name or e} not installed")
+    import pandas as pd
+    crumbs = pd.read_csv(inputs.dir / "breadcrumb_copy.csv", header=None, parse_dates=[0],
+                         names=["ts", "latitude", "longitude", "speed", "trip_id"])
+    rng = np.random.default_rng(inputs.seed)
+    crumbs["route_id"] = rng.integers(1, 100, len(crumbs))
+    crumbs["vehicle_id"] = rng.integers(2901, 4601, len(crumbs))
+    crumbs["service_key"] = "W"
+    crumbs["direction"] = crumbs["trip_id"] % 2
+    crumbs["ts"] = crumbs["ts"].dt.to_pydatetime()
+    pages = [crumbs.sample(min(app.POINT_LIMIT, len(crumbs)), random_state=i).to_dict("records")
+             for i in range(MAP_PAGES)]
+
+    def run():
+        lat, features = [], 0
+        for rows in pages:
+            t0 = time.perf_counter()
+            geo = app._to_geojson(rows)
+            json.dumps(geo)
+            lat.append(time.perf_counter() - t0)
+            features += len(geo["features"])
+        return len(pages), lat
+    return run, None
+
+
+@benchmark("datatransform", "rows")
+def bench_datatransform(inputs):
+    def make(path):
+        with open(inputs.dir / "breadcrumbs.csv") as src, open(path, "w") as dst:
+            for i, line in enumerate(src):
+                if i > DATATRANSFORM_ROWS:
+                    break
+                dst.write(line)
+    trip_csv = inputs.file(TRIP_CSV, make)
+    with open(trip_csv) as f:
+        rows = sum(1 for _ in f) - 1
+
+    def run():
+        cwd = os.getcwd()
+        os.chdir(inputs.dir)
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                runpy.run_path(str(ROOT / "datatransform.py"), run_name="__main__")
+        finally:
+            os.chdir(cwd)
+        return rows, None
+    return run, None
+
+
+@benchmark("emp_validated", "rows")
+def bench_emp_validated(inputs):
+    from bench_emp_validated import generate as generate_employees
+    from emp_validated import validate
+    path = inputs.file("employees.csv", lambda p: generate_employees(str(p), inputs.rows, inputs.seed))
+
+    def run():
+        return validate(str(path))["rows"], None
+    return run, None
+
+
+@benchmark("detect_bias", "stop events")
+def bench_detect_bias(inputs):
+    import transform
+    days = inputs.manifest["days"]
+
+    def run():
+        cache = tempfile.mkdtemp(prefix="bench-detect-bias-")
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                daily = transform.collect_day_stats(days, str(inputs.dir), 1, cache)
+                stops = transform.merge_stop_stats([d.stops for d in daily])
+                relpos = transform.merge_relpos_stats([d.relpos for d in daily])
+                transform.boarding_bias(stops)
+                transform.gps_bias(relpos)
+                transform.offs_ons_bias(stops)
+        finally:
+            shutil.rmtree(cache, ignore_errors=True)
+        return sum(d.events for d in daily), None
+    return run, None
+
+
+# ─── Runner ────────────────────────────────────────────────────────────────
+def percentiles_ms(seconds):
+    p50, p95, p99 = np.percentile(np.asarray(seconds, dtype=float), [50, 95, 99]) * 1000
+    return {"p50": p50, "p95": p95, "p99": p99}
+
+
+def measure(name, inputs, warmup, repeat):
+    fn, unit = BENCHMARKS[name]
+    try:
+        run, cleanup = fn(inputs)
+    except Skip as e:
+        return {"unit": unit, "skipped": str(e)}
+    try:
+        for _ in range(warmup):
+            run()
+        walls, latencies, items = [], [], 0
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            items, lat = run()
+            walls.append(time.perf_counter() - t0)
+            if lat is not None:
+                latencies.extend(lat)
+    finally:
+        if cleanup:
+            cleanup()
+    median = float(np.median(walls))
+    return {
+        "unit": unit,
+        "items": items,
+        "wall_s": walls,
+        "median_s": median,
+        "min_s": min(walls),
+        "throughput": items / median,
+        "latency_basis": "item" if latencies else "run",
+        "latency_ms": percentiles_ms(latencies or walls),
+    }
+
+
+def git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                             text=True, timeout=10)
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=ROOT,
+                               capture_output=True, text=True, timeout=30).stdout.strip()
+        return out.stdout.strip() + ("+dirty" if dirty else "") if out.returncode == 0 else None
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+
+
+def load_history(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {"runs": []}
+
+
+def save_history(path, history):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(to_jsonable(history), f, indent=1)
+    os.replace(tmp, path)
+
+
+def print_results(results):
+    print(f"{'benchmark':<14} {'items':>10} {'unit':<12} {'median s':>9} {'per s':>12} "
+          f"{'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}  basis")
+    for name, r in results.items():
+        if "skipped" in r:
+            print(f"{name:<14} skipped: {r['skipped']}")
+            continue
+        lat = r["latency_ms"]
+        print(f"{name:<14} {r['items']:>10,} {r['unit']:<12} {r['median_s']:>9.3f} {r['throughput']:>12,.0f} "
+              f"{lat['p50']:>9.2f} {lat['p95']:>9.2f} {lat['p99']:>9.2f}  {r['latency_basis']}")
+
+
+def cmd_run(args):
+    names = [n for n in args.only.split(",") if n] if args.only else list(BENCHMARKS)
+    unknown = set(names) - set(BENCHMARKS)
+    if unknown:
+        raise SystemExit(f"unknown benchmark(s): {', '.join(sorted(unknown))} (have {', '.join(BENCHMARKS)})")
+
+    inputs = Inputs(parse_count(args.rows), args.seed)
+    results = {}
+    for name in names:
+        print(f"[INFO] {name} …", flush=True)
+        results[name] = measure(name, inputs, args.warmup, args.repeat)
+
+    entry = {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "label": args.label,
+        "commit": git_commit(),
+        "host": {"python": platform.python_version(), "platform": platform.platform(),
+                 "cpus": os.cpu_count()},
+        "params": {"rows": inputs.rows, "seed": inputs.seed, "warmup": args.warmup, "repeat": args.repeat},
+        "results": results,
+    }
+    history = load_history(args.history)
+    history["runs"].append(entry)
+    save_history(args.history, history)
+    print()
+    print_results(results)
+    print(f"\n[INFO] run #{len(history['runs']) - 1} → {args.history}")
+
+
+def select_run(runs, ref):
+    """A run by index (negative counts from the end) or by its latest --label."""
+    try:
+        return runs[int(ref)]
+    except ValueError:
+        pass
+    except IndexError:
+        raise SystemExit(f"no run #{ref} (history has {len(runs)})")
+    for run in reversed(runs):
+        if run.get("label") == ref:
+            return run
+    raise SystemExit(f"no run labelled {ref!r}")
+
+
+def compare(base, head, threshold):
+    """
+    Rows of (name, throughput change, p95 change, regressed, note) for every
+    benchmark that ran in *base*.  One that head skipped counts as a
+    regression; one head didn't select at all only gets a note.
+    """
+    rows = []
+    for name, b in base["results"].items():
+        if "skipped" in b:
+            continue
+        h = head["results"].get(name)
+        if h is None:
+            rows.append((name, None, None, False, "not run in head"))
+            continue
+        if "skipped" in h:
+            rows.append((name, None, None, True, f"skipped in head: {h['skipped']}"))
+            continue
+        d_tput = h["throughput"] / b["throughput"] - 1
+        d_p95 = h["latency_ms"]["p95"] / b["latency_ms"]["p95"] - 1 if b["latency_ms"]["p95"] else 0.0
+        rows.append((name, d_tput, d_p95, d_tput < -threshold or d_p95 > threshold, ""))
+    return rows
+
+
+def cmd_compare(args):
+    runs = load_history(args.history)["runs"]
+    if len(runs) < 2 and args.base == "-2":
+        raise SystemExit("need at least two runs to compare")
+    base, head = select_run(runs, args.base), select_run(runs, args.head)
+    if base["params"]["rows"] != head["params"]["rows"] or base["params"]["seed"] != head["params"]["seed"]:
+        print(f"[WARN] different inputs: {base['params']} vs {head['params']}")
+
+    print(f"base {base['timestamp']} {base.get('commit') or ''} {base.get('label') or ''}")
+    print(f"head {head['timestamp']} {head.get('commit') or ''} {head.get('label') or ''}")
+    print(f"\n{'benchmark':<14} {'throughput':>11} {'p95':>9}")
+    rows = compare(base, head, args.threshold)
+    for name, d_tput, d_p95, regressed, note in rows:
+        change = f"{d_tput:>+10.1%} {d_p95:>+9.1%}" if d_tput is not None else f"{'-':>10} {'-':>9}"
+        flags = "  ".join(f for f in ("REGRESSION" if regressed else "", note) if f)
+        print(f"{name:<14} {change}{'  ' + flags if flags else ''}")
+    regressions = [r[0] for r in rows if r[3]]
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0%}: {', '.join(regressions)}")
+        sys.exit(1)
+    print(f"\nno regressions beyond {args.threshold:.0%}")
+
+
+def cmd_list(args):
+    for i, run in enumerate(load_history(args.history)["runs"]):
+        ran = [n for n, r in run["results"].items() if "skipped" not in r]
+        print(f"#{i:<3} {run['timestamp']}  {run.get('commit') or '-':<14} {run.get('label') or '-':<12} "
+              f"rows={run['params']['rows']:,}  {', '.join(ran)}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark the pipeline stages and track regressions.")
+    ap.add_argument("--history", default=HISTORY, help="JSON history file")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    r = sub.add_parser("run", help="run benchmarks and append the results to the history")
+    r.add_argument("--only", default="", help="comma-separated subset of: " + ", ".join(BENCHMARKS))
+    r.add_argument("--rows", default="100k", help="breadcrumb rows in the synthetic inputs")
+    r.add_argument("--seed", type=int, default=0)
+    r.add_argument("--warmup", type=int, default=1)
+    r.add_argument("--repeat", type=int, default=5)
+    r.add_argument("--label", default=None, help="name this run for compare --base/--head")
+    r.set_defaults(fn=cmd_run)
+
+    c = sub.add_parser("compare", help="flag regressions between two runs (exit 1 if any)")
+    c.add_argument("--base", default="-2", help="run index or label (default: second to last)")
+    c.add_argument("--head", default="-1", help="run index or label (default: last)")
+    c.add_argument("--threshold", type=float, default=0.10, help="allowed relative slowdown")
+    c.set_defaults(fn=cmd_compare)
+
+    ls = sub.add_parser("list", help="list recorded runs")
+    ls.set_defaults(fn=cmd_list)
+
+    args = ap.parse_args()
+    args.fn(args)
+
+
+if __name__ == "__main__":
+    main()
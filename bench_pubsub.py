@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+End-to-end Pub/Sub throughput and latency on the local broker.
+
+    python bench_pubsub.py [--messages 100000] [--size 300] [--batch 100]
+                           [--outstanding 1000] [--workers 10] [--nack-rate 0.01]
+                           [--broker /tmp/pubsub-broker.sock]
+
+Publishes breadcrumb-sized JSON messages through transport.LocalPublisher
+and drains them with a LocalSubscriber whose callback acks (or, at
+--nack-rate, nacks once to exercise redelivery).  Reports publish and
+end-to-end rates and publish→callback latency percentiles.  Without
+--broker everything runs in this process; with it, messages cross the
+socket to a `python transport.py serve` broker.
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+
+import numpy as np
+
+from transport import BatchSettings, FlowControl, LocalTransport
+
+TOPIC, SUBSCRIPTION = "bench-topic", "bench-sub"
+
+
+def payload(i, size):
+    rec = {"EVENT_NO_TRIP": 259172515, "VEHICLE_ID": 4062, "ACT_TIME": 20000 + i, "METERS": i * 5,
+           "GPS_LATITUDE": 45.5, "GPS_LONGITUDE": -122.6, "OPD_DATE": "15FEB2023:00:00:00"}
+    data = json.dumps(rec)
+    return (data + " " * max(0, size - len(data))).encode()
+
+
+def run(transport, n, size, batch, outstanding, workers, nack_rate, seed=0):
+    transport.create_subscription(SUBSCRIPTION, TOPIC)
+    rng = random.Random(seed)
+    to_nack = {i for i in range(n) if rng.random() < nack_rate}
+    latencies = np.empty(n)
+    received, redelivered = 0, 0
+    lock, done = threading.Lock(), threading.Event()
+
+    def callback(msg):
+        nonlocal received, redelivered
+        seq = int(msg.attributes["seq"])
+        if seq in to_nack and msg.delivery_attempt == 1:
+            msg.nack()
+            return
+        latency = time.perf_counter() - float(msg.attributes["sent"])
+        msg.ack()
+        with lock:
+            latencies[received] = latency
+            received += 1
+            redelivered += msg.delivery_attempt > 1
+            if received == n:
+                done.set()
+
+    subscriber = transport.subscriber(max_workers=workers)
+    pull = subscriber.subscribe(SUBSCRIPTION, callback, FlowControl(max_messages=outstanding))
+    publisher = transport.publisher(BatchSettings(max_messages=batch))
+
+    t0 = time.perf_counter()
+    futures = [publisher.publish(TOPIC, payload(i, size), seq=str(i), sent=repr(time.perf_counter()))
+               for i in range(n)]
+    publisher.flush()
+    for f in futures:
+        f.result()
+    t_pub = time.perf_counter() - t0
+    finished = done.wait(timeout=max(60.0, n / 1000))
+    t_all = time.perf_counter() - t0
+    publisher.stop()
+    pull.cancel()
+    subscriber.close()
+    if not finished:
+        raise SystemExit(f"only {received:,} of {n:,} messages arrived")
+    return t_pub, t_all, latencies, redelivered
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark the local Pub/Sub broker end to end.")
+    ap.add_argument("--messages", type=int, default=100_000)
+    ap.add_argument("--size", type=int, default=300, help="message size in bytes")
+    ap.add_argument("--batch", type=int, default=100, help="publisher batch size (messages)")
+    ap.add_argument("--outstanding", type=int, default=1000, help="subscriber flow control (messages)")
+    ap.add_argument("--workers", type=int, default=10, help="callback threads")
+    ap.add_argument("--nack-rate", type=float, default=0.0, help="fraction nacked once, then redelivered")
+    ap.add_argument("--broker", default="", help="address of a served broker (default: in-process)")
+    args = ap.parse_args()
+
+    transport = LocalTransport(address=args.broker)
+    t_pub, t_all, lat, redelivered = run(transport, args.messages, args.size, args.batch,
+                                         args.outstanding, args.workers, args.nack_rate)
+    n = args.messages
+    print(f"{n:,} messages × {args.size} B  (batch {args.batch}, outstanding {args.outstanding}, "
+          f"{args.workers} workers, {'broker ' + args.broker if args.broker else 'in-process'})")
+    print(f"publish     {t_pub:8.2f} s  {n / t_pub:12,.0f} msg/s")
+    print(f"end-to-end  {t_all:8.2f} s  {n / t_all:12,.0f} msg/s")
+    p50, p95, p99 = np.percentile(lat, [50, 95, 99]) * 1000
+    print(f"latency ms  p50 {p50:.2f}  p95 {p95:.2f}  p99 {p99:.2f}  max {lat.max() * 1000:.2f}")
+    if args.nack_rate:
+        print(f"redelivered {redelivered:,}")
+
+
+if __name__ == "__main__":
+    main()
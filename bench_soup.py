@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Benchmark soup.extract_table() against the old regex pipeline on a saved
+copy of the results page.
+
+    python bench_soup.py [page.html] [--synthetic ROWS] [--repeat 5]
+
+A missing (or empty) page is downloaded from soup.URL and saved first;
+--synthetic writes a seeded page of the same layout instead (no network).
+"""
+
+import argparse
+import os
+import random
+import re
+import time
+
+import pandas as pd
+from bs4 import BeautifulSoup
+
+from soup import URL, extract_table, read_page, time_to_minutes, typed_results
+
+HEADER = ["Place", "Bib", "Name", "Gender", "City", "State", "Chip Time", "Chip Pace",
+          "Gender Place", "Age Group", "Age Group Place", "Time to Start", "Gun Time", "Team"]
+
+
+def generate(path, n_rows, seed=42):
+    rnd = random.Random(seed)
+
+    def hms(secs):
+        h, rem = divmod(int(secs), 3600)
+        return f"{h}:{rem // 60:02d}:{rem % 60:02d}" if h else f"{rem // 60}:{rem % 60:02d}"
+
+    rows = []
+    for place in range(1, n_rows + 1):
+        chip = 1800 + place * 5400 / n_rows + rnd.uniform(0, 60)
+        name = f"Runner {place}" if rnd.random() > 0.05 else f"Smith, Runner {place}"
+        cells = [place, rnd.randrange(1, 9999), name, rnd.choice("MF"), "Portland", "OR",
+                 hms(chip), hms(chip / 6.2), place // 2 + 1, rnd.choice(["20-29", "30-39", "40-49"]),
+                 place // 6 + 1, "0:05", hms(chip + 5), ""]
+        rows.append("<tr>" + "".join(f"<td>{c}</td>" for c in cells) + "</tr>")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("<html><head><title>Race results</title></head><body><table>\n<tr>"
+                + "".join(f"<th>{h}</th>" for h in HEADER) + "</tr>\n" + "\n".join(rows)
+                + "\n</table></body></html>\n")
+
+
+def save_page(url, path):
+    """Download *url* into memory, then move it into place, so a failed fetch leaves no file."""
+    data = read_page(url)
+    if not data:
+        raise SystemExit(f"{url} returned an empty page")
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def legacy_extract(html):
+    """The original soup.py pipeline: str(cells) → regex tag strip → comma split."""
+    soup = BeautifulSoup(html, 'lxml')
+    list_rows = []
+    for row in soup.find_all('tr'):
+        cells = row.find_all('td')
+        list_rows.append(re.sub(re.compile('<.*?>'), '', str(cells)))
+    df1 = pd.DataFrame(list_rows)[0].str.split(',', expand=True)
+    header = BeautifulSoup(str(soup.find_all('th')), "lxml").get_text()
+    df3 = pd.DataFrame([header])[0].str.split(',', expand=True)
+    df4 = pd.concat([df3, df1])
+    df5 = df4.rename(columns=df4.iloc[0])
+    df6 = df5.dropna(axis=0, how='any')
+    return df6.drop(df6.index[0])
+
+
+def legacy_minutes(times):
+    time_mins = []
+    for i in times:
+        parts = i.strip().split(':')
+        if len(parts) == 3:
+            h, m, s = parts
+        elif len(parts) == 2:
+            h, m = parts
+            s = 0
+        else:
+            continue
+        time_mins.append((int(h) * 3600 + int(m) * 60 + int(s)) / 60)
+    return time_mins
+
+
+def best_of(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("page", nargs="?", default="2017GPTR10K.html")
+    ap.add_argument("--synthetic", type=int, default=None, metavar="ROWS",
+                    help="generate a seeded page with this many rows instead of downloading")
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+
+    if args.synthetic:
+        generate(args.page, args.synthetic)
+    elif not os.path.exists(args.page) or os.path.getsize(args.page) == 0:
+        print(f"Saving {URL} → {args.page}")
+        save_page(URL, args.page)
+
+    html = read_page(args.page)
+    print(f"{args.page}: {len(html) / 1e6:.2f} MB")
+
+    t_old, old = best_of(lambda: legacy_extract(html), args.repeat)
+    t_new, new = best_of(lambda: extract_table(html), args.repeat)
+    print(f"table extraction  regex pipeline {t_old * 1e3:9.1f} ms ({len(old):,} rows)")
+    print(f"                  lxml one pass  {t_new * 1e3:9.1f} ms ({len(new):,} rows)  {t_old / t_new:5.1f}x")
+
+    gun = new["Gun Time"]
+    t_old, _ = best_of(lambda: legacy_minutes(gun.tolist()), args.repeat)
+    t_new, _ = best_of(lambda: time_to_minutes(gun), args.repeat)
+    print(f"time → minutes    split loop     {t_old * 1e3:9.1f} ms")
+    print(f"                  vectorized     {t_new * 1e3:9.1f} ms  {t_old / t_new:5.1f}x")
+
+    t_typed, typed = best_of(lambda: typed_results(extract_table(html)), args.repeat)
+    print(f"extract + types   total          {t_typed * 1e3:9.1f} ms  "
+          f"({typed.memory_usage(deep=True).sum() / 1e6:.2f} MB in memory)")
+
+
+if __name__ == "__main__":
+    main()
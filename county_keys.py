@@ -0,0 +1,60 @@
+"""
+Integer county keys for the county-level joins in integrate.py.
+
+The USAFacts files already carry the 5-digit county FIPS code, so the key
+table maps (County, full State name) → countyFIPS once and caches it as
+Parquet next to the trimmed inputs.  It also carries the state abbreviation,
+absorbing abbrev_to_us_state, so datasets keyed by name (e.g. ACS) can be
+re-keyed with a single hash lookup instead of joining on "County, State"
+strings.
+"""
+
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+from us_state_abbrev import abbrev_to_us_state
+
+from csv_cache import cache_frame, read_csv_cached
+
+KEY_COLS = ['countyFIPS', 'County Name', 'State']
+KEY_DTYPES = {'countyFIPS': 'int32', 'County Name': 'object', 'State': 'object'}
+
+
+def _build_key_table(src: str) -> pd.DataFrame:
+    raw = read_csv_cached(src, KEY_COLS, KEY_DTYPES)
+    raw = raw[raw['countyFIPS'] > 0]                      # drop "Statewide Unallocated"
+    table = pd.DataFrame({
+        'key':         raw['countyFIPS'].astype('int32'),
+        'County':      raw['County Name'].str.rstrip(),
+        'StateAbbrev': raw['State'],
+        'State':       raw['State'].map(abbrev_to_us_state),
+    })
+    return (table.dropna(subset=['State'])
+                 .drop_duplicates('key')
+                 .sort_values('key', ignore_index=True))
+
+
+def load_key_table(src: str = 'covid_confirmed_usafacts.csv') -> pd.DataFrame:
+    """
+    Return the cached key table (key, County, StateAbbrev, State) with the
+    name columns stored as categoricals.
+    """
+    table = cache_frame('county_keys', [src], lambda: _build_key_table(src))
+    for col in ('County', 'StateAbbrev', 'State'):
+        table[col] = table[col].astype('category')
+    return table
+
+
+def keys_for(county: pd.Series, state: pd.Series, table: pd.DataFrame) -> np.ndarray:
+    """
+    Map (county name, full state name) pairs to integer keys; unmatched
+    pairs get -1.  Uses one MultiIndex hash lookup over the key table.
+    """
+    lookup = pd.MultiIndex.from_arrays([table['County'].astype(str),
+                                        table['State'].astype(str)])
+    pos = lookup.get_indexer(pd.MultiIndex.from_arrays([county.astype(str),
+                                                        state.astype(str)]))
+    keys = table['key'].to_numpy()[pos]
+    keys[pos < 0] = -1
+    return keys
@@ -0,0 +1,85 @@
+"""
+Columnar on-disk cache for wide CSV inputs.
+
+read_csv_cached() parses only the requested columns (usecols + dtype declared
+up front) and keeps the trimmed frame as Parquet under CACHE_DIR.  An entry is
+reused while the source file's mtime and size are unchanged, so re-runs skip
+CSV parsing entirely.  cache_frame() applies the same policy to any frame
+derived from one or more source files.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import pandas as pd
+
+CACHE_DIR = Path(os.getenv("CSV_CACHE_DIR", ".cache"))
+
+
+def _cache_key(src: Path, usecols: List[str], dtype: Optional[Dict[str, str]]) -> str:
+    spec = {
+        "src":     str(src.resolve()),
+        "usecols": list(usecols),
+        "dtype":   {k: str(v) for k, v in sorted((dtype or {}).items())},
+    }
+    return hashlib.sha1(json.dumps(spec, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def _source_stamp(src: Path) -> Dict[str, int]:
+    st = src.stat()
+    return {"mtime_ns": st.st_mtime_ns, "size": st.st_size}
+
+
+def cache_frame(name: str,
+                sources: List[str],
+                build: Callable[[], pd.DataFrame],
+                cache_dir: Path = CACHE_DIR) -> pd.DataFrame:
+    """
+    Return the frame cached as *name*, rebuilding it with *build()* whenever
+    any of the *sources* files changed since the entry was written.
+    """
+    data_path = cache_dir / f"{name}.parquet"
+    meta_path = cache_dir / f"{name}.json"
+    stamp = {str(Path(p).resolve()): _source_stamp(Path(p)) for p in sources}
+
+    if data_path.exists() and meta_path.exists():
+        try:
+            if json.loads(meta_path.read_text()) == stamp:
+                return pd.read_parquet(data_path)
+        except (ValueError, OSError, ImportError):
+            pass                                  # stale / unreadable → rebuild
+
+    df = build()
+
+    try:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = data_path.with_suffix(".tmp")
+        df.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, data_path)
+        meta_path.write_text(json.dumps(stamp))
+    except (ImportError, OSError) as e:           # no pyarrow / read-only fs
+        print(f"[WARN] cache disabled for {name}: {e}")
+
+    return df
+
+
+def read_csv_cached(path: str,
+                    usecols: List[str],
+                    dtype: Optional[Dict[str, str]] = None,
+                    cache_dir: Path = CACHE_DIR) -> pd.DataFrame:
+    """
+    Return *usecols* of the CSV at *path*, served from the Parquet cache when
+    the source has not changed since the entry was written.
+    """
+    src = Path(path)
+    name = f"{src.stem}.{_cache_key(src, usecols, dtype)}"
+    return cache_frame(
+        name, [path],
+        lambda: pd.read_csv(src, usecols=usecols, dtype=dtype)[list(usecols)],
+        cache_dir,
+    )
@@ -0,0 +1,33 @@
+"""
+Line-aligned byte ranges of a CSV file, for process-pool workers that each
+parse one range.  Kept free of heavy imports so any script can use it.
+"""
+
+import os
+
+MAX_RANGE_BYTES = 64 * 1024 * 1024     # upper bound on one worker task's byte range
+
+def line_aligned_ranges(path, n_ranges, data_start=0):
+    """
+    Split [data_start, EOF) into about *n_ranges* byte ranges whose edges fall
+    on line boundaries.  Assumes no quoted field contains a newline.
+    """
+    size = os.path.getsize(path)
+    cuts = [data_start]
+    with open(path, 'rb') as f:
+        for i in range(1, n_ranges):
+            target = data_start + (size - data_start) * i // n_ranges
+            if target <= cuts[-1]:
+                continue
+            f.seek(target - 1)
+            f.readline()                     # finish the line containing target-1
+            pos = f.tell()
+            if cuts[-1] < pos < size:
+                cuts.append(pos)
+    cuts.append(size)
+    return list(zip(cuts[:-1], cuts[1:]))
+
+def worker_ranges(path, workers, data_start=0):
+    """About four ranges per worker, more if needed to keep each under MAX_RANGE_BYTES."""
+    n_ranges = max(workers * 4, -(-(os.path.getsize(path) - data_start) // MAX_RANGE_BYTES))
+    return line_aligned_ranges(path, n_ranges, data_start)
@@ -1,75 +1,195 @@
 #!/usr/bin/env python3
+import argparse
 import csv
-from datetime import datetime
+import io
+import os
+from array import array
 from collections import Counter
-from scipy.stats import shapiro
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from datetime import date
 
-def main():
-    invalid_name = 0
-    invalid_hire = 0
-    invalid_birth_hire = 0
-    invalid_manager = 0
-
-    # ——— Pass 1: gather all employee IDs ———
-    all_ids = set()
-    with open('employees.csv', newline='', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            try:
-                all_ids.add(int(row['eid']))
-            except (ValueError, KeyError):
-                pass
-
-    # ——— Pass 2: validate row‐level assertions ———
-    salaries = []
-    with open('employees.csv', newline='', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            # 1) Name non‐null
-            if not row.get('name','').strip():
-                invalid_name += 1
-
-            # 2) Hire date ≥ 2015‑01‑01
-            try:
-                hire_dt = datetime.strptime(row.get('hire_date','').strip(), '%Y-%m-%d')
-                if hire_dt < datetime(2015, 1, 1):
-                    invalid_hire += 1
-            except ValueError:
-                invalid_hire += 1
-
-            # 3) Birth date < hire date
-            try:
-                birth_dt = datetime.strptime(row.get('birth_date','').strip(), '%Y-%m-%d')
-                if birth_dt >= hire_dt:
-                    invalid_birth_hire += 1
-            except (ValueError, UnboundLocalError):
-                invalid_birth_hire += 1
-
-            # 4) Manager exists
-            rep = row.get('reports_to','').strip()
-            try:
-                if int(rep) not in all_ids:
-                    invalid_manager += 1
-            except ValueError:
-                invalid_manager += 1
-
-            # collect salary for normality test
-            try:
-                salaries.append(float(row.get('salary','')))
-            except ValueError:
-                pass
+from byte_ranges import worker_ranges
+from rules import NORMALITY_METHODS, Reservoir, RunningMoments, normality_test
+
+MIN_HIRE = date(2015, 1, 1)
+SALARY_BUFFER = 65_536                 # salaries folded into the accumulators per batch
+
+@dataclass
+class Partial:
+    """Mergeable per-chunk validation state."""
+    rows: int = 0
+    invalid_name: int = 0
+    invalid_hire: int = 0
+    invalid_birth_hire: int = 0
+    invalid_manager: int = 0
+    seen_ids: set = field(default_factory=set)
+    pending: Counter = field(default_factory=Counter)   # reports_to ids not yet seen as an eid
+    salaries: array = field(default_factory=lambda: array('d'))   # unflushed batch
+    moments: RunningMoments = field(default_factory=RunningMoments)
+    reservoir: Reservoir = field(default_factory=Reservoir)
+
+    def flush_salaries(self):
+        if self.salaries:
+            self.moments.update(self.salaries)
+            self.reservoir.extend(self.salaries)
+            self.salaries = array('d')
+
+    def merge(self, other):
+        self.rows += other.rows
+        self.invalid_name += other.invalid_name
+        self.invalid_hire += other.invalid_hire
+        self.invalid_birth_hire += other.invalid_birth_hire
+        self.invalid_manager += other.invalid_manager
+        self.seen_ids |= other.seen_ids
+        self.pending.update(other.pending)
+        self.flush_salaries()
+        other.flush_salaries()
+        self.moments.merge(other.moments)
+        self.reservoir.merge(other.reservoir)
+        return self
+
+def parse_iso_date(s):
+    """Fast fixed-format YYYY-MM-DD parse; returns None if malformed."""
+    s = s.strip()
+    if len(s) != 10 or s[4] != '-' or s[7] != '-':
+        return None
+    try:
+        return date.fromisoformat(s)
+    except ValueError:
+        return None
+
+def _validate_rows(reader, header):
+    """Apply the row-level assertions to every row of *reader*."""
+    p = Partial()
+    i_eid, i_name = header.index('eid'), header.index('name')
+    i_birth, i_hire = header.index('birth_date'), header.index('hire_date')
+    i_salary, i_rep = header.index('salary'), header.index('reports_to')
+    width = len(header)
+    seen_ids, pending, salaries = p.seen_ids, p.pending, p.salaries
+
+    for row in reader:
+        if not row:                          # blank line
+            continue
+        p.rows += 1
+        if len(row) < width:
+            row = row + [''] * (width - len(row))
+
+        try:
+            seen_ids.add(int(row[i_eid]))
+        except ValueError:
+            pass
+
+        # 1) Name non‐null
+        if not row[i_name].strip():
+            p.invalid_name += 1
+
+        # 2) Hire date ≥ 2015‑01‑01
+        hire_dt = parse_iso_date(row[i_hire])
+        if hire_dt is None or hire_dt < MIN_HIRE:
+            p.invalid_hire += 1
+
+        # 3) Birth date < hire date
+        birth_dt = parse_iso_date(row[i_birth])
+        if hire_dt is None or birth_dt is None or birth_dt >= hire_dt:
+            p.invalid_birth_hire += 1
+
+        # 4) Manager exists (forward references resolved in _finish)
+        try:
+            rep = int(row[i_rep])
+            if rep not in seen_ids:
+                pending[rep] += 1
+        except ValueError:
+            p.invalid_manager += 1
+
+        # collect salary for normality test
+        try:
+            salaries.append(float(row[i_salary]))
+        except ValueError:
+            pass
+        if len(salaries) >= SALARY_BUFFER:
+            p.flush_salaries()
+            salaries = p.salaries
+
+    p.flush_salaries()
+    return p
+
+def _finish(p, normality='auto'):
+    """Resolve manager references against all ids and run the global assertions."""
+    unknown = sum(n for rep, n in p.pending.items() if rep not in p.seen_ids)
 
     # ——— 5) Global normality assertion on salaries ———
-    stat, p_value = shapiro(salaries)
-    normality_passed = (p_value >= 0.05)
+    p.flush_salaries()
+    norm = normality_test(normality, p.moments, p.reservoir)
+
+    return {
+        'rows':               p.rows,
+        'invalid_name':       p.invalid_name,
+        'invalid_hire':       p.invalid_hire,
+        'invalid_birth_hire': p.invalid_birth_hire,
+        'invalid_manager':    p.invalid_manager + unknown,
+        'normality_method':   norm['method'],
+        'p_value':            norm['p_value'],
+        'normality_passed':   norm['passed'],
+    }
+
+def _read_header(path):
+    with open(path, 'rb') as f:
+        line = f.readline()
+        return next(csv.reader([line.decode('utf-8-sig')])), f.tell()
+
+def _validate_range(task):
+    path, start, end, header = task
+    with open(path, 'rb') as f:
+        f.seek(start)
+        text = f.read(end - start).decode('utf-8')
+    return _validate_rows(csv.reader(io.StringIO(text, newline='')), header)
+
+def validate(path='employees.csv', normality='auto'):
+    """Validate *path* in a single pass and return the violation counts."""
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        return _finish(_validate_rows(reader, header), normality)
+
+def validate_parallel(path='employees.csv', workers=None, normality='auto'):
+    """
+    Validate *path* across a process pool: row-level assertions run per
+    line-aligned byte range, and the per-range counters, id sets and salary
+    moments/reservoirs are merged before the global checks.
+    """
+    workers = workers or os.cpu_count() or 1
+    header, data_start = _read_header(path)
+    tasks = [(path, s, e, header) for s, e in worker_ranges(path, workers, data_start)]
+
+    total = Partial()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for part in pool.map(_validate_range, tasks):
+            total.merge(part)
+    return _finish(total, normality)
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('path', nargs='?', default='employees.csv')
+    ap.add_argument('-j', '--workers', type=int, default=1,
+                    help='processes for parallel validation (0 = all cores, 1 = single pass)')
+    ap.add_argument('--normality', choices=NORMALITY_METHODS, default='auto',
+                    help='salary normality test (auto: Shapiro–Wilk up to 5000 rows, K² beyond)')
+    args = ap.parse_args()
+
+    if args.workers == 1:
+        r = validate(args.path, args.normality)
+    else:
+        r = validate_parallel(args.path, args.workers or None, args.normality)
 
     # ——— Report everything ———
-    print(f'Name violations:               {invalid_name}')
-    print(f'Hire‐date < 2015‑01‑01:        {invalid_hire}')
-    print(f'Birth ≥ Hire date:             {invalid_birth_hire}')
-    print(f'Unknown manager violations:    {invalid_manager}')
-    print(f'Shapiro–Wilk p‑value:         {p_value:.5f}')
-    print('Salaries normally distributed: ', 'YES' if normality_passed else 'NO')
+    print(f'Name violations:               {r["invalid_name"]}')
+    print(f'Hire‐date < 2015‑01‑01:        {r["invalid_hire"]}')
+    print(f'Birth ≥ Hire date:             {r["invalid_birth_hire"]}')
+    print(f'Unknown manager violations:    {r["invalid_manager"]}')
+    print(f'Normality test:                {r["normality_method"]}')
+    print(f'Normality p‑value:             {r["p_value"]:.5f}')
+    print('Salaries normally distributed: ', 'YES' if r['normality_passed'] else 'NO')
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
@@ -1,9 +1,204 @@
+#!/usr/bin/env python3
+"""
+Streaming histogram of one CSV column.
+
+    python histogram.py [employees.csv] [--column salary] [--bins 30]
+                        [--range LO HI] [--json out.json] [--plots DIR] [--show] [-j N]
+
+Only the requested column is read, in chunks, into a constant-memory
+StreamingHistogram.  Without --range the bins are fixed-width on a
+power-of-two grid that coarsens (pairs of bins merge) whenever a value falls
+outside it, so partial histograms from parallel workers always merge
+exactly.  Counts go to JSON; a bar chart is drawn only with --plots/--show.
+With -j each worker parses line-aligned byte ranges of at most
+MAX_RANGE_BYTES, so memory stays flat as the file grows.
+"""
+
+import argparse
+import io
+import math
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
-
-df = pd.read_csv('employees.csv')
-plt.hist(df['salary'].dropna(), bins=30)
-plt.title('Salary Distribution')
-plt.xlabel('Salary')
-plt.ylabel('Frequency')
-plt.show()
+
+from byte_ranges import worker_ranges
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from reporting import Figures, add_report_args, write_json
+
+class StreamingHistogram:
+    def __init__(self, bins=30, lo=None, hi=None):
+        self.bins = bins
+        self.counts = np.zeros(bins, dtype=np.int64)
+        self.n = 0
+        self.underflow = self.overflow = 0
+        self.min, self.max = math.inf, -math.inf
+        self.fixed = lo is not None and hi is not None
+        if self.fixed:
+            self.origin, self.width = float(lo), (hi - lo) / bins
+        else:
+            self.origin, self.width = None, None          # set by the first values
+
+    @property
+    def empty(self):
+        """An adaptive histogram that has seen no values has no grid yet."""
+        return self.origin is None
+
+    @property
+    def edges(self):
+        if self.empty:
+            return np.empty(0)
+        return self.origin + self.width * np.arange(self.bins + 1)
+
+    @property
+    def top(self):
+        return self.origin + self.width * self.bins
+
+    def _coarsen_to(self, width, origin):
+        """Re-bin onto a coarser or shifted grid; each old bin maps into one new bin."""
+        starts = self.origin + self.width * np.arange(self.bins)
+        idx = np.floor((starts - origin) / width + 1e-9).astype(np.int64)
+        counts = np.zeros(self.bins, dtype=np.int64)
+        np.add.at(counts, idx, self.counts)
+        self.counts, self.width, self.origin = counts, width, origin
+
+    def _fit(self, lo, hi, min_width=0.0):
+        """Grow the adaptive grid until origin <= lo and hi < top."""
+        if self.width is None:
+            span = max(hi - lo, 1e-12)
+            self.width = max(2.0 ** math.ceil(math.log2(span / self.bins)), min_width)
+            self.origin = math.floor(lo / self.width) * self.width
+        lo = min(lo, self.origin)
+        hi = max(hi, self.top - self.width / 2)
+        width = max(self.width, min_width)
+        origin = math.floor(lo / width) * width
+        while hi >= origin + width * self.bins:
+            width *= 2
+            origin = math.floor(lo / width) * width
+        if (width, origin) != (self.width, self.origin):
+            self._coarsen_to(width, origin)
+
+    def update(self, values):
+        x = np.asarray(values, dtype=float)
+        x = x[~np.isnan(x)]
+        if not len(x):
+            return
+        lo, hi = x.min(), x.max()
+        self.n += len(x)
+        self.min, self.max = min(self.min, lo), max(self.max, hi)
+        if self.fixed:
+            below, above = x < self.origin, x > self.top
+            self.underflow += int(below.sum())
+            self.overflow += int(above.sum())
+            x = x[~below & ~above]
+        else:
+            self._fit(lo, hi)
+        idx = np.minimum(((x - self.origin) / self.width).astype(np.int64), self.bins - 1)
+        self.counts += np.bincount(idx, minlength=self.bins)
+
+    def merge(self, other):
+        """Add the counts of another histogram over the same column."""
+        if other.n == 0:
+            return self
+        if self.fixed:
+            if (self.origin, self.width, self.bins) != (other.origin, other.width, other.bins):
+                raise ValueError('fixed-range histograms must share the same bins to merge')
+            self.counts += other.counts
+            self.underflow += other.underflow
+            self.overflow += other.overflow
+        else:
+            other = _copy(other)
+            self._fit(other.origin, other.top - other.width / 2, min_width=other.width)
+            other._coarsen_to(self.width, self.origin)
+            self.counts += other.counts
+        self.n += other.n
+        self.min, self.max = min(self.min, other.min), max(self.max, other.max)
+        return self
+
+    def to_dict(self):
+        return {
+            'bins':      self.bins,
+            'edges':     self.edges.tolist(),
+            'counts':    [] if self.empty else self.counts.tolist(),
+            'n':         self.n,
+            'underflow': self.underflow,
+            'overflow':  self.overflow,
+            'min':       self.min if self.n else None,
+            'max':       self.max if self.n else None,
+        }
+
+def _copy(h):
+    c = StreamingHistogram(h.bins)
+    c.__dict__.update({k: (v.copy() if isinstance(v, np.ndarray) else v) for k, v in h.__dict__.items()})
+    return c
+
+def histogram_csv(path, column, bins=30, value_range=None, chunksize=1_000_000):
+    """Stream *column* of the CSV at *path* into a StreamingHistogram."""
+    h = StreamingHistogram(bins, *(value_range or (None, None)))
+    for chunk in pd.read_csv(path, usecols=[column], chunksize=chunksize):
+        h.update(pd.to_numeric(chunk[column], errors='coerce'))
+    return h
+
+def _histogram_range(task):
+    path, start, end, header, column, bins, value_range = task
+    with open(path, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start)
+    h = StreamingHistogram(bins, *(value_range or (None, None)))
+    df = pd.read_csv(io.BytesIO(data), header=None, names=header, usecols=[column])
+    h.update(pd.to_numeric(df[column], errors='coerce'))
+    return h
+
+def histogram_csv_parallel(path, column, bins=30, value_range=None, workers=None):
+    """Build partial histograms over line-aligned byte ranges and merge them."""
+    workers = workers or os.cpu_count() or 1
+    with open(path, 'rb') as f:
+        header = pd.read_csv(io.BytesIO(f.readline()), nrows=0).columns.tolist()
+        data_start = f.tell()
+    tasks = [(path, s, e, header, column, bins, value_range)
+             for s, e in worker_ranges(path, workers, data_start)]
+    total = StreamingHistogram(bins, *(value_range or (None, None)))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for part in pool.map(_histogram_range, tasks):
+            total.merge(part)
+    return total
+
+def plot(h, column, figures):
+    plt = figures.pyplot()
+    edges = h.edges
+    plt.figure()
+    plt.bar(edges[:-1], h.counts, width=np.diff(edges), align='edge', edgecolor='black')
+    plt.title(f'{column.title()} Distribution')
+    plt.xlabel(column.title())
+    plt.ylabel('Frequency')
+    figures.emit(f'{column}_histogram')
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('path', nargs='?', default='employees.csv')
+    ap.add_argument('--column', default='salary')
+    ap.add_argument('--bins', type=int, default=30)
+    ap.add_argument('--range', nargs=2, type=float, metavar=('LO', 'HI'), default=None)
+    add_report_args(ap, 'JSON output (counts, edges, n, …)')
+    ap.add_argument('-j', '--workers', type=int, default=1, help='0 = all cores')
+    args = ap.parse_args()
+
+    if args.workers == 1:
+        h = histogram_csv(args.path, args.column, args.bins, args.range)
+    else:
+        h = histogram_csv_parallel(args.path, args.column, args.bins, args.range, args.workers or None)
+
+    if h.n:
+        print(f'{h.n:,} values of {args.column!r} in {h.bins} bins of width {h.width:g} from {h.origin:g}')
+    else:
+        print(f'No numeric values in {args.column!r}')
+    write_json(args.json, column=args.column, **h.to_dict())
+    figures = Figures.from_args(args)
+    if figures.enabled and not h.empty:
+        plot(h, args.column, figures)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+"""
+Small declarative rule engine for CSV data validation.
+
+Assertions are declared once as rules and evaluated chunk by chunk:
+  • RowRule        – vectorized pandas mask of violating rows
+  • RefRule        – referential check (ref column ⊆ key column) via a hash-set join
+                     resolved after the last chunk, so forward references are fine
+  • AggregateRule  – streaming statistics over one column (running moments plus a
+                     bounded reservoir sample), tested at the end
+
+run_suite() returns {rule name: {'violations': n, 'sample_rows': [...], ...}}, where
+sample rows are 0-based data row numbers of the first violations.
+"""
+
+import argparse
+import math
+import random
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List
+
+import numpy as np
+import pandas as pd
+from scipy.stats import chi2, kstest, norm, shapiro
+
+# ─── Streaming statistics ───────────────────────────────────────────────────
+@dataclass
+class RunningMoments:
+    """Count, mean and central moment sums M2..M4; mergeable across chunks."""
+    n: int = 0
+    mean: float = 0.0
+    M2: float = 0.0
+    M3: float = 0.0
+    M4: float = 0.0
+
+    def update(self, values) -> None:
+        x = np.asarray(values, dtype=float)
+        x = x[~np.isnan(x)]
+        if not len(x):
+            return
+        mean = x.mean()
+        d = x - mean
+        d2 = d * d
+        self.merge(RunningMoments(len(x), mean, d2.sum(), (d2 * d).sum(), (d2 * d2).sum()))
+
+    def merge(self, other: 'RunningMoments') -> None:
+        na, nb = self.n, other.n
+        if nb == 0:
+            return
+        if na == 0:
+            self.n, self.mean, self.M2, self.M3, self.M4 = (
+                other.n, other.mean, other.M2, other.M3, other.M4)
+            return
+        n = na + nb
+        d = other.mean - self.mean
+        d2 = d * d
+        M2 = self.M2 + other.M2 + d2 * na * nb / n
+        M3 = (self.M3 + other.M3 + d * d2 * na * nb * (na - nb) / n**2
+              + 3 * d * (na * other.M2 - nb * self.M2) / n)
+        M4 = (self.M4 + other.M4
+              + d2 * d2 * na * nb * (na * na - na * nb + nb * nb) / n**3
+              + 6 * d2 * (na * na * other.M2 + nb * nb * self.M2) / n**2
+              + 4 * d * (na * other.M3 - nb * self.M3) / n)
+        self.n, self.mean, self.M2, self.M3, self.M4 = n, self.mean + d * nb / n, M2, M3, M4
+
+    @property
+    def skew(self) -> float:
+        return math.sqrt(self.n) * self.M3 / self.M2**1.5
+
+    @property
+    def kurtosis(self) -> float:
+        """Pearson (non-excess) kurtosis."""
+        return self.n * self.M4 / (self.M2 * self.M2)
+
+
+def dagostino_k2(m: RunningMoments):
+    """D'Agostino–Pearson K² normality test from running moments → (K², p)."""
+    n = m.n
+    if n < 20 or m.M2 == 0:
+        return float('nan'), float('nan')
+
+    # skewness test
+    y = m.skew * math.sqrt((n + 1) * (n + 3) / (6.0 * (n - 2)))
+    beta2 = (3.0 * (n * n + 27 * n - 70) * (n + 1) * (n + 3)
+             / ((n - 2.0) * (n + 5) * (n + 7) * (n + 9)))
+    W2 = -1 + math.sqrt(2 * (beta2 - 1))
+    delta = 1 / math.sqrt(0.5 * math.log(W2))
+    alpha = math.sqrt(2.0 / (W2 - 1))
+    y = y if y != 0 else 1
+    z1 = delta * math.log(y / alpha + math.sqrt((y / alpha) ** 2 + 1))
+
+    # kurtosis test
+    E = 3.0 * (n - 1) / (n + 1)
+    varb2 = 24.0 * n * (n - 2) * (n - 3) / ((n + 1) * (n + 1.0) * (n + 3) * (n + 5))
+    x = (m.kurtosis - E) / math.sqrt(varb2)
+    sqrtbeta1 = (6.0 * (n * n - 5 * n + 2) / ((n + 7) * (n + 9))
+                 * math.sqrt(6.0 * (n + 3) * (n + 5) / (n * (n - 2) * (n - 3))))
+    A = 6.0 + 8.0 / sqrtbeta1 * (2.0 / sqrtbeta1 + math.sqrt(1 + 4.0 / sqrtbeta1 ** 2))
+    term1 = 1 - 2 / (9.0 * A)
+    denom = 1 + x * math.sqrt(2 / (A - 4.0))
+    if denom == 0:
+        return float('nan'), float('nan')
+    term2 = math.copysign(((1 - 2.0 / A) / abs(denom)) ** (1 / 3.0), denom)
+    z2 = (term1 - term2) / math.sqrt(2 / (9.0 * A))
+
+    k2 = z1 * z1 + z2 * z2
+    return k2, float(chi2.sf(k2, 2))
+
+
+class Reservoir:
+    """
+    Uniform fixed-size sample of a stream (Algorithm L: only the items that
+    enter the sample cost any work).  Two reservoirs over disjoint streams
+    merge into a uniform sample of the union.
+    """
+
+    def __init__(self, size: int = 5000, seed=None):
+        self.size = size
+        self.n = 0
+        self.sample = np.empty(0)
+        self._rng = random.Random(seed)
+        self._w = 1.0
+        self._next = 0                       # stream index of the next replacement
+
+    def _skip(self) -> None:
+        self._w *= math.exp(math.log(1.0 - self._rng.random()) / self.size)
+        self._advance()
+
+    def _advance(self) -> None:
+        self._next += int(math.log(1.0 - self._rng.random()) / math.log1p(-self._w)) + 1
+
+    def extend(self, values) -> None:
+        x = np.asarray(values, dtype=float)
+        x = x[~np.isnan(x)]
+        base, m = self.n, len(x)
+        fill = min(self.size - len(self.sample), m)
+        if fill > 0:
+            self.sample = np.concatenate([self.sample, x[:fill]])
+            if len(self.sample) == self.size:
+                self._next = self.size - 1
+                self._skip()
+        if len(self.sample) == self.size:
+            while self._next < base + m:
+                if self._next >= base + fill:
+                    self.sample[self._rng.randrange(self.size)] = x[self._next - base]
+                self._skip()
+        self.n = base + m
+
+    def merge(self, other: 'Reservoir') -> None:
+        n = self.n + other.n
+        k = min(self.size, n)
+        if other.n == 0:
+            return
+        if n <= self.size:
+            self.sample = np.concatenate([self.sample, other.sample])
+        else:
+            from_self = int(np.random.default_rng(self._rng.getrandbits(32))
+                            .hypergeometric(self.n, other.n, k))
+            pick_a = self._rng.sample(range(len(self.sample)), from_self)
+            pick_b = self._rng.sample(range(len(other.sample)), k - from_self)
+            self.sample = np.concatenate([self.sample[pick_a], other.sample[pick_b]])
+        self.n = n
+        if len(self.sample) == self.size:
+            # threshold after n items is the k-th smallest of n uniforms
+            self._w = self._rng.betavariate(self.size, n - self.size + 1)
+            self._next = n - 1
+            self._advance()
+
+
+def anderson_darling(x: np.ndarray):
+    """A² test for normality with estimated mean/std → (A², p) (Stephens 1986)."""
+    n = len(x)
+    z = np.sort((x - x.mean()) / x.std(ddof=1))
+    i = np.arange(1, n + 1)
+    a2 = -n - np.sum((2 * i - 1) * (norm.logcdf(z) + norm.logsf(z[::-1]))) / n
+    a = a2 * (1 + 0.75 / n + 2.25 / n ** 2)
+    if a >= 153:                             # fit turns upward beyond here; p ≈ 0
+        p = 0.0
+    elif a >= 0.6:
+        p = math.exp(1.2937 - 5.709 * a + 0.0186 * a * a)
+    elif a >= 0.34:
+        p = math.exp(0.9177 - 4.279 * a - 1.38 * a * a)
+    elif a >= 0.2:
+        p = 1 - math.exp(-8.318 + 42.796 * a - 59.938 * a * a)
+    else:
+        p = 1 - math.exp(-13.436 + 101.14 * a - 223.73 * a * a)
+    return float(a2), min(max(p, 0.0), 1.0)
+
+
+NORMALITY_METHODS = ('auto', 'shapiro', 'k2', 'anderson', 'ks')
+
+def normality_test(method: str, m: RunningMoments, r: Reservoir, alpha: float = 0.05) -> Dict:
+    """
+    Normality assertion computable from one pass:
+      shapiro  – Shapiro–Wilk on the reservoir (exact when n ≤ reservoir size)
+      k2       – D'Agostino K² from the running moments (all rows)
+      anderson – Anderson–Darling on the reservoir
+      ks       – Kolmogorov–Smirnov of the reservoir vs. N(mean, std) of all rows;
+                 mean/std are estimated from the data and there is no Lilliefors
+                 correction, so its p-value is too large (the test too lenient) --
+                 prefer anderson or k2
+      auto     – shapiro up to 5000 values, k2 beyond
+    """
+    if method == 'auto':
+        method = 'shapiro' if m.n <= 5000 else 'k2'
+    if method == 'shapiro':
+        label, (stat, p) = 'Shapiro–Wilk', shapiro(r.sample)
+    elif method == 'k2':
+        label, (stat, p) = "D'Agostino K²", dagostino_k2(m)
+    elif method == 'anderson':
+        label, (stat, p) = 'Anderson–Darling', anderson_darling(r.sample)
+    elif method == 'ks':
+        std = math.sqrt(m.M2 / (m.n - 1))
+        label, (stat, p) = 'Kolmogorov–Smirnov', kstest(r.sample, 'norm', args=(m.mean, std))
+    else:
+        raise ValueError(f'unknown normality method {method!r}; choose from {NORMALITY_METHODS}')
+    if method != 'k2' and r.n > len(r.sample):
+        label += f' (reservoir of {len(r.sample):,})'
+    return {'passed': bool(p >= alpha), 'method': label,
+            'statistic': float(stat), 'p_value': float(p)}
+
+# ─── Rule types ─────────────────────────────────────────────────────────────
+@dataclass
+class RowRule:
+    name: str
+    violates: Callable[[pd.DataFrame], pd.Series]   # chunk → boolean mask of violations
+
+@dataclass
+class RefRule:
+    name: str
+    ref_col: str
+    key_col: str
+
+@dataclass
+class AggregateRule:
+    name: str
+    column: str
+    test: Callable[[RunningMoments, Reservoir], Dict]   # → {'passed': bool, ...}
+
+
+def iso_dates(s: pd.Series) -> pd.Series:
+    """Vectorized fixed-format YYYY-MM-DD parse; malformed → NaT."""
+    return pd.to_datetime(s.str.strip(), format='%Y-%m-%d', errors='coerce')
+
+
+# ─── Suites ─────────────────────────────────────────────────────────────────
+def employee_rules(normality: str = 'auto') -> list:
+    return [
+        RowRule('name_not_null',
+                lambda df: df['name'].str.strip() == ''),
+        RowRule('hire_on_or_after_2015',
+                lambda df: ~(iso_dates(df['hire_date']) >= '2015-01-01')),
+        RowRule('birth_before_hire',
+                lambda df: ~(iso_dates(df['birth_date']) < iso_dates(df['hire_date']))),
+        RefRule('manager_exists', ref_col='reports_to', key_col='eid'),
+        AggregateRule('salary_normal', 'salary',
+                      lambda m, r: normality_test(normality, m, r)),
+    ]
+
+EMPLOYEE_RULES = employee_rules()
+
+# ─── Engine ─────────────────────────────────────────────────────────────────
+@dataclass
+class _RefState:
+    keys: List[np.ndarray] = field(default_factory=list)
+    refs: List[np.ndarray] = field(default_factory=list)
+    ref_rows: List[np.ndarray] = field(default_factory=list)
+    bad_rows: List[np.ndarray] = field(default_factory=list)   # unparseable refs
+
+
+def _concat(arrays: List[np.ndarray]) -> np.ndarray:
+    """np.concatenate of per-chunk arrays; an empty int64 array when there were no chunks."""
+    return np.concatenate(arrays) if arrays else np.empty(0, np.int64)
+
+
+def run_suite(path: str,
+              rules: list,
+              chunksize: int = 250_000,
+              sample_size: int = 5) -> Dict[str, Dict]:
+    """Evaluate *rules* over the CSV at *path*, one chunk at a time."""
+    counts = {r.name: 0 for r in rules if isinstance(r, RowRule)}
+    samples: Dict[str, list] = {r.name: [] for r in rules if isinstance(r, RowRule)}
+    refs = {r.name: _RefState() for r in rules if isinstance(r, RefRule)}
+    moments = {r.name: RunningMoments() for r in rules if isinstance(r, AggregateRule)}
+    reservoirs = {r.name: Reservoir() for r in rules if isinstance(r, AggregateRule)}
+
+    reader = pd.read_csv(path, dtype=str, keep_default_na=False, chunksize=chunksize)
+    for chunk in reader:
+        for rule in rules:
+            if isinstance(rule, RowRule):
+                mask = rule.violates(chunk).to_numpy(dtype=bool)
+                counts[rule.name] += int(mask.sum())
+                need = sample_size - len(samples[rule.name])
+                if need > 0:
+                    samples[rule.name] += chunk.index[mask][:need].tolist()
+
+            elif isinstance(rule, RefRule):
+                st = refs[rule.name]
+                key = pd.to_numeric(chunk[rule.key_col], errors='coerce')
+                st.keys.append(key[key.notna()].to_numpy(dtype=np.int64))
+                ref = pd.to_numeric(chunk[rule.ref_col], errors='coerce')
+                ok = ref.notna().to_numpy()
+                st.refs.append(ref[ok].to_numpy(dtype=np.int64))
+                st.ref_rows.append(chunk.index.to_numpy()[ok])
+                st.bad_rows.append(chunk.index.to_numpy()[~ok])
+
+            else:
+                values = pd.to_numeric(chunk[rule.column], errors='coerce').to_numpy(dtype=float)
+                moments[rule.name].update(values)
+                reservoirs[rule.name].extend(values)
+
+    results: Dict[str, Dict] = {}
+    for rule in rules:
+        if isinstance(rule, RowRule):
+            results[rule.name] = {'violations': counts[rule.name],
+                                  'sample_rows': samples[rule.name]}
+
+        elif isinstance(rule, RefRule):
+            st = refs[rule.name]
+            keys = pd.Index(_concat(st.keys)).unique()
+            missing = _concat(st.ref_rows)[keys.get_indexer(_concat(st.refs)) < 0]
+            bad = np.sort(_concat(st.bad_rows + [missing]))
+            results[rule.name] = {'violations': int(len(bad)),
+                                  'sample_rows': bad[:sample_size].tolist()}
+
+        else:
+            m = moments[rule.name]
+            results[rule.name] = {'n': m.n, **rule.test(m, reservoirs[rule.name])}
+            results[rule.name]['violations'] = 0 if results[rule.name]['passed'] else 1
+
+    return results
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('path', nargs='?', default='employees.csv')
+    ap.add_argument('--normality', choices=NORMALITY_METHODS, default='auto')
+    args = ap.parse_args()
+    for name, r in run_suite(args.path, employee_rules(args.normality)).items():
+        extra = {k: v for k, v in r.items() if k != 'violations'}
+        print(f'{name:24} {r["violations"]:>8}  {extra}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Attach the nearest weather reading to every breadcrumb.
+
+    python enrich_weather.py bc_trip259172515_230215.csv [--out enriched.csv]
+    python enrich_weather.py --db [--date 2023-02-15] [--out enriched.parquet]
+        [--city Portland,US] [--tolerance 90min] [--fixtures fixtures/weather]
+
+Each run folds the client's current observation and forecast into a
+per-city weather history (Parquet under the weather cache), so the series
+keeps growing and covers past service days.  Breadcrumbs -- from a CSV in
+the OPD_DATE/ACT_TIME layout or from the `breadcrumb` table -- are joined to
+that series with one merge_asof on sorted timestamps; no per-row lookups.
+Breadcrumb times are local (--tz) and weather times UTC.  With fixtures
+(--fixtures or WEATHER_FIXTURES) the canned readings are used on their own
+and the history is left untouched.
+"""
+
+from __future__ import annotations
+
+import argparse
+import io
+import os
+from pathlib import Path
+
+import pandas as pd
+
+from weather import CACHE_DIR, WeatherClient, city_slug
+
+WEATHER_COLUMNS = ["temp", "rain_mm_h", "wind_speed", "conditions"]
+
+
+def _points(entries, rain_key, hours, source):
+    return pd.DataFrame({
+        "time":       pd.to_datetime([e["dt"] for e in entries], unit="s", utc=True),
+        "temp":       [e.get("main", {}).get("temp") for e in entries],
+        "rain_mm_h":  [e.get("rain", {}).get(rain_key, 0.0) / hours for e in entries],
+        "wind_speed": [e.get("wind", {}).get("speed") for e in entries],
+        "conditions": [(e.get("weather") or [{}])[0].get("main") for e in entries],
+        "source":     source,
+    })
+
+
+def weather_points(data):
+    """Current observation + forecast entries of one fetch() as a frame keyed by UTC time."""
+    return pd.concat([
+        _points([data["weather"]], "1h", 1, "observation"),
+        _points(data["forecast"].get("list", []), "3h", 3, "forecast"),
+    ], ignore_index=True)
+
+
+def update_history(city, data, cache_dir=CACHE_DIR):
+    """
+    Merge *data* into the cached history for *city* and return it sorted by
+    time.  An observation replaces a forecast for the same instant, and newer
+    forecasts replace older ones.  With *cache_dir* None nothing is read or
+    saved.
+    """
+    path = cache_dir and Path(cache_dir) / f"history.{city_slug(city)}.parquet"
+    try:
+        history = pd.read_parquet(path) if path else None
+    except (OSError, ValueError, ImportError):
+        history = None
+
+    series = pd.concat([history, weather_points(data)], ignore_index=True)
+    series = (series.assign(_rank=(series["source"] == "observation").astype(int))
+              .sort_values(["time", "_rank"], kind="stable")
+              .drop_duplicates("time", keep="last")
+              .drop(columns="_rank")
+              .reset_index(drop=True))
+    series["conditions"] = series["conditions"].astype("category")
+    series["source"] = series["source"].astype("category")
+    if not path:
+        return series
+
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        series.to_parquet(tmp, index=False)
+        os.replace(tmp, path)
+    except (ImportError, OSError) as e:
+        print(f"[WARN] weather history not saved: {e}")
+    return series
+
+
+def weather_series(client, city):
+    """The weather history for *city* after folding in one fetch; fixture readings are never saved."""
+    return update_history(city, client.fetch(city), None if client.fixtures else client.cache_dir)
+
+
+def read_breadcrumb_csv(path):
+    """Breadcrumbs in the trip-CSV layout, with a vectorized TIMESTAMP from OPD_DATE + ACT_TIME."""
+    df = pd.read_csv(path, usecols=lambda col: col not in ["EVENT_NO_STOP", "GPS_SATELLITES", "GPS_HDOP"])
+    df["TIMESTAMP"] = (pd.to_datetime(df["OPD_DATE"], format="%d%b%Y:%H:%M:%S")
+                       + pd.to_timedelta(df["ACT_TIME"], unit="s"))
+    return df.drop(columns=["OPD_DATE", "ACT_TIME"])
+
+
+def read_breadcrumb_table(day=None):
+    """The `breadcrumb` table (optionally one day of it), streamed out with COPY."""
+    import psycopg2
+
+    where = "WHERE tstamp >= %s::date AND tstamp < %s::date + 1" if day else ""
+    conn = psycopg2.connect(dbname=os.getenv("PG_DB", "trimet"), user=os.getenv("PG_USER", "postgres"),
+                            password=os.getenv("PG_PWD", ""), host=os.getenv("PG_HOST", "localhost"),
+                            port=int(os.getenv("PG_PORT", 5432)))
+    try:
+        with conn.cursor() as cur:
+            sql = cur.mogrify(f"SELECT tstamp, latitude, longitude, speed, trip_id FROM breadcrumb {where}",
+                              (day, day) if day else None).decode()
+            buf = io.StringIO()
+            cur.copy_expert(f"COPY ({sql}) TO STDOUT WITH CSV HEADER", buf)
+    finally:
+        conn.close()
+    buf.seek(0)
+    return pd.read_csv(buf, parse_dates=["tstamp"]).rename(columns={"tstamp": "TIMESTAMP"})
+
+
+def enrich(crumbs, series, tz="America/Los_Angeles", tolerance="90min", time_col="TIMESTAMP"):
+    """
+    Add WEATHER_COLUMNS (+ weather_time) from the reading nearest to each
+    row's *time_col* (local time in *tz*) within *tolerance*; rows keep their
+    original order.
+    """
+    t = crumbs[time_col]
+    utc = t.dt.tz_convert("UTC") if t.dt.tz is not None else t.dt.tz_localize(tz, ambiguous="NaT",
+                                                                               nonexistent="NaT").dt.tz_convert("UTC")
+    left = pd.DataFrame({"_utc": utc.to_numpy(), "_row": range(len(crumbs))}).dropna(subset=["_utc"])
+    left = left.sort_values("_utc", kind="stable")
+    right = series[["time", *WEATHER_COLUMNS]].rename(columns={"time": "weather_time"})
+    right = right.assign(_utc=right["weather_time"]).sort_values("_utc")
+
+    joined = pd.merge_asof(left, right, on="_utc", direction="nearest", tolerance=pd.Timedelta(tolerance))
+    joined = joined.set_index("_row").reindex(range(len(crumbs)))
+    out = crumbs.copy()
+    for c in ["weather_time", *WEATHER_COLUMNS]:
+        out[c] = joined[c].to_numpy()
+    return out
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Join the nearest weather reading onto breadcrumbs.")
+    ap.add_argument("csv", nargs="?", help="breadcrumb CSV (OPD_DATE/ACT_TIME layout)")
+    ap.add_argument("--db", action="store_true", help="read the breadcrumb table instead (PG_* env vars)")
+    ap.add_argument("--date", default=None, help="with --db: only this service day (YYYY-MM-DD)")
+    ap.add_argument("--city", default="Portland,US")
+    ap.add_argument("--tz", default="America/Los_Angeles", help="time zone of the breadcrumb timestamps")
+    ap.add_argument("--tolerance", default="90min", help="max distance to a weather reading")
+    ap.add_argument("--fixtures", default=None, help="read weather JSON from this directory (no network)")
+    ap.add_argument("--out", default=None, help="CSV or .parquet output")
+    args = ap.parse_args()
+    if not args.csv and not args.db:
+        ap.error("give a breadcrumb CSV or --db")
+
+    client = WeatherClient(fixtures=args.fixtures)
+    series = weather_series(client, args.city)
+    print(f"Weather series: {len(series):,} readings, {series['time'].min()} .. {series['time'].max()}")
+
+    crumbs = read_breadcrumb_table(args.date) if args.db else read_breadcrumb_csv(args.csv)
+    enriched = enrich(crumbs, series, args.tz, args.tolerance)
+    matched = enriched["weather_time"].notna().sum()
+    print(f"Enriched {len(enriched):,} breadcrumbs; {matched:,} within {args.tolerance} of a reading")
+
+    if args.out:
+        if args.out.endswith(".parquet"):
+            enriched.to_parquet(args.out, index=False)
+        else:
+            enriched.to_csv(args.out, index=False)
+        print(f"→ {args.out}")
+    else:
+        print(enriched.head())
+
+
+if __name__ == "__main__":
+    main()
@@ -1,23 +1,75 @@
+import argparse
+
+import numpy as np
 import pandas as pd
-from us_state_abbrev import abbrev_to_us_state
-import seaborn as sns
-import matplotlib.pyplot as plt
+
+from county_keys import keys_for, load_key_table
+from csv_cache import read_csv_cached
+from reporting import Figures, add_report_args, write_json
+
+CASES_CSV  = 'covid_confirmed_usafacts.csv'
+DEATHS_CSV = 'covid_deaths_usafacts.csv'
+CENSUS_CSV = 'acs2017_county_data.csv'
+CENSUS_COLS = ['TotalPop', 'IncomePerCap', 'Poverty', 'Unemployment']
+
+
+def init_cli() -> argparse.Namespace:
+    p = argparse.ArgumentParser(description='Correlate COVID counts with ACS county data.')
+    p.add_argument('--start', default='2023-07-23', help='first date column (YYYY-MM-DD)')
+    p.add_argument('--end', default=None, help='last date column (defaults to --start)')
+    p.add_argument('--out', default=None, help='write the correlation time series to this CSV')
+    add_report_args(p, 'write the correlation matrix / time series as JSON')
+    return p.parse_args()
+
+
+def date_columns(path: str, start: str, end: str) -> list[str]:
+    """Date columns of *path* within [start, end]; reads only the header row."""
+    header = pd.read_csv(path, nrows=0).columns
+    dates = [c for c in header if c[:1].isdigit() and start <= c <= end]
+    if not dates:
+        raise SystemExit(f'No date columns between {start} and {end} in {path}')
+    return dates
+
+
+def standardize(a: np.ndarray) -> np.ndarray:
+    """Z-score each column; zero-variance columns become NaN, as in DataFrame.corr."""
+    std = a.std(axis=0)
+    std[np.ptp(a, axis=0) == 0] = np.nan       # constant column (std may round to ~1e-17)
+    return (a - a.mean(axis=0)) / std
+
+
+def correlation_series(per_cap: pd.DataFrame, census: pd.DataFrame) -> pd.DataFrame:
+    """
+    Pearson r of every per-capita date column against every census column,
+    computed as one standardized matrix product (rows: dates).
+    """
+    x = per_cap.to_numpy(dtype=float)
+    y = census.to_numpy(dtype=float)
+    r = standardize(x).T @ standardize(y) / len(x)
+    return pd.DataFrame(r, index=per_cap.columns, columns=census.columns)
+
+
+args = init_cli()
+end_date = args.end or args.start
+figures = Figures.from_args(args)
 
 """Step 1: Load and Trim Data"""
-# Load CSV files
-covid_cases   = pd.read_csv('covid_confirmed_usafacts.csv')
-covid_deaths  = pd.read_csv('covid_deaths_usafacts.csv')
-census_data   = pd.read_csv('acs2017_county_data.csv')
+# Load only the required columns (trimmed frames are cached as Parquet)
+dates = date_columns(CASES_CSV, args.start, end_date)
+COVID_DTYPES  = {'countyFIPS': 'int32', 'County Name': 'object', 'State': 'category',
+                 **{d: 'int64' for d in dates}}
+CENSUS_DTYPES = {'County': 'category', 'State': 'category', 'TotalPop': 'int64',
+                 'IncomePerCap': 'float64', 'Poverty': 'float64', 'Unemployment': 'float64'}
 
-# Keep only required columns
-covid_cases   = covid_cases[['County Name', 'State', '2023-07-23']]
-covid_deaths  = covid_deaths[['County Name', 'State', '2023-07-23']]
-census_data   = census_data[['County', 'State', 'TotalPop', 'IncomePerCap', 'Poverty', 'Unemployment']]
+covid_cases   = read_csv_cached(CASES_CSV, list(COVID_DTYPES), COVID_DTYPES)
+covid_deaths  = read_csv_cached(DEATHS_CSV, list(COVID_DTYPES), COVID_DTYPES)
+census_data   = read_csv_cached(CENSUS_CSV, list(CENSUS_DTYPES), CENSUS_DTYPES)
 
 # Show column names
+print(f'[INFO] Analyzing {len(dates)} date(s): {dates[0]} … {dates[-1]}')
 print('[INFO] Columns in loaded data:')
-print('  - Cases:', covid_cases.columns.tolist())
-print('  - Deaths:', covid_deaths.columns.tolist())
+print('  - Cases:', covid_cases.columns[:4].tolist(), '…' if len(dates) > 1 else '')
+print('  - Deaths:', covid_deaths.columns[:4].tolist(), '…' if len(dates) > 1 else '')
 print('  - Census:', census_data.columns.tolist())
 
 """Step 2: Clean County Names"""
@@ -40,17 +92,22 @@ print('\n[INFO] Records after removing unallocated rows:')
 print(f'  - Cases: {initial_case_count} → {len(covid_cases)}')
 print(f'  - Deaths: {initial_death_count} → {len(covid_deaths)}')
 
-"""Step 4: Expand Abbreviated States"""
-covid_cases['State']  = covid_cases['State'].map(abbrev_to_us_state)
-covid_deaths['State'] = covid_deaths['State'].map(abbrev_to_us_state)
+"""Step 4: Load County Key Table"""
+# (County, State) → county FIPS, with state abbreviations expanded; cached as Parquet
+key_table = load_key_table(CASES_CSV)
+
+print('\n[PREVIEW] County key table:')
+print(key_table.head())
 
-print('\n[PREVIEW] Sample of case data after state mapping:')
-print(covid_cases.head())
+"""Step 5: Create Integer Join Key"""
+covid_cases['Location']  = covid_cases['countyFIPS']
+covid_deaths['Location'] = covid_deaths['countyFIPS']
+census_data['Location']  = keys_for(census_data['County'], census_data['State'], key_table)
 
-"""Step 5: Create Join Key"""
-covid_cases['Location']  = covid_cases['County Name'] + ', ' + covid_cases['State']
-covid_deaths['Location'] = covid_deaths['County Name'] + ', ' + covid_deaths['State']
-census_data['Location']  = census_data['County'] + ', ' + census_data['State']
+unmatched = int((census_data['Location'] < 0).sum())
+if unmatched:
+    print(f'\n[WARN] {unmatched} census rows have no matching county key')
+census_data = census_data[census_data['Location'] >= 0]
 
 covid_cases.set_index('Location', inplace=True)
 covid_deaths.set_index('Location', inplace=True)
@@ -59,40 +116,78 @@ census_data.set_index('Location', inplace=True)
 print('\n[PREVIEW] Census data with new index:')
 print(census_data.head())
 
-"""Step 6: Rename Columns"""
-covid_cases.rename(columns={'2023-07-23': 'ConfirmedCases'}, inplace=True)
-covid_deaths.rename(columns={'2023-07-23': 'ConfirmedDeaths'}, inplace=True)
-
-print('\n[INFO] Updated column names:')
-print('  - Cases:', covid_cases.columns.tolist())
-print('  - Deaths:', covid_deaths.columns.tolist())
-
-"""Step 7: Merge Datasets"""
-combined_df = (
-    covid_cases[['ConfirmedCases']]
-    .join(covid_deaths[['ConfirmedDeaths']], how='inner')
-    .join(census_data[['TotalPop', 'IncomePerCap', 'Poverty', 'Unemployment']], how='inner')
-)
-
-combined_df['CasesPerCap']  = combined_df['ConfirmedCases'] / combined_df['TotalPop']
-combined_df['DeathsPerCap'] = combined_df['ConfirmedDeaths'] / combined_df['TotalPop']
-
-print(f'\n[INFO] Final combined dataset contains {len(combined_df)} rows.')
-
-"""Step 8: Correlation Analysis"""
-correlations = combined_df.corr()
-print('\n[RESULT] Correlation Matrix:\n')
-print(correlations.round(2))
-
-"""Optional: Correlation Heatmap Visualization"""
-plt.figure(figsize=(10, 8))
-sns.heatmap(
-    correlations,
-    annot=True,
-    cmap='coolwarm',
-    fmt='.2f',
-    linewidths=0.5
+"""Step 6: Join Once on Location"""
+# One inner join for the whole date block; the census join is shared by every date
+locations = (
+    covid_cases.index
+    .intersection(covid_deaths.index)
+    .intersection(census_data.index)
 )
-plt.title('Correlation Matrix Heatmap')
-plt.tight_layout()
-plt.show()
+locations = locations[~locations.duplicated()]
+census    = census_data.loc[locations, CENSUS_COLS]
+cases     = covid_cases.loc[~covid_cases.index.duplicated()].loc[locations, dates]
+deaths    = covid_deaths.loc[~covid_deaths.index.duplicated()].loc[locations, dates]
+
+total_pop      = census['TotalPop'].to_numpy(dtype=float)
+cases_per_cap  = cases.div(total_pop, axis=0)
+deaths_per_cap = deaths.div(total_pop, axis=0)
+
+print(f'\n[INFO] Final combined dataset contains {len(locations)} rows × {len(dates)} date(s).')
+
+"""Step 7: Correlation Analysis"""
+if len(dates) == 1:
+    combined_df = census.copy()
+    combined_df.insert(0, 'ConfirmedCases', cases[dates[0]])
+    combined_df.insert(1, 'ConfirmedDeaths', deaths[dates[0]])
+    combined_df['CasesPerCap']  = cases_per_cap[dates[0]]
+    combined_df['DeathsPerCap'] = deaths_per_cap[dates[0]]
+
+    correlations = combined_df.corr()
+    print('\n[RESULT] Correlation Matrix:\n')
+    print(correlations.round(2))
+
+# Vectorized over all dates: per-capita cases/deaths vs. each census variable
+corr_cases  = correlation_series(cases_per_cap, census).add_prefix('CasesPerCap~')
+corr_deaths = correlation_series(deaths_per_cap, census).add_prefix('DeathsPerCap~')
+series = pd.concat([corr_cases, corr_deaths], axis=1)
+series.index = pd.to_datetime(series.index)
+series.index.name = 'Date'
+
+if len(dates) > 1:
+    print('\n[RESULT] Correlation time series (first / last rows):\n')
+    print(series.iloc[[0, -1]].round(3).T)
+
+if args.out:
+    series.to_csv(args.out)
+    print(f'\n[INFO] Correlation time series written to {args.out}')
+
+write_json(args.json,
+           dates=dates,
+           counties=len(locations),
+           correlations=correlations if len(dates) == 1 else None,
+           series=series)
+
+"""Optional: Visualization"""
+if figures.enabled:
+    plt = figures.pyplot()
+    import seaborn as sns
+
+    if len(dates) == 1:
+        plt.figure(figsize=(10, 8))
+        sns.heatmap(
+            correlations,
+            annot=True,
+            cmap='coolwarm',
+            fmt='.2f',
+            linewidths=0.5
+        )
+        plt.title('Correlation Matrix Heatmap')
+        plt.tight_layout()
+        figures.emit('correlation_heatmap')
+    else:
+        series.plot(figsize=(12, 6), legend=True)
+        plt.axhline(0, color='grey', linewidth=0.5)
+        plt.ylabel('Pearson r')
+        plt.title('Per-capita COVID vs. census correlations over time')
+        plt.tight_layout()
+        figures.emit('correlation_series')
@@ -1,26 +1,52 @@
 #!/usr/bin/env python3
-import argparse, csv, io, os, time
+import argparse, csv, io, os, re, resource, time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import NamedTuple
 import psycopg2
+from psycopg2.extras import execute_values
 
 DBNAME, DBUSER, DBPWD = "postgres", "postgres", "password"
 HOST, PORT = "localhost", 5432
 TABLE = "CensusData"
+STAGING = f"{TABLE}_Staging"
+SHADOW = f"{TABLE}_Shadow"
+BENCH = f"{TABLE}_Bench"        # scratch table for --benchmark; the live table is never touched
 
 def init_cli() -> argparse.Namespace:
     p = argparse.ArgumentParser()
     p.add_argument("-d", "--datafile", required=True)
     p.add_argument("-c", "--createtable", action="store_true")
-    p.add_argument("--method", choices=("copy", "insert"), default="copy")
-    return p.parse_args()
+    p.add_argument("--method", choices=METHODS, default="copy")
+    p.add_argument("--page-size", type=int, default=1000,
+                   help="rows per batch for the batched INSERT methods")
+    p.add_argument("--benchmark", action="store_true",
+                   help="load the file with every method and report rows/s, peak RSS and WAL bytes")
+    p.add_argument("--parallel", type=int, default=1, metavar="N",
+                   help="COPY N line-aligned chunks concurrently via an UNLOGGED staging table")
+    p.add_argument("--reload", action="store_true",
+                   help="COPY into an index-free shadow table, index it, then swap it with the live table")
+    p.add_argument("--maintenance-work-mem", default="1GB",
+                   help="maintenance_work_mem for the --reload index build")
+    args = p.parse_args()
+    if args.parallel < 1:
+        p.error("--parallel must be at least 1")
+    if args.benchmark and (args.parallel > 1 or args.reload):
+        p.error("--benchmark loads a scratch table with every method; --parallel/--reload don't apply")
+    if (args.parallel > 1 or args.reload) and args.method != "copy":
+        p.error("--parallel and --reload only apply to --method copy")
+    if args.reload and args.createtable:
+        p.error("--reload builds its own table and constraints; drop --createtable")
+    return args
 
 def dbconnect():
     conn = psycopg2.connect(host=HOST, port=PORT, dbname=DBNAME, user=DBUSER, password=DBPWD)
     conn.autocommit = True
     return conn
 
-DDL = f"""
-DROP TABLE IF EXISTS {TABLE};
-CREATE TABLE {TABLE} (
+DDL_TEMPLATE = """
+DROP TABLE IF EXISTS {table};
+CREATE TABLE {table} (
     CensusTract         NUMERIC,
     State               TEXT,
     County              TEXT,
@@ -61,122 +87,393 @@ CREATE TABLE {TABLE} (
 );
 """
 
-CONSTRAINTS = f"""
-ALTER TABLE {TABLE} ADD PRIMARY KEY (CensusTract);
-CREATE INDEX idx_{TABLE}_State ON {TABLE}(State);
+CONSTRAINTS_TEMPLATE = """
+ALTER TABLE {table} ADD PRIMARY KEY (CensusTract);
+CREATE INDEX idx_{table}_State ON {table}(State);
 """
 
-def sanitize_row(row: dict) -> list[str]:
-    cleaned = []
-    for k in (
-        'TractId','State','County','TotalPop','Men','Women','Hispanic','White',
-        'Black','Native','Asian','Pacific','VotingAgeCitizen','Income',
-        'IncomeErr','IncomePerCap','IncomePerCapErr','Poverty','ChildPoverty',
-        'Professional','Service','Office','Construction','Production','Drive',
-        'Carpool','Transit','Walk','OtherTransp','WorkAtHome','MeanCommute',
-        'Employed','PrivateWork','PublicWork','SelfEmployed','FamilyWork',
-        'Unemployment'
-    ):
-        v = row.get(k, "")
-        if v == "":
-            v = "0"
-        if k == "County":
-            v = v.replace("'", "")
-        cleaned.append(v)
-    return cleaned
-
-def write_temp_clean_csv(src_csv: str) -> str:
-    tmp_path = src_csv + ".clean"
-    with open(src_csv, newline="") as inp, open(tmp_path, "w", newline="") as outp:
-        rdr, wtr = csv.DictReader(inp), csv.writer(outp)
-        wtr.writerow(rdr.fieldnames)
-        for row in rdr:
-            wtr.writerow(sanitize_row(row))
-    return tmp_path
+DDL = DDL_TEMPLATE.format(table=TABLE)
+CONSTRAINTS = CONSTRAINTS_TEMPLATE.format(table=TABLE)
+
+# DDL column → source CSV header, where the names differ
+CSV_ALIASES = {"CensusTract": "TractId", "Citizen": "VotingAgeCitizen"}
+TEXT_TYPES = {"TEXT", "VARCHAR", "CHAR"}
+NULL_DEFAULT = "0"
+
+def ddl_columns(ddl: str) -> list[tuple[str, str]]:
+    """(column, type) pairs of the CREATE TABLE statement in *ddl*."""
+    body = re.search(r"CREATE TABLE\s+\w+\s*\((.*)\)\s*;", ddl, re.S | re.I).group(1)
+    return re.findall(r"^\s*(\w+)\s+(\w+)", body, re.M)
+
+class ColumnPlan(NamedTuple):
+    names: tuple                 # target columns, in DDL order
+    steps: tuple                 # (source index, is_text, null default) per target column
+    pad: list                    # appended to short rows; index len(header) is always ""
+    width: int                   # header length; longer rows are rejected
+
+def compile_plan(header: list[str], ddl: str = DDL, aliases: dict = CSV_ALIASES) -> ColumnPlan:
+    """
+    Map each DDL column to its position in *header* once, so rows can be
+    sanitized from plain csv.reader lists.  Columns missing from the file read
+    the always-empty slot at index len(header) and get the null default.
+    """
+    pos = {h: i for i, h in enumerate(header)}
+    names, steps = [], []
+    for name, typ in ddl_columns(ddl):
+        names.append(name)
+        steps.append((pos.get(aliases.get(name, name), len(header)),
+                      typ.upper() in TEXT_TYPES, NULL_DEFAULT))
+    return ColumnPlan(tuple(names), tuple(steps), [""] * (len(header) + 1), len(header))
+
+def sanitize_row(row: list[str], plan: ColumnPlan) -> list[str] | None:
+    """Target values for *row*, padding short rows; None for a row longer than the header."""
+    if len(row) > plan.width:
+        return None
+    row.extend(plan.pad[len(row):])
+    return [
+        (v.replace("'", "") if text else v) if (v := row[i]) != "" else null
+        for i, text, null in plan.steps
+    ]
+
+COPY_BUFSIZE = 1 << 16          # bytes requested per read() by copy_expert
 
-def load_with_copy(conn, csv_file: str):
-    clean_csv = write_temp_clean_csv(csv_file)
-    with conn.cursor() as cur, open(clean_csv, "r") as f:
-        print(f"COPY-loading from {clean_csv}")
+class SanitizingReader(io.TextIOBase):
+    """
+    File-like adapter for copy_expert: pulls rows lazily from a csv reader,
+    sanitizes them through the column plan and serves CSV text.  At most about
+    one read() request of rows is buffered, so no temp file is needed and
+    memory stays bounded.  *header* is read from *src* unless given.
+    """
+    def __init__(self, src, header=None):
+        self._rows = csv.reader(src)
+        self.plan = compile_plan(header or next(self._rows))
+        self._buf = io.StringIO()
+        self._wtr = csv.writer(self._buf)
+        self._pending = ""
+        self.rows = 0
+        self.rejected = 0            # rows with more fields than the header, skipped
+
+    def readable(self) -> bool:
+        return True
+
+    def read(self, size: int = -1) -> str:
+        buf, wtr, rows, plan = self._buf, self._wtr, self._rows, self.plan
+        buf.seek(0)
+        buf.truncate()
+        buf.write(self._pending)
+        for row in rows:
+            vals = sanitize_row(row, plan)
+            if vals is None:
+                self.rejected += 1
+                continue
+            wtr.writerow(vals)
+            self.rows += 1
+            if 0 <= size <= buf.tell():
+                break
+        data = buf.getvalue()
+        if 0 <= size < len(data):
+            data, self._pending = data[:size], data[size:]
+        else:
+            self._pending = ""
+        return data
+
+def warn_rejected(n: int):
+    if n:
+        print(f"[WARN] skipped {n:,} row(s) with more fields than the header")
+
+def load_with_copy(conn, csv_file: str, table: str = TABLE):
+    size = os.path.getsize(csv_file)
+    with conn.cursor() as cur, open(csv_file, newline="") as f:
+        print(f"COPY-loading from {csv_file} (streamed sanitize)")
+        stream = SanitizingReader(f)
         start = time.perf_counter()
-        cur.copy_expert(f"COPY {TABLE} FROM STDIN WITH CSV HEADER", f)
+        cur.copy_expert(f"COPY {table} ({', '.join(stream.plan.names)}) FROM STDIN WITH CSV",
+                        stream, size=COPY_BUFSIZE)
         secs = time.perf_counter() - start
-        print(f"Finished COPY. Elapsed: {secs:0.4f} s")
-    os.remove(clean_csv)
-
-def row2vals(row):
-    for key in row:
-        if row[key] == "":
-            row[key] = 0
-        if key == "County":
-            row[key] = row[key].replace("'", "")
-    return f"""
-       {row['TractId']},
-       '{row['State']}',
-       '{row['County']}',
-       {row['TotalPop']},
-       {row['Men']},
-       {row['Women']},
-       {row['Hispanic']},
-       {row['White']},
-       {row['Black']},
-       {row['Native']},
-       {row['Asian']},
-       {row['Pacific']},
-       {row['VotingAgeCitizen']},
-       {row['Income']},
-       {row['IncomeErr']},
-       {row['IncomePerCap']},
-       {row['IncomePerCapErr']},
-       {row['Poverty']},
-       {row['ChildPoverty']},
-       {row['Professional']},
-       {row['Service']},
-       {row['Office']},
-       {row['Construction']},
-       {row['Production']},
-       {row['Drive']},
-       {row['Carpool']},
-       {row['Transit']},
-       {row['Walk']},
-       {row['OtherTransp']},
-       {row['WorkAtHome']},
-       {row['MeanCommute']},
-       {row['Employed']},
-       {row['PrivateWork']},
-       {row['PublicWork']},
-       {row['SelfEmployed']},
-       {row['FamilyWork']},
-       {row['Unemployment']}
+        print(f"Finished COPY of {stream.rows:,} rows. Elapsed: {secs:0.4f} s "
+              f"({stream.rows / secs:,.0f} rows/s, {size / secs / 1e6:,.1f} MB/s)")
+        warn_rejected(stream.rejected)
+
+def split_ranges(csv_file: str, n: int):
+    """Header fields plus n byte ranges of the data rows, split on line boundaries."""
+    size = os.path.getsize(csv_file)
+    with open(csv_file, "rb") as f:
+        header = next(csv.reader([f.readline().decode()]))
+        cuts = [f.tell()]
+        for i in range(1, n):
+            f.seek(max(cuts[0] + (size - cuts[0]) * i // n - 1, cuts[-1]))
+            f.readline()
+            if cuts[-1] < f.tell() < size:
+                cuts.append(f.tell())
+    cuts.append(size)
+    return header, list(zip(cuts[:-1], cuts[1:]))
+
+def _range_lines(csv_file: str, start: int, end: int):
+    with open(csv_file, "rb") as f:
+        f.seek(start)
+        pos = start
+        for line in f:
+            if pos >= end:
+                break
+            pos += len(line)
+            yield line.decode()
+
+def _copy_range(task) -> tuple[int, int]:
+    csv_file, start, end, header = task
+    conn = dbconnect()
+    try:
+        stream = SanitizingReader(_range_lines(csv_file, start, end), header=header)
+        with conn.cursor() as cur:
+            cur.copy_expert(f"COPY {STAGING} ({', '.join(stream.plan.names)}) FROM STDIN WITH CSV",
+                            stream, size=COPY_BUFSIZE)
+        return stream.rows, stream.rejected
+    finally:
+        conn.close()
+
+def load_with_parallel_copy(conn, csv_file: str, n: int, swap: bool, table: str = TABLE):
+    """
+    COPY n chunks concurrently (one process + connection each) into an UNLOGGED
+    staging table, then move the rows into *table* in one statement.  With *swap*
+    (*table* was just created and is empty) the staging table is made LOGGED and
+    renamed into place instead of copied.
+    """
+    timings = {}
+    start = time.perf_counter()
+    with conn.cursor() as cur:
+        cur.execute(f"DROP TABLE IF EXISTS {STAGING}; "
+                    f"CREATE UNLOGGED TABLE {STAGING} (LIKE {table} INCLUDING DEFAULTS);")
+    header, ranges = split_ranges(csv_file, n)
+    timings["prepare"] = time.perf_counter() - start
+
+    print(f"COPY-loading {csv_file} in {len(ranges)} parallel chunks …")
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=len(ranges)) as pool:
+        counts = list(pool.map(_copy_range, [(csv_file, s, e, header) for s, e in ranges]))
+    rows, rejected = (sum(c) for c in zip(*counts))
+    timings["copy"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    with conn.cursor() as cur:
+        if swap:
+            cur.execute(f"BEGIN; ALTER TABLE {STAGING} SET LOGGED; DROP TABLE {table}; "
+                        f"ALTER TABLE {STAGING} RENAME TO {table}; COMMIT;")
+            timings["set logged + rename"] = time.perf_counter() - start
+        else:
+            cur.execute(f"INSERT INTO {table} SELECT * FROM {STAGING}; DROP TABLE {STAGING};")
+            timings["insert select"] = time.perf_counter() - start
+
+    size = os.path.getsize(csv_file)
+    for stage, secs in timings.items():
+        print(f"  {stage:<20} {secs:0.4f} s")
+    print(f"Finished parallel COPY of {rows:,} rows. COPY stage: "
+          f"{rows / timings['copy']:,.0f} rows/s, {size / timings['copy'] / 1e6:,.1f} MB/s")
+    warn_rejected(rejected)
+
+def reload_with_swap(conn, csv_file: str, parallel: int, maintenance_work_mem: str):
     """
+    Zero-downtime reload: COPY into a fresh index-free shadow table, build the
+    primary key and index with maintenance_work_mem raised, ANALYZE, then
+    rename-swap it with the live table in one transaction.  Readers keep
+    seeing the old rows until the swap commits.
+    """
+    timings = {}
+    start = time.perf_counter()
+    with conn.cursor() as cur:
+        cur.execute(DDL_TEMPLATE.format(table=SHADOW))
+    if parallel > 1:
+        load_with_parallel_copy(conn, csv_file, parallel, swap=True, table=SHADOW)
+    else:
+        load_with_copy(conn, csv_file, table=SHADOW)
+    timings["load"] = time.perf_counter() - start
+
+    with conn.cursor() as cur:
+        start = time.perf_counter()
+        cur.execute("SET maintenance_work_mem = %s", (maintenance_work_mem,))
+        cur.execute(CONSTRAINTS_TEMPLATE.format(table=SHADOW))
+        cur.execute("RESET maintenance_work_mem")
+        timings["build pk + index"] = time.perf_counter() - start
 
-def load_with_inserts(conn, csv_file: str):
+        start = time.perf_counter()
+        cur.execute(f"ANALYZE {SHADOW}")
+        timings["analyze"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        cur.execute(f"""
+            BEGIN;
+            DROP TABLE IF EXISTS {TABLE}_Old;
+            ALTER TABLE IF EXISTS {TABLE} RENAME TO {TABLE}_Old;
+            ALTER TABLE {SHADOW} RENAME TO {TABLE};
+            DROP TABLE IF EXISTS {TABLE}_Old;
+            ALTER INDEX idx_{SHADOW}_State RENAME TO idx_{TABLE}_State;
+            ALTER TABLE {TABLE} RENAME CONSTRAINT {SHADOW}_pkey TO {TABLE}_pkey;
+            COMMIT;
+        """)
+        timings["swap"] = time.perf_counter() - start
+
+    for stage, secs in timings.items():
+        print(f"  {stage:<20} {secs:0.4f} s")
+    print(f"Reloaded {TABLE} via {SHADOW} and swapped it into place.")
+
+def sanitized_rows(csv_file: str):
     with open(csv_file, newline="") as fil:
-        rows = list(csv.DictReader(fil))
-    cmds = [f"INSERT INTO {TABLE} VALUES ({row2vals(r)});" for r in rows]
+        rdr = csv.reader(fil)
+        plan = compile_plan(next(rdr))
+        rejected = 0
+        for row in rdr:
+            if (vals := sanitize_row(row, plan)) is None:
+                rejected += 1
+            else:
+                yield vals
+    warn_rejected(rejected)
+
+def batches(rows, size: int):
+    it = iter(rows)
+    while batch := list(islice(it, size)):
+        yield batch
+
+N_COLS = len(ddl_columns(DDL))
+INSERT_SQL = "INSERT INTO {table} VALUES (%s)" % ", ".join(["%s"] * N_COLS)
+
+def load_with_executemany(conn, csv_file: str, page_size: int = 1000, table: str = TABLE) -> int:
+    rows = 0
+    with conn.cursor() as cur:
+        for batch in batches(sanitized_rows(csv_file), page_size):
+            cur.executemany(INSERT_SQL.format(table=table), batch)
+            rows += len(batch)
+    return rows
+
+def load_with_execute_values(conn, csv_file: str, page_size: int = 1000, table: str = TABLE) -> int:
+    rows = 0
+    with conn.cursor() as cur:
+        for batch in batches(sanitized_rows(csv_file), page_size):
+            execute_values(cur, f"INSERT INTO {table} VALUES %s", batch, page_size=page_size)
+            rows += len(batch)
+    return rows
+
+def load_with_multirow(conn, csv_file: str, page_size: int = 1000, table: str = TABLE) -> int:
+    rows = 0
+    one = f"({', '.join(['%s'] * N_COLS)})"
+    with conn.cursor() as cur:
+        for batch in batches(sanitized_rows(csv_file), page_size):
+            sql = f"INSERT INTO {table} VALUES " + ", ".join([one] * len(batch))
+            cur.execute(sql, [v for row in batch for v in row])
+            rows += len(batch)
+    return rows
+
+def load_with_prepared(conn, csv_file: str, page_size: int = 1000, table: str = TABLE) -> int:
+    rows = 0
+    params = ", ".join(f"${i}" for i in range(1, N_COLS + 1))
     with conn.cursor() as cur:
-        print(f"Inserting {len(cmds):,} rows one-by-one …")
+        cur.execute(f"PREPARE census_ins AS INSERT INTO {table} VALUES ({params})")
+        try:
+            execute = f"EXECUTE census_ins ({', '.join(['%s'] * N_COLS)})"
+            for batch in batches(sanitized_rows(csv_file), page_size):
+                cur.executemany(execute, batch)
+                rows += len(batch)
+        finally:
+            cur.execute("DEALLOCATE census_ins")
+    return rows
+
+def load_with_inserts(conn, csv_file: str, table: str = TABLE):
+    rows = list(sanitized_rows(csv_file))
+    sql = INSERT_SQL.format(table=table)
+    with conn.cursor() as cur:
+        print(f"Inserting {len(rows):,} rows one-by-one …")
         start = time.perf_counter()
-        for c in cmds:
-            cur.execute(c)
+        for row in rows:
+            cur.execute(sql, row)
         secs = time.perf_counter() - start
         print(f"Finished INSERT loop. Elapsed: {secs:0.4f} s")
 
+BATCHED_LOADERS = {
+    "executemany":    load_with_executemany,
+    "execute_values": load_with_execute_values,
+    "multirow":       load_with_multirow,
+    "prepared":       load_with_prepared,
+}
+METHODS = ("copy", "insert", *BATCHED_LOADERS)
+
+def load_with_batches(conn, csv_file: str, method: str, page_size: int, table: str = TABLE):
+    print(f"Inserting with {method} (page size {page_size:,}) …")
+    start = time.perf_counter()
+    with conn.cursor() as cur:       # autocommit connection: one explicit transaction
+        cur.execute("BEGIN")
+        try:
+            rows = BATCHED_LOADERS[method](conn, csv_file, page_size, table)
+        except Exception:
+            cur.execute("ROLLBACK")
+            raise
+        cur.execute("COMMIT")
+    secs = time.perf_counter() - start
+    print(f"Finished {method} of {rows:,} rows. Elapsed: {secs:0.4f} s ({rows / secs:,.0f} rows/s)")
+
+def _wal_lsn(conn):
+    with conn.cursor() as cur:
+        cur.execute("SELECT pg_current_wal_lsn()")
+        return cur.fetchone()[0]
+
+def _benchmark_one(task):
+    """Run one method in a fresh process on a freshly created scratch table."""
+    csv_file, method, page_size = task
+    conn = dbconnect()
+    try:
+        with conn.cursor() as cur:
+            cur.execute(DDL_TEMPLATE.format(table=BENCH))
+            cur.execute("CHECKPOINT")
+        lsn0 = _wal_lsn(conn)
+        start = time.perf_counter()
+        if method == "copy":
+            load_with_copy(conn, csv_file, table=BENCH)
+        elif method == "insert":
+            load_with_inserts(conn, csv_file, table=BENCH)
+        else:
+            load_with_batches(conn, csv_file, method, page_size, table=BENCH)
+        secs = time.perf_counter() - start
+        with conn.cursor() as cur:
+            cur.execute(f"SELECT count(*), pg_wal_lsn_diff(pg_current_wal_lsn(), %s) FROM {BENCH}", (lsn0,))
+            rows, wal = cur.fetchone()
+            cur.execute(f"DROP TABLE {BENCH}")
+    finally:
+        conn.close()
+    return {"method": method, "rows": rows, "secs": secs, "wal_bytes": int(wal),
+            "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024}
+
+def run_benchmark(csv_file: str, page_size: int):
+    results = []
+    for method in METHODS:
+        with ProcessPoolExecutor(max_workers=1) as pool:
+            results.append(pool.submit(_benchmark_one, (csv_file, method, page_size)).result())
+    print(f"\n{'method':<16}{'rows':>10}{'secs':>10}{'rows/s':>12}{'peak RSS MB':>13}{'WAL MB':>10}")
+    for r in results:
+        print(f"{r['method']:<16}{r['rows']:>10,}{r['secs']:>10.2f}{r['rows'] / r['secs']:>12,.0f}"
+              f"{r['peak_rss_mb']:>13,.0f}{r['wal_bytes'] / 1e6:>10,.1f}")
+
 def main():
     args = init_cli()
+    if args.benchmark:
+        run_benchmark(args.datafile, args.page_size)
+        return
     conn = dbconnect()
+    if args.reload:
+        reload_with_swap(conn, args.datafile, args.parallel, args.maintenance_work_mem)
+        return
     if args.createtable:
         with conn.cursor() as cur:
             cur.execute(DDL)
             print(f"Table {TABLE} created.")
-    if args.method == "copy":
+    if args.method == "copy" and args.parallel > 1:
+        load_with_parallel_copy(conn, args.datafile, args.parallel, swap=args.createtable)
+    elif args.method == "copy":
         load_with_copy(conn, args.datafile)
-    else:
+    elif args.method == "insert":
         load_with_inserts(conn, args.datafile)
+    else:
+        load_with_batches(conn, args.datafile, args.method, args.page_size)
     if args.createtable:
+        start = time.perf_counter()
         with conn.cursor() as cur:
             cur.execute(CONSTRAINTS)
-            print("Constraints & index added.")
+        print(f"Constraints & index added. Elapsed: {time.perf_counter() - start:0.4f} s")
 
 if __name__ == "__main__":
     main()
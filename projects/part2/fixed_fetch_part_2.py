@@ -6,44 +6,49 @@ Every exception is logged – nothing silently “continues”.
 
 import concurrent.futures, json, logging, requests
 from datetime import datetime
-from google.cloud import pubsub_v1
+import os, sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from transport import get_transport   # PUBSUB_TRANSPORT=gcp|local
 
 logging.basicConfig(level=logging.INFO,
                     format="[%(asctime)s] %(levelname)s fetch: %(message)s")
 log = logging.getLogger("fetch")
 
 TOPIC_PATH = "projects/somalias-data-eng/topics/breadcrumbs"
-publisher  = pubsub_v1.PublisherClient()
 BASE_URL   = "https://busdata.cs.pdx.edu/api/getBreadCrumbs?vehicle_id="
 
-def publish(msg: str):
-    return publisher.publish(TOPIC_PATH, data=msg.encode())
-
 VEHICLE_IDS = [
     2901, 2902, 2904, 2905, 2907, 2908, 2910, 2922, 2924, 2926, 2929, 2935,
     # … (same list you were already using) …
     4526, 4528, 4530
 ]
 
-publish_futures = []
-for vid in VEHICLE_IDS:
-    url = f"{BASE_URL}{vid}"
+def fetch_vehicle(vid, base_url=BASE_URL, session=requests):
+    """Breadcrumb records of one vehicle, always as a list."""
+    r = session.get(f"{base_url}{vid}", timeout=10)
+    r.raise_for_status()
+    data = r.json()
+    return data if isinstance(data, list) else [data]
+
+def publish_records(publisher, records, topic_path=TOPIC_PATH):
+    return [publisher.publish(topic_path, data=json.dumps(rec).encode()) for rec in records]
+
+def main():
+    publisher = get_transport().publisher()
+    publish_futures = []
+    for vid in VEHICLE_IDS:
+        try:
+            records = fetch_vehicle(vid)
+        except (requests.RequestException, ValueError) as e:
+            log.error("Vehicle %s fetch/parsing error: %s", vid, e)
+            continue
+        publish_futures.extend(publish_records(publisher, records))
+
     try:
-        r = requests.get(url, timeout=10)
-        r.raise_for_status()
-        data = r.json()
-    except (requests.RequestException, ValueError) as e:
-        log.error("Vehicle %s fetch/parsing error: %s", vid, e)
-        continue
-
-    if not isinstance(data, list):
-        data = [data]
-
-    for rec in data:
-        publish_futures.append(publish(json.dumps(rec)))
-
-try:
-    concurrent.futures.wait(publish_futures, timeout=60)
-    log.info("Published %d messages", len(publish_futures))
-except Exception as e:
-    log.error("Waiting on publish futures failed: %s", e)
+        concurrent.futures.wait(publish_futures, timeout=60)
+        log.info("Published %d messages", len(publish_futures))
+    except Exception as e:
+        log.error("Waiting on publish futures failed: %s", e)
+
+if __name__ == "__main__":
+    main()
@@ -8,9 +8,12 @@ import json, logging, io, csv
 from datetime import datetime, timedelta
 from typing import Dict, Callable, List
 
-from google.cloud import pubsub_v1
 import psycopg2
 
+import os, sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from transport import get_transport   # PUBSUB_TRANSPORT=gcp|local
+
 # ────────────────────────────── configuration ──────────────────────────────
 SUBSCRIPTION_PATH = "projects/somalias-data-eng/subscriptions/breadcrumbs-sub"
 DB_CONFIG = {
@@ -29,9 +32,7 @@ logging.basicConfig(level=logging.INFO,
                     format="[%(asctime)s] %(levelname)s %(name)s: %(message)s")
 log = logging.getLogger("receiver")
 
-conn = psycopg2.connect(**DB_CONFIG)
-conn.autocommit = True
-cur  = conn.cursor()
+conn = cur = None                             # connected in main
 
 previous: Dict[int, Dict[str, int]] = {}      # for inter-record checks
 buffer     = io.StringIO()
@@ -128,6 +129,20 @@ def flush():
         log.error("COPY failed: %s", e)
     buffer.truncate(0); buffer.seek(0); rows_in_buf = 0
 
+def to_row(rec: Dict):
+    """breadcrumb table row for *rec*, or None if an assertion rejects it."""
+    if not apply_assertions(rec):
+        return None
+
+    tstamp = opd_to_date(rec["OPD_DATE"]) + timedelta(seconds=rec["ACT_TIME"])
+    previous[rec["EVENT_NO_TRIP"]] = {
+        "ACT_TIME": rec["ACT_TIME"],
+        "METERS":   rec["METERS"],
+        "OPD_DATE": rec["OPD_DATE"],
+    }
+    return [tstamp, rec["GPS_LATITUDE"], rec["GPS_LONGITUDE"],
+            rec["speed"], rec["EVENT_NO_TRIP"]]
+
 # ───────────────────────────── pub/sub callback ────────────────────────────
 def callback(msg):
     global rows_in_buf
@@ -136,20 +151,13 @@ def callback(msg):
     except Exception as e:
         log.error("JSON decode: %s", e); msg.ack(); return
 
-    if not apply_assertions(rec):
+    row = to_row(rec)
+    if row is None:
         msg.ack(); return
 
-    tstamp = opd_to_date(rec["OPD_DATE"]) + timedelta(seconds=rec["ACT_TIME"])
-    csv_writer.writerow([tstamp, rec["GPS_LATITUDE"], rec["GPS_LONGITUDE"],
-                         rec["speed"], rec["EVENT_NO_TRIP"]])
+    csv_writer.writerow(row)
     rows_in_buf += 1
 
-    previous[rec["EVENT_NO_TRIP"]] = {
-        "ACT_TIME": rec["ACT_TIME"],
-        "METERS":   rec["METERS"],
-        "OPD_DATE": rec["OPD_DATE"],
-    }
-
     if rows_in_buf >= BATCH_SIZE:
         flush()
 
@@ -157,8 +165,12 @@ def callback(msg):
 
 # ──────────────────────────────── main ─────────────────────────────────────
 if __name__ == "__main__":
+    conn = psycopg2.connect(**DB_CONFIG)
+    conn.autocommit = True
+    cur  = conn.cursor()
+
     log.info("Receiver starting — subscribing to %s", SUBSCRIPTION_PATH)
-    subscriber = pubsub_v1.SubscriberClient()
+    subscriber = get_transport().subscriber()
     future = subscriber.subscribe(SUBSCRIPTION_PATH, callback=callback)
     try:
         future.result()
@@ -4,13 +4,14 @@ from __future__ import annotations
 import json
 import logging
 import os
+import sys
 from dataclasses import dataclass
 from typing import Any, Dict
 
-import google.auth
-from google.oauth2 import service_account
 import psycopg2
-from google.cloud import pubsub_v1
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from transport import get_transport  # noqa: E402  PUBSUB_TRANSPORT=gcp|local
 
 # ─── Logging ─────────────────────────────────────────────────────────
 logging.basicConfig(
@@ -19,22 +20,33 @@ logging.basicConfig(
 )
 logger = logging.getLogger("stop_events")
 
-# ─── Pub/Sub credentials (force pubsub scope) ───────────────────────
-SCOPES = ["https://www.googleapis.com/auth/pubsub"]
-
-if "GOOGLE_APPLICATION_CREDENTIALS" in os.environ:
-    CREDS = service_account.Credentials.from_service_account_file(
-        os.environ["GOOGLE_APPLICATION_CREDENTIALS"], scopes=SCOPES
-    )
-else:
-    CREDS, _ = google.auth.default(scopes=SCOPES)
-
-PROJECT_ID = os.getenv("GCP_PROJECT") or CREDS.project_id
+# ─── Pub/Sub transport (Cloud Pub/Sub, or the local broker offline) ─
+transport = get_transport()
 TOPIC_ID = os.getenv("STOP_TOPIC", "stop-events-topic")
 SUB_ID = os.getenv("STOP_SUBSCRIPTION", "stop-events-sub")
 
-publisher = pubsub_v1.PublisherClient(credentials=CREDS)
-subscriber = pubsub_v1.SubscriberClient(credentials=CREDS)
+if transport.name == "gcp":
+    # credentials (force pubsub scope)
+    import google.auth
+    from google.oauth2 import service_account
+
+    SCOPES = ["https://www.googleapis.com/auth/pubsub"]
+
+    if "GOOGLE_APPLICATION_CREDENTIALS" in os.environ:
+        CREDS = service_account.Credentials.from_service_account_file(
+            os.environ["GOOGLE_APPLICATION_CREDENTIALS"], scopes=SCOPES
+        )
+    else:
+        CREDS, _ = google.auth.default(scopes=SCOPES)
+
+    PROJECT_ID = os.getenv("GCP_PROJECT") or CREDS.project_id
+    publisher = transport.publisher(credentials=CREDS)
+    subscriber = transport.subscriber(credentials=CREDS)
+else:
+    PROJECT_ID = os.getenv("GCP_PROJECT", "local")
+    transport.create_subscription(SUB_ID, TOPIC_ID)
+    publisher = transport.publisher()
+    subscriber = transport.subscriber()
 
 TOPIC_PATH = publisher.topic_path(PROJECT_ID, TOPIC_ID)
 SUB_PATH = subscriber.subscription_path(PROJECT_ID, SUB_ID)
@@ -14,8 +14,6 @@ from __future__ import annotations
 import json
 from datetime import datetime, timedelta
 
-from google.cloud import pubsub_v1
-
 from .common import SUB_PATH, connect_db, logger, validate_stop, subscriber
 
 
@@ -55,7 +53,7 @@ class StopEventReceiver:
             logger.error("DB insert failed: %s", exc, exc_info=True)
 
     # ------------------------------------------------------------------ #
-    def _callback(self, message: pubsub_v1.subscriber.message.Message) -> None:
+    def _callback(self, message) -> None:
         try:
             rec = json.loads(message.data)
             if validate_stop(rec):
@@ -0,0 +1,111 @@
+"""
+Headless-safe reporting shared by the analysis scripts.
+
+    p = argparse.ArgumentParser()
+    add_report_args(p)                 # --json PATH, --plots DIR, --show
+    ...
+    figs = Figures.from_args(args)
+    if figs.enabled:
+        plt = figs.pyplot()            # matplotlib imported only here
+        ...
+        figs.emit('heatmap')           # → DIR/heatmap.png and/or plt.show()
+    write_json(args.json, correlations=corr, stats=df.describe())
+
+Nothing is plotted unless --plots or --show is given, so batch runs never
+import matplotlib.  Without a display (or when only writing files)
+matplotlib uses the Agg backend and never opens a window.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import os
+import sys
+from pathlib import Path
+from typing import Any, Optional
+
+
+def headless() -> bool:
+    """True when no GUI is available, so plt.show() would block or fail."""
+    return sys.platform.startswith('linux') and not os.environ.get('DISPLAY')
+
+
+def add_report_args(p: argparse.ArgumentParser, json_help: str = 'write numeric results as JSON') -> None:
+    p.add_argument('--json', default=None, metavar='PATH', help=json_help)
+    p.add_argument('--plots', default=None, metavar='DIR', help='save figures as PNG files in DIR')
+    p.add_argument('--show', action='store_true', help='display figures interactively')
+
+
+class Figures:
+    def __init__(self, plots_dir: Optional[str] = None, show: bool = False):
+        self.plots_dir = Path(plots_dir) if plots_dir else None
+        self.show = show and not headless()
+        if show and not self.show:
+            print('[WARN] no display available; --show ignored')
+        self._plt = None
+
+    @classmethod
+    def from_args(cls, args: argparse.Namespace) -> 'Figures':
+        return cls(args.plots, args.show)
+
+    @property
+    def enabled(self) -> bool:
+        return self.plots_dir is not None or self.show
+
+    def pyplot(self):
+        """matplotlib.pyplot, imported on first use (Agg unless figures are shown)."""
+        if self._plt is None:
+            import matplotlib
+            if not self.show:
+                matplotlib.use('Agg')
+            import matplotlib.pyplot as plt
+            self._plt = plt
+        return self._plt
+
+    def emit(self, name: str, fig=None) -> None:
+        """Save the current (or given) figure as DIR/<name>.png and/or show it, then close it."""
+        plt = self.pyplot()
+        fig = fig or plt.gcf()
+        if self.plots_dir is not None:
+            self.plots_dir.mkdir(parents=True, exist_ok=True)
+            out = self.plots_dir / f'{name}.png'
+            fig.savefig(out, bbox_inches='tight')
+            print(f'[INFO] figure → {out}')
+        if self.show:
+            plt.show()
+        plt.close(fig)
+
+
+def to_jsonable(obj: Any) -> Any:
+    """numpy / pandas values → plain JSON types (NaN and NaT → null)."""
+    import numpy as np
+    import pandas as pd
+
+    if isinstance(obj, pd.DataFrame):
+        return {str(c): to_jsonable(obj[c]) for c in obj.columns}
+    if isinstance(obj, pd.Series):
+        return {str(k.isoformat() if hasattr(k, 'isoformat') else k): to_jsonable(v) for k, v in obj.items()}
+    if isinstance(obj, dict):
+        return {str(k): to_jsonable(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple, np.ndarray)):
+        return [to_jsonable(v) for v in obj]
+    if isinstance(obj, (pd.Timestamp, pd.Timedelta)):
+        return None if pd.isna(obj) else obj.isoformat()
+    if obj is pd.NaT or obj is pd.NA:
+        return None
+    if isinstance(obj, np.generic):
+        obj = obj.item()
+    if isinstance(obj, float) and not math.isfinite(obj):
+        return None
+    return obj
+
+
+def write_json(path: Optional[str], **results: Any) -> None:
+    """Write *results* to *path* as JSON; a no-op when *path* is None."""
+    if not path:
+        return
+    with open(path, 'w') as f:
+        json.dump(to_jsonable(results), f, indent=2)
+    print(f'[INFO] results → {path}')
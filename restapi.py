@@ -1,36 +1,27 @@
-import requests
 from datetime import datetime, timedelta
 
-api_key = "API_KEY"
+from weather import WeatherClient, forecast_frame
+
 city = 'Portland,US'
 
-current_weather_url = f'http://api.openweathermap.org/data/2.5/weather?q={city}&appid={api_key}&units=metric'
-current_response = requests.get(current_weather_url)
-current_data = current_response.json()
+# current conditions and forecast, fetched concurrently and cached for 10 minutes
+data = WeatherClient().fetch(city)
+current_data = data['weather']
 
 if 'rain' in current_data:
     print("A. Yes, it is raining in Portland, OR.")
 else:
     print("A. No, it is not raining in Portland, OR right now.")
 
-forecast_url = f'http://api.openweathermap.org/data/2.5/forecast?q={city}&appid={api_key}&units=metric'
-forecast_response = requests.get(forecast_url)
-forecast_data = forecast_response.json()
-
-rain_forecast = False
-rain_times = []
+forecast = forecast_frame(data['forecast'])
 
 now = datetime.now()
 three_days_later = now + timedelta(days=3)
 
-for entry in forecast_data['list']:
-    forecast_time = datetime.strptime(entry['dt_txt'], "%Y-%m-%d %H:%M:%S")
-    if now <= forecast_time <= three_days_later:
-        if 'rain' in entry:
-            rain_forecast = True
-            rain_times.append(entry['dt_txt'])
+in_window = forecast['time'].between(now, three_days_later)
+rain_times = forecast.loc[in_window & forecast['rain'], 'time'].dt.strftime("%Y-%m-%d %H:%M:%S")
 
-if rain_forecast:
+if len(rain_times):
     print(f"B. Yes, rain.")
     print("Rain expected at:")
     for time in rain_times:
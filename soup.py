@@ -1,142 +1,156 @@
-import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
-# %matplotlib inline
-from urllib.request import urlopen
-from bs4 import BeautifulSoup
-url = "http://www.hubertiming.com/results/2017GPTR10K"
-html = urlopen(url)
-
-soup = BeautifulSoup(html, 'lxml')
-type(soup)
-
-# Get the title
-title = soup.title
-text = soup.get_text()
-##print(title)
-
-soup.find_all('a')
-
-all_links = soup.find_all("a")
-for link in all_links:
-    print(link.get("href"))
-
-# Print the first 10 rows for sanity check
-rows = soup.find_all('tr')
-print(rows[:10])
-
-for row in rows:
-    row_td = row.find_all('td')
-print(row_td)
-type(row_td)
-
-str_cells = str(row_td)
-cleantext = BeautifulSoup(str_cells, "lxml").get_text()
-print(cleantext)
-
-import re
-
-list_rows = []
-for row in rows:
-    cells = row.find_all('td')
-    str_cells = str(cells)
-    clean = re.compile('<.*?>')
-    clean2 = (re.sub(clean, '',str_cells))
-    list_rows.append(clean2)
-print(clean2)
-type(clean2)
-
-df = pd.DataFrame(list_rows)
-df.head(10)
-
-df1 = df[0].str.split(',', expand=True)
-df1.head(20)
-
-col_labels = soup.find_all('th')
-all_header = []
-col_str = str(col_labels)
-cleantext2 = BeautifulSoup(col_str, "lxml").get_text()
-all_header.append(cleantext2)
-print(all_header)
-
-df2 = pd.DataFrame(all_header)
-df2.head()
-
-df3 = df2[0].str.split(',', expand=True)
-df3.head()
-
-frames = [df3, df1]
+"""
+Race results scraper.
 
-df4 = pd.concat(frames)
-df4.head(10)
+    python soup.py [URL or saved .html] [--save page.html]
+                   [--json stats.json] [--plots DIR] [--show]
 
-df5 = df4.rename(columns=df4.iloc[0])
-df5.head()
+The results table is pulled straight from the lxml tree in one pass
+(extract_table) into typed columns; chip and gun times become minutes with a
+vectorized parser.  bench_soup.py times this against the old regex pipeline
+on a saved copy of the page.
+"""
 
-df5.info()
-df5.shape
-
-df6 = df5.dropna(axis=0, how='any')
-df6.info()
-df6.shape
-
-df7 = df6.drop(df6.index[0])
-df7.head()
-
-df7.rename(columns={'[Place': 'Place'},inplace=True)
-df7.rename(columns={' Team]': 'Team'},inplace=True)
-df7.head()
-
-df7['Team'] = df7['Team'].str.strip(']')
-df7.head()
-
-time_list = df7[' Gun Time'].tolist()
-time_mins = []
-
-for i in time_list:
-    parts = i.strip().split(':')
-    # If time is hh:mm:ss
-    if len(parts) == 3:
-        h, m, s = parts
-    # If time is hh:mm
-    elif len(parts) == 2:
-        h, m = parts
-        s = 0
-    else:
-        print(f"Unexpected format: {i}")
-        continue  # Skip any malformed entries
-
-    total_seconds = int(h) * 3600 + int(m) * 60 + int(s)
-    time_mins.append(total_seconds / 60)
-
-df7['Runner_mins'] = time_mins
-df7.head()
-
-df7.describe(include=[np.number])
-
-from pylab import rcParams
-rcParams['figure.figsize'] = 15, 5
-
-
-df7.boxplot(column='Runner_mins')
-plt.grid(True, axis='y')
-plt.ylabel('Chip Time')
-plt.xticks([1], ['Runners'])
-
-x = df7['Runner_mins']
-ax = sns.distplot(x, hist=True, kde=True, rug=False, color='m', bins=25, hist_kws={'edgecolor':'black'})
-plt.show()
-
-f_fuko = df7.loc[df7[' Gender']==' F']['Runner_mins']
-m_fuko = df7.loc[df7[' Gender']==' M']['Runner_mins']
-sns.distplot(f_fuko, hist=True, kde=True, rug=False, hist_kws={'edgecolor':'black'}, label='Female')
-sns.distplot(m_fuko, hist=False, kde=True, rug=False, hist_kws={'edgecolor':'black'}, label='Male')
-plt.legend()
+import argparse
+from urllib.request import urlopen
 
-g_stats = df7.groupby(" Gender", as_index=True).describe()
-print(g_stats)
+import lxml.html
+import numpy as np
+import pandas as pd
 
-df7.boxplot(column='Runner_mins', by=' Gender')
-plt.ylabel('Chip Time')
-plt.suptitle("")
\ No newline at end of file
+from reporting import Figures, add_report_args, write_json
+
+URL = "http://www.hubertiming.com/results/2017GPTR10K"
+INT_COLUMNS = ["Place", "Bib", "Gender Place", "Age Group Place"]
+CATEGORY_COLUMNS = ["Gender", "Age Group", "City", "State", "Team"]
+TIME_COLUMNS = {"Chip Time": "Chip_mins", "Gun Time": "Gun_mins"}
+
+
+def read_page(source):
+    """HTML bytes from a URL or a saved file."""
+    if source.startswith(("http://", "https://")):
+        with urlopen(source, timeout=30) as resp:
+            return resp.read()
+    with open(source, "rb") as f:
+        return f.read()
+
+
+def extract_table(html, header_tag="th"):
+    """
+    Header and body cells of the page's results rows, as a frame of strings.
+    Cell text comes from the parsed tree, so commas inside a cell (e.g.
+    "Smith, Jr.") stay in that cell.  Rows whose width differs from the
+    header (blank or layout rows) are dropped.
+    """
+    root = lxml.html.fromstring(html)
+    header, rows = None, []
+    for tr in root.iter("tr"):
+        if header is None:
+            ths = tr.findall(header_tag)
+            if ths:
+                header = [th.text_content().strip() for th in ths]
+            continue
+        cells = [td.text_content().strip() for td in tr.findall("td")]
+        if len(cells) == len(header):
+            rows.append(cells)
+    if header is None:
+        raise ValueError("no table header found")
+    return pd.DataFrame(rows, columns=header)
+
+
+def time_to_minutes(times):
+    """
+    Vectorized 'h:mm:ss' / 'mm:ss' / 'm:ss' → minutes (float); anything else,
+    including minutes or seconds above 59, → NaN.
+    Each time is right-aligned into a fixed 'hh:mm:ss' field and its digits
+    are read straight from the UCS-4 code points.
+    """
+    a = np.char.strip(np.asarray(times, dtype=str))
+    mm_ss = np.char.count(a, ":") == 1
+    a = np.where(mm_ss, np.char.add(np.where(np.char.str_len(a) == 4, "0:0", "0:"), a), a)
+    a = np.where(np.char.str_len(a) <= 8, a, "")
+    a = np.char.rjust(a.astype("U8"), 8, "0")
+    d = a.view(np.uint32).reshape(len(a), 8).astype(np.int64) - ord("0")
+    digits = d[:, [0, 1, 3, 4, 6, 7]]
+    ok = (d[:, [2, 5]] == ord(":") - ord("0")).all(axis=1) & ((digits >= 0) & (digits <= 9)).all(axis=1)
+    ok &= (d[:, 3] <= 5) & (d[:, 6] <= 5)
+    mins = (d[:, 0] * 10 + d[:, 1]) * 60 + d[:, 3] * 10 + d[:, 4] + (d[:, 6] * 10 + d[:, 7]) / 60
+    return pd.Series(np.where(ok, mins, np.nan), index=times.index if isinstance(times, pd.Series) else None)
+
+
+def typed_results(df):
+    """Convert the extracted strings into numeric, categorical and minutes columns."""
+    df = df.copy()
+    for c in INT_COLUMNS:
+        if c in df:
+            df[c] = pd.to_numeric(df[c], errors="coerce").astype("Int32")
+    for c in CATEGORY_COLUMNS:
+        if c in df:
+            df[c] = df[c].astype("category")
+    for c, mins in TIME_COLUMNS.items():
+        if c in df:
+            df[mins] = time_to_minutes(df[c])
+    if "Gun_mins" in df:
+        df["Runner_mins"] = df["Gun_mins"]
+    return df
+
+
+def plot(df7, figures):
+    plt = figures.pyplot()
+    import seaborn as sns
+
+    plt.figure(figsize=(15, 5))
+    df7.boxplot(column='Runner_mins')
+    plt.grid(True, axis='y')
+    plt.ylabel('Chip Time')
+    plt.xticks([1], ['Runners'])
+    figures.emit('runner_boxplot')
+
+    plt.figure(figsize=(15, 5))
+    sns.histplot(df7['Runner_mins'], kde=True, color='m', bins=25, edgecolor='black', stat='density')
+    figures.emit('runner_distribution')
+
+    plt.figure(figsize=(15, 5))
+    f_fuko = df7.loc[df7['Gender']=='F']['Runner_mins']
+    m_fuko = df7.loc[df7['Gender']=='M']['Runner_mins']
+    sns.histplot(f_fuko, kde=True, edgecolor='black', stat='density', label='Female')
+    sns.kdeplot(m_fuko, color='C1', label='Male')
+    plt.legend()
+    figures.emit('gender_distribution')
+
+    df7.boxplot(column='Runner_mins', by='Gender', figsize=(15, 5))
+    plt.ylabel('Chip Time')
+    plt.suptitle("")
+    figures.emit('gender_boxplot')
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("source", nargs="?", default=URL, help="results URL or a saved copy of the page")
+    ap.add_argument("--save", default=None, help="also write the fetched HTML here")
+    add_report_args(ap, "write describe() statistics (overall and by gender) as JSON")
+    args = ap.parse_args()
+
+    html = read_page(args.source)
+    if args.save:
+        with open(args.save, "wb") as f:
+            f.write(html)
+
+    df7 = typed_results(extract_table(html))
+    print(f"{len(df7):,} results")
+    print(df7.head())
+
+    stats = df7.describe(include=[np.number])
+    print(stats)
+
+    g_stats = df7.groupby("Gender", observed=True)["Runner_mins"].describe()
+    print(g_stats)
+
+    write_json(args.json, results=len(df7), describe=stats, by_gender=g_stats.T)
+
+    figures = Figures.from_args(args)
+    if figures.enabled:
+        plot(df7, figures)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,6 @@
 from concurrent.futures import TimeoutError
-from google.cloud import pubsub_v1
+
+from transport import get_transport
 
 # TODO(developer)
 project_id = "introspec-duale-duale"
@@ -7,12 +8,12 @@ subscription_id = "my-sub"
 # Number of seconds the subscriber should listen for messages
 timeout = 5.0
 
-subscriber = pubsub_v1.SubscriberClient()
+subscriber = get_transport().subscriber()
 # The `subscription_path` method creates a fully qualified identifier
 # in the form `projects/{project_id}/subscriptions/{subscription_id}`
 subscription_path = subscriber.subscription_path(project_id, subscription_id)
 
-def callback(message: pubsub_v1.subscriber.message.Message) -> None:
+def callback(message) -> None:
     print(f"Received {message}.")
     message.ack()
 
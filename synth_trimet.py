@@ -0,0 +1,428 @@
+#!/usr/bin/env python3
+"""
+Seeded synthetic TriMet data: breadcrumbs, stop events and RELPOS.
+
+    python synth_trimet.py --rows 10M [--out synth] [--seed 0] [--start 2022-12-07]
+                           [--vehicles 600] [--violation-rate 0.001] [--biased 0.02]
+                           [--formats csv,json,copy,stops,relpos]
+
+Vehicles run back-to-back trips through a service day, pinging every ~5 s;
+positions follow a heading random walk inside the Portland bounding box and
+METERS is the trip odometer.  Once every vehicle has run its day the next
+service day starts, so 100M rows span about two weeks.  Each vehicle-day is
+generated from its own seed, so a file's first N rows don't depend on --rows.
+
+Formats (all under --out):
+    csv     breadcrumbs.csv            trip-CSV layout (datatransform, enrich_weather)
+    json    bcsample.json              "--- Vehicle ID ---" blocks (topic.py)
+    copy    breadcrumb_copy.csv        post-validation rows for COPY into breadcrumb
+    stops   trimet_stopevents_DAY.html stop-event pages (DetectBias, part3 publisher)
+    relpos  trimet_relpos_DAY.csv      GPS relative positions (DetectBias)
+
+--violation-rate breadcrumbs each break exactly one of the receiver's ten
+assertions (VIOLATIONS); --biased vehicles get a boarding, offs/ons or GPS
+bias in their stop events / RELPOS.  manifest.json records the parameters,
+counts, violations per assertion and the biased vehicles, so benchmarks and
+detectors can be checked against what was injected.
+"""
+
+import argparse
+import json
+import math
+from datetime import date, timedelta
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from reporting import write_json
+
+FLEET = np.arange(2901, 4601)
+BREADCRUMB_COLUMNS = ["EVENT_NO_TRIP", "EVENT_NO_STOP", "OPD_DATE", "VEHICLE_ID", "METERS", "ACT_TIME",
+                      "GPS_LONGITUDE", "GPS_LATITUDE", "GPS_SATELLITES", "GPS_HDOP"]
+STOP_EVENT_COLUMNS = ["vehicle_number", "leave_time", "train", "route_number", "direction", "service_key",
+                      "trip_number", "stop_time", "arrive_time", "dwell", "location_id", "door", "lift",
+                      "ons", "offs", "estimated_load", "maximum_speed", "train_mileage", "pattern_distance",
+                      "location_distance", "x_coordinate", "y_coordinate", "data_source", "schedule_status"]
+FORMATS = ("csv", "json", "copy", "stops", "relpos")
+
+# fixed_receiver_part_2.ASSERTIONS, in order; the last three compare with the trip's previous row
+VIOLATIONS = ("required", "act_time", "coords", "satellites", "hdop_positive", "meters_consistency",
+              "hdop_reasonable", "same_service_day", "time_forward", "speed")
+BIAS_KINDS = ("boarding", "offs_ons", "gps")
+
+PING_S = 5
+SERVICE_START, SERVICE_END = 5 * 3600, 23 * 3600 + 1800
+TRIP_PINGS = (120, 720)                      # 10–60 minute trips
+MIN_TRIP_PINGS = 20
+LAT, LON = (45.42, 45.62), (-122.85, -122.45)
+M_PER_DEG_LAT = 111_320.0
+M_PER_DEG_LON = M_PER_DEG_LAT * math.cos(math.radians(45.52))
+FULL_DAY = (SERVICE_END - SERVICE_START) // PING_S
+
+
+def parse_count(text):
+    """'1000', '1k', '2.5M', '100M' → int."""
+    text = str(text).strip().upper()
+    scale = {"K": 10**3, "M": 10**6, "G": 10**9}.get(text[-1:], 1)
+    return int(float(text[:-1] if scale > 1 else text) * scale)
+
+
+def opd_date(day):
+    return day.strftime("%d%b%Y").upper() + ":00:00:00"
+
+
+def make_network(rng, n_routes=80, n_locations=13_000):
+    """Routes as (stop spacing in metres, location ids in stop order)."""
+    return [(float(rng.uniform(250, 500)), rng.choice(n_locations, size=int(rng.integers(30, 91)),
+                                                      replace=False) + 1)
+            for _ in range(n_routes)]
+
+
+def pick_biased(rng, vehicles, fraction):
+    """{vehicle: bias kind} for round(fraction * fleet) vehicles."""
+    n = int(round(fraction * len(vehicles)))
+    chosen = rng.choice(vehicles, size=n, replace=False)
+    return {int(v): BIAS_KINDS[i % len(BIAS_KINDS)] for i, v in enumerate(sorted(chosen))}
+
+
+def _reflect(x, lo, hi):
+    """Fold *x* into [lo, hi] (a triangle wave), so random walks bounce off the box."""
+    span = hi - lo
+    y = np.mod(x - lo, 2 * span)
+    return lo + np.where(y > span, 2 * span - y, y)
+
+
+def _trip_layout(rng, budget):
+    """Start times and ping counts of a vehicle's trips, up to *budget* pings."""
+    starts, lengths, used = [], [], 0
+    t = SERVICE_START + int(rng.integers(0, 3 * 3600))
+    while used < budget:
+        n = min(int(rng.integers(*TRIP_PINGS)), budget - used)
+        if n < MIN_TRIP_PINGS and lengths:
+            break
+        if t + (n + 1) * (PING_S + 1) > SERVICE_END:
+            break
+        starts.append(t)
+        lengths.append(n)
+        used += n
+        t += n * PING_S + int(rng.integers(300, 1200))   # layover
+    return np.array(starts, dtype=np.int64), np.array(lengths, dtype=np.int64)
+
+
+def vehicle_day(seed, day_index, day, vehicle, budget, trip_base, network, bias, violation_rate):
+    """
+    One vehicle's service day: (breadcrumbs, stop events, RELPOS, violation
+    kind per breadcrumb or -1).  Trips are numbered from *trip_base*.
+    """
+    rng = np.random.default_rng([seed, day_index, int(vehicle)])
+    starts, lengths = _trip_layout(rng, budget)
+    n, k = int(lengths.sum()), len(lengths)
+    trip = np.repeat(np.arange(k), lengths)
+    first = np.zeros(n, dtype=bool)
+    first[np.cumsum(lengths) - lengths] = True
+
+    def per_trip_cumsum(x):
+        c = np.cumsum(x)
+        return c - np.repeat(c[first] - x[first], lengths)
+
+    dt = rng.integers(PING_S - 1, PING_S + 2, size=n)
+    dt[first] = 0
+    act_time = np.repeat(starts, lengths) + per_trip_cumsum(dt)
+
+    moving = rng.random(n) > 0.2
+    speed = np.where(moving, np.minimum(rng.gamma(2.0, 3.5, size=n), 22.0), 0.0)
+    dm = np.rint(speed * dt).astype(np.int64)
+    dist = per_trip_cumsum(dm)
+    meters = np.repeat(rng.integers(1, 500, size=k), lengths) + dist
+
+    heading = per_trip_cumsum(rng.normal(0, 0.15, size=n)) + np.repeat(rng.uniform(0, 2 * np.pi, k), lengths)
+    north = per_trip_cumsum(dm * np.cos(heading)) / M_PER_DEG_LAT
+    east = per_trip_cumsum(dm * np.sin(heading)) / M_PER_DEG_LON
+    lat = _reflect(np.repeat(rng.uniform(*LAT, k), lengths) + north, *LAT)
+    lon = _reflect(np.repeat(rng.uniform(*LON, k), lengths) + east, *LON)
+
+    trip_ids = trip_base + np.arange(k)
+    crumbs = pd.DataFrame({
+        "EVENT_NO_TRIP": trip_ids[trip],
+        "EVENT_NO_STOP": trip_ids[trip],
+        "OPD_DATE": opd_date(day),
+        "VEHICLE_ID": np.int32(vehicle),
+        "METERS": meters,
+        "ACT_TIME": act_time,
+        "GPS_LONGITUDE": lon.round(6),
+        "GPS_LATITUDE": lat.round(6),
+        "GPS_SATELLITES": rng.integers(6, 17, size=n),
+        "GPS_HDOP": rng.uniform(0.6, 2.5, size=n).round(1),
+    })
+    kinds = _inject(rng, crumbs, first, violation_rate, day)
+
+    stops = _stop_events(rng, vehicle, trip_ids, lengths, trip, dist, act_time, lat, lon, speed,
+                         network, bias.get(int(vehicle)), day_index)
+    relpos = pd.DataFrame({"VEHICLE_NUMBER": np.int32(vehicle),
+                           "RELPOS": (rng.normal(0, 0.35, size=n)
+                                      + (0.12 if bias.get(int(vehicle)) == "gps" else 0.0)).round(4)})
+    return crumbs, stops, relpos, kinds
+
+
+def _inject(rng, crumbs, first, rate, day):
+    """Break one assertion in ~*rate* of the rows, in place; returns the kind index per row (-1 = clean)."""
+    n = len(crumbs)
+    kinds = np.where(rng.random(n) < rate, rng.integers(0, len(VIOLATIONS), size=n), -1)
+    kinds[first & (kinds >= VIOLATIONS.index("same_service_day"))] = -1   # those need a previous row
+    if not (kinds >= 0).any():
+        return kinds
+
+    def rows(name):
+        return np.flatnonzero(kinds == VIOLATIONS.index(name))
+
+    prev_time = np.roll(crumbs["ACT_TIME"].to_numpy(), 1)
+    prev_meters = np.roll(crumbs["METERS"].to_numpy(), 1)
+    for c in ("GPS_LATITUDE", "GPS_SATELLITES", "GPS_HDOP"):
+        crumbs[c] = crumbs[c].astype("float64")
+    crumbs.loc[rows("required"), "GPS_LATITUDE"] = np.nan
+    crumbs.loc[rows("act_time"), "ACT_TIME"] = 86_400 + rng.integers(0, 3600, size=len(rows("act_time")))
+    crumbs.loc[rows("coords"), "GPS_LATITUDE"] = 47.2
+    crumbs.loc[rows("satellites"), "GPS_SATELLITES"] = 2
+    crumbs.loc[rows("hdop_positive"), "GPS_HDOP"] = 0.0
+    crumbs.loc[rows("meters_consistency"), "METERS"] = 0
+    crumbs.loc[rows("hdop_reasonable"), "GPS_HDOP"] = 12.5
+    crumbs.loc[rows("same_service_day"), "OPD_DATE"] = opd_date(day + timedelta(days=1))
+    crumbs.loc[rows("time_forward"), "ACT_TIME"] = prev_time[rows("time_forward")] - 30
+    crumbs.loc[rows("speed"), "METERS"] = prev_meters[rows("speed")] + 5_000
+    # integer columns that were never nulled go back to ints
+    for c in ("GPS_SATELLITES",):
+        if not crumbs[c].isna().any():
+            crumbs[c] = crumbs[c].astype("int64")
+    return kinds
+
+
+def _stop_events(rng, vehicle, trip_ids, lengths, trip, dist, act_time, lat, lon, speed, network,
+                 bias, day_index):
+    """Stops every route spacing along each trip, at the ping that first reaches it."""
+    k = len(trip_ids)
+    routes = rng.integers(0, len(network), size=k)
+    spacing = np.array([network[r][0] for r in routes])
+    trip_len = dist[np.cumsum(lengths) - 1]
+    n_stops = np.minimum((trip_len // spacing).astype(np.int64), [len(network[r][1]) for r in routes])
+    if n_stops.sum() == 0:
+        return pd.DataFrame(columns=["trip_id", *STOP_EVENT_COLUMNS])
+
+    stop_trip = np.repeat(np.arange(k), n_stops)
+    seq = np.arange(n_stops.sum()) - np.repeat(np.cumsum(n_stops) - n_stops, n_stops)
+    # dist is non-decreasing within a trip; offset trips so one searchsorted covers them all
+    key = trip * 1e9 + dist
+    ping = np.searchsorted(key, stop_trip * 1e9 + (seq + 1) * spacing[stop_trip])
+    location = np.concatenate([network[r][1][:s] for r, s in zip(routes, n_stops)])
+
+    m = len(ping)
+    ons = rng.poisson(1.2, size=m)
+    offs = rng.poisson(2.0 if bias == "offs_ons" else 1.2, size=m)
+    if bias == "boarding":
+        # half the stops board nobody; their riders board at the other stops
+        # instead, so the vehicle's ons total (and offs/ons balance) is unchanged
+        keep = rng.random(m) < 0.5
+        if keep.any():
+            moved = int(ons[~keep].sum())
+            ons = np.where(keep, ons, 0)
+            np.add.at(ons, rng.choice(np.flatnonzero(keep), size=moved), 1)
+    dwell = np.where(ons + offs > 0, rng.integers(3, 30, size=m), 0)
+    arrive = act_time[ping]
+    return pd.DataFrame({
+        "trip_id": trip_ids[stop_trip],
+        "vehicle_number": vehicle,
+        "leave_time": arrive + dwell,
+        "train": 1000 + day_index * 10 + (vehicle % 10),
+        "route_number": routes[stop_trip] + 1,
+        "direction": trip_ids[stop_trip] % 2,
+        "service_key": "W",
+        "trip_number": (trip_ids[stop_trip] % 10_000),
+        "stop_time": arrive + rng.integers(-60, 180, size=m),
+        "arrive_time": arrive,
+        "dwell": dwell,
+        "location_id": location,
+        "door": (dwell > 0).astype(int),
+        "lift": 0,
+        "ons": ons,
+        "offs": offs,
+        "estimated_load": rng.integers(0, 40, size=m),
+        "maximum_speed": np.rint(speed[ping] * 2.237).astype(int),
+        "train_mileage": (dist[ping] / 1609.34).round(2),
+        "pattern_distance": np.rint(dist[ping] * 3.281).astype(int),
+        "location_distance": rng.integers(0, 60, size=m),
+        "x_coordinate": (7_640_000 + (lon[ping] + 122.68) * M_PER_DEG_LON * 3.281).round(1),
+        "y_coordinate": (680_000 + (lat[ping] - 45.52) * M_PER_DEG_LAT * 3.281).round(1),
+        "data_source": 0,
+        "schedule_status": 5,
+    })
+
+
+def copy_rows(crumbs, kinds, day):
+    """What the receiver would COPY: rows passing every assertion, with its speed (vs the trip's last passing row)."""
+    ok = crumbs[kinds < 0]
+    prev = ok.groupby("EVENT_NO_TRIP", sort=False)[["ACT_TIME", "METERS"]].shift()
+    dt = ok["ACT_TIME"] - prev["ACT_TIME"]
+    speed = ((ok["METERS"] - prev["METERS"]) / dt.where(dt != 0)).fillna(0.0)
+    return pd.DataFrame({
+        "tstamp": pd.Timestamp(day) + pd.to_timedelta(ok["ACT_TIME"], unit="s"),
+        "latitude": ok["GPS_LATITUDE"],
+        "longitude": ok["GPS_LONGITUDE"],
+        "speed": speed.round(3),
+        "trip_id": ok["EVENT_NO_TRIP"],
+    })
+
+
+def stop_tables_html(stops):
+    """One "Stop events for PDX_TRIP <id>" heading and table per trip."""
+    out = []
+    header = "<tr>" + "".join(f"<th>{c}</th>" for c in STOP_EVENT_COLUMNS) + "</tr>\n"
+    cells = stops[STOP_EVENT_COLUMNS].astype(str).to_numpy()
+    bounds = np.flatnonzero(np.diff(stops["trip_id"].to_numpy())) + 1
+    for block, trip_id in zip(np.split(cells, bounds), stops["trip_id"].to_numpy()[np.r_[0, bounds]]):
+        out.append(f"<h2>Stop events for PDX_TRIP {trip_id}</h2>\n<table>\n{header}")
+        out.extend("<tr>" + "".join(f"<td>{v}</td>" for v in row) + "</tr>\n" for row in block)
+        out.append("</table>\n")
+    return "".join(out)
+
+
+class Writers:
+    """Open output files; per-day files are rotated by start_day()."""
+
+    def __init__(self, out_dir, formats):
+        self.dir = Path(out_dir)
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.formats = set(formats)
+        self.files = {}
+        self.day_files = {}
+        self.paths = []
+        if "csv" in self.formats:
+            self._open("csv", "breadcrumbs.csv").write(",".join(BREADCRUMB_COLUMNS) + "\n")
+        if "json" in self.formats:
+            self._open("json", "bcsample.json")
+        if "copy" in self.formats:
+            self._open("copy", "breadcrumb_copy.csv")
+
+    def _open(self, key, name, per_day=False):
+        path = self.dir / name
+        f = open(path, "w", encoding="utf-8", newline="")
+        (self.day_files if per_day else self.files)[key] = f
+        self.paths.append(str(path))
+        return f
+
+    def start_day(self, day):
+        self.end_day()
+        if "stops" in self.formats:
+            self._open("stops", f"trimet_stopevents_{day.isoformat()}.html", per_day=True).write(
+                f"<html><head><title>stops</title></head><body>"
+                f"<h1>Trimet CAD/AVL stop data for {day.isoformat()}</h1>\n")
+        if "relpos" in self.formats:
+            self._open("relpos", f"trimet_relpos_{day.isoformat()}.csv", per_day=True).write("VEHICLE_NUMBER,RELPOS\n")
+
+    def end_day(self):
+        if "stops" in self.day_files:
+            self.day_files["stops"].write("</body></html>\n")
+        for f in self.day_files.values():
+            f.close()
+        self.day_files = {}
+
+    def write(self, vehicle, day, crumbs, kinds, stops, relpos):
+        if "csv" in self.files:
+            crumbs.to_csv(self.files["csv"], header=False, index=False)
+        if "json" in self.files:
+            self.files["json"].write(f"--- Vehicle ID: {vehicle} ---\n{crumbs.to_json(orient='records')}\n\n")
+        if "copy" in self.files:
+            copy_rows(crumbs, kinds, day).to_csv(self.files["copy"], header=False, index=False)
+        if "stops" in self.day_files and len(stops):
+            self.day_files["stops"].write(stop_tables_html(stops))
+        if "relpos" in self.day_files:
+            relpos.to_csv(self.day_files["relpos"], header=False, index=False)
+
+    def close(self):
+        self.end_day()
+        for f in self.files.values():
+            f.close()
+
+
+def generate(out_dir, rows, seed=0, start=date(2022, 12, 7), vehicles=600, violation_rate=0.001,
+             biased=0.02, formats=FORMATS):
+    """Write *rows* breadcrumbs (and the matching stop events / RELPOS) under *out_dir*; returns the manifest."""
+    rng = np.random.default_rng(seed)
+    fleet = np.sort(rng.choice(FLEET, size=min(vehicles, len(FLEET)), replace=False))
+    network = make_network(rng)
+    bias = pick_biased(rng, fleet, biased)
+    per_vehicle = int(np.clip(math.ceil(rows / len(fleet)), 200, FULL_DAY))
+
+    violations = np.zeros(len(VIOLATIONS), dtype=np.int64)
+    written = trips = stop_events = 0
+    days, used = [], set()
+    writers = Writers(out_dir, formats)
+    try:
+        day_index = 0
+        while written < rows:
+            day = start + timedelta(days=day_index)
+            trip_base = 220_000_000 + day_index * 1_000_000
+            opened = False
+            for vehicle in fleet:
+                if written >= rows:
+                    break
+                crumbs, stops, relpos, kinds = vehicle_day(
+                    seed, day_index, day, vehicle, min(per_vehicle, rows - written), trip_base,
+                    network, bias, violation_rate)
+                if crumbs.empty:
+                    continue
+                if not opened:                    # a day's files exist only once it has rows
+                    writers.start_day(day)
+                    days.append(day.isoformat())
+                    opened = True
+                writers.write(int(vehicle), day, crumbs, kinds, stops, relpos)
+                used.add(int(vehicle))
+                written += len(crumbs)
+                trips += crumbs["EVENT_NO_TRIP"].nunique()
+                trip_base += crumbs["EVENT_NO_TRIP"].nunique()
+                stop_events += len(stops)
+                violations += np.bincount(kinds[kinds >= 0], minlength=len(VIOLATIONS))
+            if not opened:
+                break                             # a full pass wrote nothing; later days won't either
+            day_index += 1
+    finally:
+        writers.close()
+
+    manifest = {
+        "seed": seed, "rows": written, "vehicles": len(used), "days": days, "trips": trips,
+        "stop_events": stop_events, "violation_rate": violation_rate,
+        "violations": dict(zip(VIOLATIONS, violations.tolist())),
+        "biased_vehicles": {kind: [v for v, b in bias.items() if b == kind] for kind in BIAS_KINDS},
+        "files": [Path(p).name for p in writers.paths],
+    }
+    write_json(str(Path(out_dir) / "manifest.json"), **manifest)
+    return manifest
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Generate seeded synthetic TriMet breadcrumbs, stop events and RELPOS.")
+    ap.add_argument("--rows", default="100k", help="breadcrumb rows, e.g. 1k, 10M, 100M")
+    ap.add_argument("--out", default="synth", help="output directory")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--start", default="2022-12-07", help="first service day")
+    ap.add_argument("--vehicles", type=int, default=600, help="fleet size (max %d)" % len(FLEET))
+    ap.add_argument("--violation-rate", type=float, default=0.001,
+                    help="fraction of breadcrumbs that break one receiver assertion")
+    ap.add_argument("--biased", type=float, default=0.02, help="fraction of vehicles with a stop/GPS bias")
+    ap.add_argument("--formats", default=",".join(FORMATS), help="comma-separated subset of " + ",".join(FORMATS))
+    args = ap.parse_args()
+
+    formats = [f for f in args.formats.split(",") if f]
+    unknown = set(formats) - set(FORMATS)
+    if unknown:
+        ap.error(f"unknown format(s): {', '.join(sorted(unknown))}")
+
+    m = generate(args.out, parse_count(args.rows), args.seed, date.fromisoformat(args.start), args.vehicles,
+                 args.violation_rate, args.biased, formats)
+    print(f"{m['rows']:,} breadcrumbs, {m['trips']:,} trips, {m['stop_events']:,} stop events "
+          f"over {len(m['days'])} day(s) from {m['vehicles']} vehicles → {args.out}/")
+    print("violations: " + (", ".join(f"{k} {v:,}" for k, v in m["violations"].items() if v) or "none"))
+    print("biased vehicles: " + json.dumps(m["biased_vehicles"]))
+
+
+if __name__ == "__main__":
+    main()
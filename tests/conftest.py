@@ -0,0 +1,6 @@
+import os
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+for sub in ("", "DetectBias", "dataValidation"):
+    sys.path.insert(0, os.path.join(ROOT, sub))
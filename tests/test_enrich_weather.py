@@ -0,0 +1,19 @@
+import os
+
+from enrich_weather import weather_series
+from weather import WeatherClient
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "fixtures", "weather")
+
+
+def test_fixture_flag_leaves_history_untouched(tmp_path):
+    series = weather_series(WeatherClient(cache_dir=tmp_path, fixtures=FIXTURES), "Portland,US")
+    assert len(series)
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_fixture_env_var_leaves_history_untouched(tmp_path, monkeypatch):
+    monkeypatch.setenv("WEATHER_FIXTURES", FIXTURES)
+    series = weather_series(WeatherClient(cache_dir=tmp_path), "Portland,US")
+    assert len(series)
+    assert list(tmp_path.iterdir()) == []
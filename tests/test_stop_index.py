@@ -0,0 +1,38 @@
+import pandas as pd
+
+from transform import StopIndex, typed_stop_events
+
+
+def stop_events():
+    df = pd.DataFrame({
+        "trip_id":        ["1", "1", "2", "2", "3", "3"],
+        "vehicle_number": [4062, 4062, 3001, 3001, 4062, 3001],
+        "tstamp":         pd.date_range("2022-12-07", periods=6, freq="min"),
+        "location_id":    [6913, 100, 6913, 200, 100, 6913],
+        "ons":            [1, 0, 3, 0, 2, 0],
+        "offs":           [0, 1, 0, 2, 0, 4],
+    })
+    return typed_stop_events(df)
+
+
+def test_row_lookups_match_a_full_scan():
+    stops = stop_events()
+    index = StopIndex(stops)
+    for key, rows in (("location_id", index.location_rows), ("vehicle_number", index.vehicle_rows)):
+        for value in stops[key].unique():
+            pd.testing.assert_frame_equal(rows(value), stops[stops[key] == value])
+
+
+def test_aggregates_and_offsets_agree():
+    index = StopIndex(stop_events())
+    loc = index.location(6913)
+    assert (loc["stops"], loc["vehicles"], loc["boarding_stops"], loc["ons"], loc["offs"]) == (3, 2, 2, 4, 4)
+    assert loc["end"] - loc["start"] == loc["stops"]
+    veh = index.vehicle(4062)
+    assert (veh["stops"], veh["locations"], veh["ons"], veh["offs"]) == (3, 2, 3, 1)
+
+
+def test_unknown_key_gives_no_rows():
+    index = StopIndex(stop_events())
+    assert index.location_rows(999).empty
+    assert index.vehicle_rows(999).empty
@@ -1,13 +1,14 @@
 import json
-from google.cloud import pubsub_v1
 import time
+
+from transport import get_transport
 start_time = time.time()
 
 project_id = "introspec-duale-duale"
 topic_id = "my-topic"
 filename = "bcsample.json"
 
-publisher = pubsub_v1.PublisherClient()
+publisher = get_transport().publisher()
 topic_path = publisher.topic_path(project_id, topic_id)
 
 count = 0
@@ -46,5 +47,7 @@ with open(filename, "r") as f:
                 )
                 count += 1
 
+publisher.stop()  # flush the last batch
+
 print(f"\nTotal records published: \033[33m{count}\033[0m")
 print(f"\nProducer took {time.time() - start_time:.2f} seconds")
@@ -0,0 +1,550 @@
+#!/usr/bin/env python3
+"""
+Pub/Sub transport: Google Cloud Pub/Sub or a local broker, same client API.
+
+    transport = get_transport()              # PUBSUB_TRANSPORT=gcp (default) | local
+    publisher = transport.publisher()
+    future = publisher.publish(publisher.topic_path(project, topic), data, key="v")
+    subscriber = transport.subscriber()
+    pull = subscriber.subscribe(subscriber.subscription_path(project, sub), callback)
+    pull.result(timeout=5)
+
+The clients expose the subset of google.cloud.pubsub_v1 the pipeline uses
+(publish → future, subscribe → streaming-pull future, message.ack()/nack()),
+so scripts switch transports with one environment variable.
+
+The local broker keeps topics and subscriptions in memory.  Publishers batch
+messages (max_messages / max_bytes / max_latency), subscribers pull under
+flow control (max_messages / max_bytes outstanding), and a message that is
+neither acked nor nacked within its subscription's ack deadline is
+redelivered with delivery_attempt + 1 (at-least-once, like Pub/Sub).  It
+runs in-process, or as a server other processes reach over a local socket:
+
+    python transport.py serve [--address /tmp/pubsub-broker.sock] [--subscription my-sub=my-topic ...]
+    PUBSUB_TRANSPORT=local PUBSUB_LOCAL_BROKER=/tmp/pubsub-broker.sock python topic.py
+
+The address is a Unix socket path or host:port.  Prefer the Unix socket:
+over loopback TCP, multiprocessing's split writes of large frames hit
+Nagle + delayed ACK and every batch RPC stalls ~40 ms.
+
+Subscriptions are bound to topics with create_subscription() or
+PUBSUB_LOCAL_SUBSCRIPTIONS="my-sub=my-topic,breadcrumbs-sub=breadcrumbs";
+as on Pub/Sub, a topic only retains messages for existing subscriptions.
+"""
+
+from __future__ import annotations
+
+import argparse
+import itertools
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from multiprocessing.managers import BaseManager
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+log = logging.getLogger("transport")
+
+DEFAULT_ADDRESS = "/tmp/pubsub-broker.sock"
+AUTHKEY = os.getenv("PUBSUB_LOCAL_AUTHKEY", "local-pubsub").encode()
+
+
+@dataclass
+class BatchSettings:
+    max_messages: int = 100
+    max_bytes: int = 1_000_000
+    max_latency: float = 0.01          # seconds a partial batch may wait
+
+
+@dataclass
+class FlowControl:
+    max_messages: int = 1000
+    max_bytes: int = 100 * 1024 * 1024
+
+
+class NotFound(LookupError):
+    pass
+
+
+# ─── Broker ────────────────────────────────────────────────────────────────
+@dataclass
+class _Subscription:
+    topic: str
+    ack_deadline: float
+    ready: Deque[tuple] = field(default_factory=deque)        # (message_id, data, attrs, publish_time, attempt)
+    leased: Dict[str, tuple] = field(default_factory=dict)    # ack_id → (deadline, message tuple)
+
+
+class LocalBroker:
+    """In-memory topics and pull subscriptions with ack deadlines and redelivery."""
+
+    def __init__(self):
+        self._lock = threading.Condition()
+        self._topics: Dict[str, List[str]] = {}
+        self._subs: Dict[str, _Subscription] = {}
+        self._ids = itertools.count(1)
+        self._ack_ids = itertools.count(1)
+
+    def create_topic(self, topic: str) -> None:
+        with self._lock:
+            self._topics.setdefault(topic, [])
+
+    def create_subscription(self, subscription: str, topic: str, ack_deadline: float = 10.0) -> None:
+        with self._lock:
+            self._topics.setdefault(topic, [])
+            if subscription not in self._subs:
+                self._subs[subscription] = _Subscription(topic, ack_deadline)
+                self._topics[topic].append(subscription)
+
+    def publish(self, topic: str, batch: List[Tuple[bytes, Dict[str, str]]]) -> List[str]:
+        """Append *batch* to every subscription of *topic*; returns the message ids."""
+        now = time.time()
+        with self._lock:
+            subs = self._topics.setdefault(topic, [])
+            ids = [str(next(self._ids)) for _ in batch]
+            for sub in subs:
+                ready = self._subs[sub].ready
+                for mid, (data, attrs) in zip(ids, batch):
+                    ready.append((mid, data, attrs, now, 1))
+            if subs:
+                self._lock.notify_all()
+        return ids
+
+    def _expire(self, sub: _Subscription, now: float) -> None:
+        expired = [a for a, (deadline, _) in sub.leased.items() if deadline <= now]
+        for ack_id in expired:
+            _, (mid, data, attrs, published, attempt) = sub.leased.pop(ack_id)
+            sub.ready.appendleft((mid, data, attrs, published, attempt + 1))
+
+    def pull(self, subscription: str, max_messages: int, max_bytes: int, timeout: float = 0.1) -> list:
+        """
+        Lease up to *max_messages* / *max_bytes* of ready messages, waiting up
+        to *timeout* for one.  Returns (ack_id, lease_expiry, message_id, data,
+        attributes, publish_time, delivery_attempt) tuples.
+        """
+        end = time.time() + timeout
+        with self._lock:
+            sub = self._subs.get(subscription)
+            if sub is None:
+                raise NotFound(subscription)
+            while True:
+                now = time.time()
+                self._expire(sub, now)
+                if sub.ready or now >= end:
+                    break
+                next_expiry = min((d for d, _ in sub.leased.values()), default=end)
+                self._lock.wait(max(0.0, min(end, next_expiry) - now))
+
+            out, size = [], 0
+            while sub.ready and len(out) < max_messages:
+                msg = sub.ready[0]
+                if out and size + len(msg[1]) > max_bytes:
+                    break
+                sub.ready.popleft()
+                ack_id = str(next(self._ack_ids))
+                sub.leased[ack_id] = (now + sub.ack_deadline, msg)
+                out.append((ack_id, now + sub.ack_deadline, *msg))
+                size += len(msg[1])
+            return out
+
+    def acknowledge(self, subscription: str, ack_ids: List[str]) -> None:
+        with self._lock:
+            sub = self._subs[subscription]
+            for ack_id in ack_ids:
+                sub.leased.pop(ack_id, None)
+
+    def modify_ack_deadline(self, subscription: str, ack_ids: List[str], seconds: float) -> None:
+        """Extend the leases of *ack_ids*; 0 seconds is a nack (redeliver now)."""
+        now = time.time()
+        with self._lock:
+            sub = self._subs[subscription]
+            for ack_id in ack_ids:
+                if ack_id in sub.leased:
+                    sub.leased[ack_id] = (now + seconds, sub.leased[ack_id][1])
+            if seconds <= 0:
+                self._expire(sub, now)
+                self._lock.notify_all()
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            return {name: {"ready": len(s.ready), "leased": len(s.leased)} for name, s in self._subs.items()}
+
+
+class _BrokerManager(BaseManager):
+    pass
+
+
+_local_broker: Optional[LocalBroker] = None
+
+
+def _shared_broker() -> LocalBroker:
+    global _local_broker
+    if _local_broker is None:
+        _local_broker = LocalBroker()
+    return _local_broker
+
+
+_BrokerManager.register("broker", callable=_shared_broker)
+
+
+def _socket_address(address: str):
+    """'host:port' → (host, port); anything else is a Unix socket path."""
+    host, sep, port = address.rpartition(":")
+    if sep and port.isdigit():
+        return host or "127.0.0.1", int(port)
+    return address
+
+
+def serve(address: str = DEFAULT_ADDRESS, subscriptions: Optional[Dict[str, str]] = None) -> None:
+    """Run the local broker as a socket server until interrupted."""
+    broker = _shared_broker()
+    for sub, topic in (subscriptions or {}).items():
+        broker.create_subscription(sub, topic)
+    addr = _socket_address(address)
+    if isinstance(addr, str) and os.path.exists(addr):
+        os.unlink(addr)                           # stale socket from an earlier run
+    server = _BrokerManager(address=addr, authkey=AUTHKEY).get_server()
+    log.info("Local Pub/Sub broker on %s (%d subscriptions)", address, len(subscriptions or {}))
+    server.serve_forever()
+
+
+def connect_broker(address: Optional[str] = None):
+    """The broker served at *address*, or this process's in-process broker when it is empty."""
+    if not address:
+        return _shared_broker()
+    manager = _BrokerManager(address=_socket_address(address), authkey=AUTHKEY)
+    manager.connect()
+    return manager.broker()
+
+
+# ─── Local clients ─────────────────────────────────────────────────────────
+def _bare(path: str) -> str:
+    """Resource id of a topic/subscription path; the broker ignores projects."""
+    return path.rsplit("/", 1)[-1]
+
+
+class LocalPublisher:
+    """Batching publisher; publish() returns a future resolved with the message id."""
+
+    def __init__(self, broker, batch_settings: BatchSettings = BatchSettings()):
+        self._broker = broker
+        self._settings = batch_settings
+        self._lock = threading.Lock()
+        self._batches: Dict[str, list] = {}     # topic → [(data, attrs, future)], bytes, first-message time
+        self._wake = threading.Event()
+        self._closed = False
+        self._flusher = threading.Thread(target=self._run, name="publisher-flush", daemon=True)
+        self._flusher.start()
+
+    @staticmethod
+    def topic_path(project: str, topic: str) -> str:
+        return f"projects/{project}/topics/{topic}"
+
+    def publish(self, topic: str, data: bytes, **attrs: str) -> Future:
+        if not isinstance(data, bytes):
+            raise TypeError("data must be bytes")
+        fut: Future = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("publisher is closed")
+            topic = _bare(topic)
+            batch = self._batches.setdefault(topic, [[], 0, time.monotonic()])
+            batch[0].append((data, {k: str(v) for k, v in attrs.items()}, fut))
+            batch[1] += len(data)
+            full = len(batch[0]) >= self._settings.max_messages or batch[1] >= self._settings.max_bytes
+            if full:
+                del self._batches[topic]
+        if full:
+            self._commit(topic, batch[0])
+        else:
+            self._wake.set()
+        return fut
+
+    def _commit(self, topic: str, items: list) -> None:
+        try:
+            ids = self._broker.publish(topic, [(d, a) for d, a, _ in items])
+        except Exception as e:                    # broker unreachable
+            for _, _, fut in items:
+                fut.set_exception(e)
+            return
+        for mid, (_, _, fut) in zip(ids, items):
+            fut.set_result(mid)
+
+    def _due(self, force: bool = False) -> List[Tuple[str, list]]:
+        now = time.monotonic()
+        with self._lock:
+            due = [t for t, b in self._batches.items() if force or now - b[2] >= self._settings.max_latency]
+            return [(t, self._batches.pop(t)[0]) for t in due]
+
+    def _run(self) -> None:
+        while not self._closed:
+            self._wake.wait(self._settings.max_latency)
+            self._wake.clear()
+            for topic, items in self._due():
+                self._commit(topic, items)
+
+    def flush(self) -> None:
+        for topic, items in self._due(force=True):
+            self._commit(topic, items)
+
+    def stop(self) -> None:
+        self.flush()
+        self._closed = True
+        self._wake.set()
+        self._flusher.join()
+
+
+class LocalMessage:
+    def __init__(self, sub: "_StreamingPull", ack_id, lease_expiry, message_id, data, attributes,
+                 publish_time, attempt):
+        self._sub = sub
+        self._expiry = lease_expiry
+        self.ack_id = ack_id
+        self.message_id = message_id
+        self.data = data
+        self.attributes = attributes
+        self.publish_time = datetime.fromtimestamp(publish_time, timezone.utc)
+        self.delivery_attempt = attempt
+
+    def __repr__(self) -> str:
+        return (f"Message {{ data: {self.data[:50]!r}{'…' if len(self.data) > 50 else ''}, "
+                f"attributes: {self.attributes}, message_id: {self.message_id}, "
+                f"delivery_attempt: {self.delivery_attempt} }}")
+
+    def ack(self) -> None:
+        self._sub._settle(self, ack=True)
+
+    def nack(self) -> None:
+        self._sub._settle(self, ack=False)
+
+    def modify_ack_deadline(self, seconds: float) -> None:
+        if seconds <= 0:
+            return self.nack()
+        self._sub._broker.modify_ack_deadline(self._sub.subscription, [self.ack_id], seconds)
+        self._expiry = time.time() + seconds
+
+
+class _StreamingPull(Future):
+    """
+    Pull loop feeding a callback pool under flow control; result() blocks
+    until cancel().  Acks and nacks are sent to the broker in batches once
+    per pull cycle; a lease that expires unsettled frees its flow-control
+    slot (the broker redelivers the message) and a late ack is ignored.
+    """
+
+    def __init__(self, broker, subscription: str, callback: Callable, flow_control: FlowControl,
+                 executor: ThreadPoolExecutor):
+        super().__init__()
+        self._broker = broker
+        self.subscription = subscription
+        self._callback = callback
+        self._flow = flow_control
+        self._executor = executor
+        self._cv = threading.Condition()
+        self._leases: Dict[str, LocalMessage] = {}
+        self._leased_bytes = 0
+        self._acks: List[str] = []
+        self._nacks: List[str] = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"pull-{subscription}", daemon=True)
+        self.set_running_or_notify_cancel()
+        self._thread.start()
+
+    def _release(self, msg: LocalMessage) -> None:
+        del self._leases[msg.ack_id]
+        self._leased_bytes -= len(msg.data)
+        self._cv.notify_all()
+
+    def _settle(self, msg: LocalMessage, ack: bool) -> None:
+        with self._cv:
+            if msg.ack_id not in self._leases:       # already settled, or the lease expired
+                return
+            self._release(msg)
+            (self._acks if ack else self._nacks).append(msg.ack_id)
+
+    def _flush_settled(self) -> None:
+        with self._cv:
+            acks, self._acks = self._acks, []
+            nacks, self._nacks = self._nacks, []
+        if acks:
+            self._broker.acknowledge(self.subscription, acks)
+        if nacks:
+            self._broker.modify_ack_deadline(self.subscription, nacks, 0)
+
+    def _expire_leases(self) -> None:
+        now = time.time()
+        for msg in [m for m in self._leases.values() if m._expiry <= now]:
+            log.debug("lease expired for message %s", msg.message_id)
+            self._release(msg)
+
+    def _dispatch(self, msg: LocalMessage) -> None:
+        try:
+            self._callback(msg)
+        except Exception:                         # like pubsub_v1: log and nack
+            log.exception("callback failed for message %s", msg.message_id)
+            msg.nack()
+
+    def _run(self) -> None:
+        try:
+            while not self._stop.is_set():
+                self._flush_settled()
+                with self._cv:
+                    self._expire_leases()
+                    room = self._flow.max_messages - len(self._leases)
+                    room_bytes = self._flow.max_bytes - self._leased_bytes
+                    if room <= 0 or room_bytes <= 0:
+                        self._cv.wait(0.05)
+                        continue
+                for item in self._broker.pull(self.subscription, room, room_bytes, 0.1):
+                    msg = LocalMessage(self, *item)
+                    with self._cv:
+                        self._leases[msg.ack_id] = msg
+                        self._leased_bytes += len(msg.data)
+                    self._executor.submit(self._dispatch, msg)
+            self._flush_settled()
+        except Exception as e:
+            if not self.done():
+                self.set_exception(e)
+            return
+        if not self.done():
+            self.set_result(None)
+
+    def cancel(self) -> bool:
+        self._stop.set()
+        self._thread.join()
+        return True
+
+
+class LocalSubscriber:
+    def __init__(self, broker, max_workers: int = 10):
+        self._broker = broker
+        self._max_workers = max_workers
+        self._pulls: List[_StreamingPull] = []
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    @staticmethod
+    def subscription_path(project: str, subscription: str) -> str:
+        return f"projects/{project}/subscriptions/{subscription}"
+
+    def subscribe(self, subscription: str, callback: Callable,
+                  flow_control: FlowControl = FlowControl()) -> _StreamingPull:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(self._max_workers, thread_name_prefix="subscriber")
+        pull = _StreamingPull(self._broker, _bare(subscription), callback, flow_control, self._executor)
+        self._pulls.append(pull)
+        return pull
+
+    def close(self) -> None:
+        for pull in self._pulls:
+            pull.cancel()
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+        for pull in self._pulls:                  # settle what the last callbacks acked
+            pull._flush_settled()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# ─── Transports ────────────────────────────────────────────────────────────
+def _parse_bindings(spec: str) -> Dict[str, str]:
+    return dict(pair.split("=", 1) for pair in spec.split(",") if "=" in pair)
+
+
+class LocalTransport:
+    name = "local"
+
+    def __init__(self, address: Optional[str] = None, subscriptions: Optional[Dict[str, str]] = None,
+                 ack_deadline: float = 10.0):
+        self.broker = connect_broker(address if address is not None else os.getenv("PUBSUB_LOCAL_BROKER"))
+        bindings = _parse_bindings(os.getenv("PUBSUB_LOCAL_SUBSCRIPTIONS", ""))
+        bindings.update(subscriptions or {})
+        for sub, topic in bindings.items():
+            self.create_subscription(sub, topic, ack_deadline)
+
+    def create_subscription(self, subscription: str, topic: str, ack_deadline: float = 10.0) -> None:
+        """Bind *subscription* to *topic* (ids or full resource paths)."""
+        self.broker.create_subscription(_bare(subscription), _bare(topic), ack_deadline)
+
+    def publisher(self, batch_settings: BatchSettings = BatchSettings(), **_gcp_kwargs) -> LocalPublisher:
+        return LocalPublisher(self.broker, batch_settings)
+
+    def subscriber(self, max_workers: int = 10, **_gcp_kwargs) -> LocalSubscriber:
+        return LocalSubscriber(self.broker, max_workers)
+
+
+class GcpTransport:
+    """google.cloud.pubsub_v1 clients; batch and flow-control settings are passed through."""
+    name = "gcp"
+
+    def __init__(self):
+        from google.cloud import pubsub_v1
+        self._pubsub = pubsub_v1
+
+    def publisher(self, batch_settings: Optional[BatchSettings] = None, **kwargs):
+        if batch_settings is not None:
+            kwargs["batch_settings"] = self._pubsub.types.BatchSettings(
+                max_messages=batch_settings.max_messages, max_bytes=batch_settings.max_bytes,
+                max_latency=batch_settings.max_latency)
+        return self._pubsub.PublisherClient(**kwargs)
+
+    def subscriber(self, **kwargs):
+        return _GcpSubscriber(self._pubsub, self._pubsub.SubscriberClient(**kwargs))
+
+
+class _GcpSubscriber:
+    """SubscriberClient whose subscribe() also accepts our FlowControl."""
+
+    def __init__(self, pubsub, client):
+        self._pubsub = pubsub
+        self._client = client
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+    def subscribe(self, subscription: str, callback: Callable, flow_control: Optional[FlowControl] = None):
+        kwargs = {}
+        if flow_control is not None:
+            kwargs["flow_control"] = self._pubsub.types.FlowControl(
+                max_messages=flow_control.max_messages, max_bytes=flow_control.max_bytes)
+        return self._client.subscribe(subscription, callback=callback, **kwargs)
+
+    def __enter__(self):
+        self._client.__enter__()
+        return self
+
+    def __exit__(self, *exc):
+        return self._client.__exit__(*exc)
+
+
+def get_transport(name: Optional[str] = None):
+    """The transport named by *name* or PUBSUB_TRANSPORT ('gcp' or 'local')."""
+    name = name or os.getenv("PUBSUB_TRANSPORT", "gcp")
+    if name == "gcp":
+        return GcpTransport()
+    if name == "local":
+        return LocalTransport()
+    raise ValueError(f"unknown PUBSUB_TRANSPORT {name!r} (expected 'gcp' or 'local')")
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format="[%(asctime)s] %(levelname)s %(name)s: %(message)s")
+    ap = argparse.ArgumentParser(description="Local Pub/Sub broker.")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    s = sub.add_parser("serve", help="serve the local broker on a socket")
+    s.add_argument("--address", default=DEFAULT_ADDRESS, help="Unix socket path or host:port")
+    s.add_argument("--subscription", action="append", default=[], metavar="SUB=TOPIC",
+                   help="create a subscription bound to a topic (repeatable)")
+    args = ap.parse_args()
+    serve(args.address, _parse_bindings(",".join(args.subscription)))
+
+
+if __name__ == "__main__":
+    main()
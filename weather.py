@@ -0,0 +1,136 @@
+"""
+OpenWeatherMap client with a TTL disk cache.
+
+    client = WeatherClient()                 # OWM_API_KEY from the environment
+    data = client.fetch("Portland,US")       # {'weather': {...}, 'forecast': {...}}
+
+Responses are cached as JSON under CACHE_DIR, one file per (city, endpoint),
+and reused for TTL seconds -- OpenWeatherMap refreshes its data about every
+10 minutes, so fetching more often only burns quota.  fetch() issues the
+current-weather and forecast calls concurrently over one pooled session,
+each with a connect/read timeout; if a call fails, a stale cache entry is
+served (with a warning) rather than nothing.
+
+With fixtures=DIR (or WEATHER_FIXTURES=DIR) no network is used at all: each
+endpoint is read from DIR/<endpoint>.<city>.json, e.g.
+fixtures/weather/forecast.portland_us.json.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import re
+import time
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+import pandas as pd
+
+API_URL = "http://api.openweathermap.org/data/2.5/{endpoint}"
+ENDPOINTS = ("weather", "forecast")
+TTL = 600                                   # seconds; the API's update cadence
+TIMEOUT = (3.05, 10)                        # (connect, read) seconds
+CACHE_DIR = Path(os.getenv("WEATHER_CACHE_DIR", ".cache/weather"))
+
+
+def city_slug(city: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "_", city.lower()).strip("_")
+
+
+class WeatherClient:
+    def __init__(self,
+                 api_key: Optional[str] = None,
+                 cache_dir: Path = CACHE_DIR,
+                 ttl: float = TTL,
+                 timeout=TIMEOUT,
+                 fixtures: Optional[str] = None,
+                 units: str = "metric"):
+        self.api_key = api_key or os.getenv("OWM_API_KEY", "API_KEY")
+        self.cache_dir = Path(cache_dir)
+        self.ttl = ttl
+        self.timeout = timeout
+        self.fixtures = fixtures or os.getenv("WEATHER_FIXTURES")
+        self.units = units
+        self._session = None
+
+    @property
+    def session(self):
+        if self._session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+
+            self._session = requests.Session()
+            self._session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=len(ENDPOINTS)))
+            self._session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=len(ENDPOINTS)))
+        return self._session
+
+    def _cache_path(self, city: str, endpoint: str) -> Path:
+        return self.cache_dir / f"{endpoint}.{city_slug(city)}.{self.units}.json"
+
+    def _read_cache(self, path: Path):
+        try:
+            entry = json.loads(path.read_text())
+            return entry["fetched_at"], entry["data"]
+        except (OSError, ValueError, KeyError):
+            return None, None
+
+    def get(self, city: str, endpoint: str) -> Dict:
+        """One endpoint's JSON for *city*: fixture, fresh cache entry, or a new request."""
+        if self.fixtures:
+            return json.loads((Path(self.fixtures) / f"{endpoint}.{city_slug(city)}.json").read_text())
+
+        path = self._cache_path(city, endpoint)
+        fetched_at, data = self._read_cache(path)
+        if data is not None and time.time() - fetched_at < self.ttl:
+            return data
+
+        try:
+            resp = self.session.get(API_URL.format(endpoint=endpoint),
+                                    params={"q": city, "appid": self.api_key, "units": self.units},
+                                    timeout=self.timeout)
+            resp.raise_for_status()
+            fresh = resp.json()
+        except Exception as e:                    # requests.RequestException / bad JSON; the
+                                                  # message may carry the URL, i.e. the API key
+            if data is None:
+                raise
+            print(f"[WARN] {endpoint} for {city}: {type(e).__name__}; using cache from "
+                  f"{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(fetched_at))}")
+            return data
+
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix(".tmp")
+            tmp.write_text(json.dumps({"fetched_at": time.time(), "data": fresh}))
+            os.replace(tmp, path)
+        except OSError as e:
+            print(f"[WARN] weather cache disabled: {e}")
+        return fresh
+
+    async def aget(self, city: str, endpoint: str) -> Dict:
+        return await asyncio.to_thread(self.get, city, endpoint)
+
+    async def afetch(self, city: str, endpoints: Iterable[str] = ENDPOINTS) -> Dict[str, Dict]:
+        endpoints = list(endpoints)
+        results = await asyncio.gather(*(self.aget(city, e) for e in endpoints))
+        return dict(zip(endpoints, results))
+
+    def fetch(self, city: str, endpoints: Iterable[str] = ENDPOINTS) -> Dict[str, Dict]:
+        """All *endpoints* for *city*, requested concurrently."""
+        return asyncio.run(self.afetch(city, endpoints))
+
+
+def forecast_frame(forecast: Dict) -> pd.DataFrame:
+    """
+    The forecast 'list' as a frame: naive UTC 'time' (from dt_txt), 'temp',
+    'rain_3h' (mm, 0 when absent) and 'rain' (bool: the entry has rain).
+    """
+    entries = forecast.get("list", [])
+    return pd.DataFrame({
+        "time":    pd.to_datetime([e["dt_txt"] for e in entries], format="%Y-%m-%d %H:%M:%S"),
+        "temp":    [e.get("main", {}).get("temp") for e in entries],
+        "rain_3h": [e.get("rain", {}).get("3h", 0.0) for e in entries],
+        "rain":    ["rain" in e for e in entries],
+    })